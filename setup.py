@@ -22,4 +22,5 @@ setup(name='waymarkedtrails-shields',
                ],
       package_data = { 'wmt_shields' : [ 'data/jel/**', 'data/kct/**', 'data/osmc/**' ] },
       python_requires = ">=3.10",
+      extras_require = { 'brotli' : [ 'brotli' ] },
       )
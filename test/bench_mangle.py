@@ -0,0 +1,56 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+"""
+Compares the streaming SVG mangler with the DOM-based implementation
+on all shields from render_test.py. Run from within the test directory:
+
+    python bench_mangle.py [<repeat>]
+"""
+import sys
+import time
+
+from wmt_shields.common.svg_mangle import mangle_svg, mangle_svg_dom
+import render_test
+
+def main(repeat):
+    factory = render_test.create_factory()
+
+    raw = {}
+    for level, region, tags in render_test.TEST_SYMBOLS:
+        sym = factory.create(tags, region, style=level)
+        if sym is not None:
+            raw[sym.uuid()] = sym._render_surface('svg')
+
+    mismatches = [uuid for uuid, buf in raw.items()
+                  if mangle_svg(buf) != mangle_svg_dom(buf.decode('utf8')).encode('utf8')]
+
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for buf in raw.values():
+            mangle_svg_dom(buf.decode('utf8')).encode('utf8')
+    dom_time = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for buf in raw.values():
+            mangle_svg(buf)
+    stream_time = time.perf_counter() - t
+
+    num = len(raw) * repeat
+    print(f"Shields:    {len(raw)} x {repeat}")
+    print(f"Input size: {sum(len(b) for b in raw.values())} bytes")
+    print(f"minidom:    {dom_time:.3f}s ({1e6 * dom_time / num:.1f} us/shield)")
+    print(f"streaming:  {stream_time:.3f}s ({1e6 * stream_time / num:.1f} us/shield)")
+    print(f"Speedup:    {dom_time / stream_time:.2f}x")
+    if mismatches:
+        print("Output differs for:", ', '.join(mismatches))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,335 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+"""
+Measures the rendering performance per style and per processing phase.
+The corpus consists of all shields from render_test.py and an additional
+synthetic corpus created from a fixed random seed. Run from within the
+test directory:
+
+    python bench_render.py [--synthetic <n>] [--format png] [--json <file>]
+
+The phases measured are:
+
+    create      matching of the tags in ShieldFactory.create()
+    dimensions  computation of the image size (without text layout)
+    text        creation and layout of Pango text for measuring and drawing
+    render      drawing of the shield into the cairo surface (without text layout)
+    output      writing of the image into a byte buffer
+    mangle      post-processing of the SVG output (SVG only)
+    optimize    size optimisation of the SVG output (SVG only)
+
+The size of the SVG output is reported before and after the optimisation,
+which rounds coordinates to --svg-precision decimals.
+
+Peak memory is reported as the maximum resident set size of the process.
+With --trace-memory the peak of Python allocations is traced as well,
+which slows down the benchmark considerably.
+"""
+import sys
+import json
+import random
+import string
+import platform
+import argparse
+import resource
+import tracemalloc
+from io import BytesIO
+from math import ceil
+from time import perf_counter
+from collections import defaultdict
+
+import cairo
+
+from wmt_shields.common import text
+from wmt_shields.common.svg_optimize import optimize_svg
+
+import render_test
+
+PHASES = ('create', 'dimensions', 'text', 'render', 'output', 'mangle', 'optimize')
+
+REF_ALPHABETS = (string.ascii_uppercase + string.digits,
+                 string.ascii_lowercase + '-/ ',
+                 'ÄÖÜßéèçñ', 'шиеяжф', '하이로', '号路山', 'يلةبن')
+
+
+def render_test_corpus():
+    """ Return the shields of render_test.py as (region, tags, kwargs).
+    """
+    return [(region, tags, {'style': level})
+            for level, region, tags in render_test.TEST_SYMBOLS]
+
+
+def synthetic_corpus(size, seed=0):
+    """ Create a reproducible random corpus of `size` shields with
+        a distribution of styles that resembles real data: mostly
+        references, OSMC symbols and colours, some special networks.
+    """
+    rnd = random.Random(seed)
+    cfg = render_test.GlobalConfig
+    levels = ('INT', 'NAT', 'REG', 'LOC')
+    osmc_colors = sorted(cfg.osmc_colors)
+    backgrounds = render_test.OSMC_BACKGROUNDS
+    foregrounds = render_test.OSMC_FOREGROUNDS
+
+    def ref():
+        alphabet = rnd.choice(REF_ALPHABETS)
+        return ''.join(rnd.choice(alphabet)
+                       for _ in range(rnd.randint(1, 8))).strip() or 'X'
+
+    def osmc():
+        sym = [rnd.choice(osmc_colors),
+               rnd.choice(osmc_colors) + rnd.choice(backgrounds),
+               rnd.choice(osmc_colors) + rnd.choice(foregrounds)]
+        if rnd.random() < 0.3:
+            sym.append(rnd.choice(osmc_colors) + rnd.choice(foregrounds))
+        if rnd.random() < 0.4:
+            sym.extend((ref()[:3], rnd.choice(('black', 'white'))))
+        return {'osmc:symbol': ':'.join(sym)}
+
+    generators = (
+        (30, lambda: {'ref': ref()}),
+        (25, osmc),
+        (15, lambda: {'ref': ref(), 'colour': rnd.choice(osmc_colors)}),
+        (10, lambda: {'colour': rnd.choice(osmc_colors)}),
+        (5, lambda: {'jel': rnd.choice(sorted(cfg.jel_types))}),
+        (5, lambda: {f'kct_{rnd.choice(sorted(cfg.kct_colors))}':
+                         rnd.choice(sorted(cfg.kct_types))}),
+        (5, lambda: {'operator': 'swiss mobility', 'network': 'nwn',
+                     'ref': str(rnd.randint(1, 99))}),
+        (3, lambda: {'piste:type': 'nordic',
+                     'colour': rnd.choice(osmc_colors)}),
+        (2, lambda: {'piste:type': 'downhill', 'piste:ref': ref()[:3]}),
+    )
+    weights = [g[0] for g in generators]
+
+    corpus = []
+    for _ in range(size):
+        _, gen = rnd.choices(generators, weights)[0]
+        tags = gen()
+        kwargs = {'style': rnd.choice(levels)}
+        if tags.get('piste:type') == 'downhill':
+            kwargs = {'style': 'downhill', 'difficulty': rnd.randint(0, 7)}
+        corpus.append((rnd.choice(('', '', '', 'it')), tags, kwargs))
+
+    return corpus
+
+
+def _surface(fmt, w, h):
+    image = BytesIO()
+    if fmt == 'svg':
+        surface = cairo.SVGSurface(image, w, h)
+        if cairo.version_info >= (1, 18):
+            surface.set_document_unit(cairo.SVGUnit.PX)
+    else:
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, ceil(w), ceil(h))
+
+    return image, surface, cairo.Context(surface)
+
+
+class TextTimer(object):
+    """ Replacement for text.create_layout() which sums up the time
+        spent for creating and laying out text.
+    """
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self._create_layout = text.create_layout
+
+    def __call__(self, *args):
+        start = perf_counter()
+        layout = self._create_layout(*args)
+        layout.get_pixel_size() # forces the layout, the result is cached
+        self.elapsed += perf_counter() - start
+
+        return layout
+
+    def __enter__(self):
+        text.create_layout = self
+        return self
+
+    def __exit__(self, *_):
+        text.create_layout = self._create_layout
+
+
+def measure(factory, corpus, fmt, precision=2):
+    """ Render all shields in the corpus and return a dictionary with
+        the timings of each phase for each style. Shields without a
+        matching style are counted under the name 'unmatched'. The
+        image sizes before and after optimisation are recorded as
+        'bytes_output' and 'bytes_optimized'.
+    """
+    timings = defaultdict(lambda: defaultdict(list))
+
+    with TextTimer() as text_timer:
+        for region, tags, kwargs in corpus:
+            _measure_shield(factory, region, tags, kwargs, fmt, precision,
+                            timings, text_timer)
+
+    return timings
+
+
+def _measure_shield(factory, region, tags, kwargs, fmt, precision,
+                    timings, text_timer):
+    t0 = perf_counter()
+    sym = factory.create(tags, region, **kwargs)
+    t1 = perf_counter()
+    if sym is None:
+        timings['unmatched']['create'].append(t1 - t0)
+        timings['unmatched']['total'].append(t1 - t0)
+        return
+
+    text0 = text_timer.elapsed
+    w, h = sym.dimensions()
+    t2 = perf_counter()
+    text1 = text_timer.elapsed
+
+    image, surface, ctx = _surface(fmt, w, h)
+    sym._paint(ctx)
+    t3 = perf_counter()
+    text2 = text_timer.elapsed
+
+    if fmt == 'svg':
+        ctx.show_page()
+        surface.finish()
+    else:
+        surface.write_to_png(image)
+    buf = image.getvalue()
+    t4 = perf_counter()
+
+    if fmt == 'svg':
+        buf = sym._mangle_svg(buf)
+    t5 = perf_counter()
+
+    optimized = buf
+    if fmt == 'svg':
+        optimized = optimize_svg(buf, precision)
+    t6 = perf_counter()
+
+    # the uuid prefix identifies the style
+    phases = timings[sym.uuid().split('_', 1)[0]]
+    phases['create'].append(t1 - t0)
+    phases['dimensions'].append(t2 - t1 - (text1 - text0))
+    phases['text'].append(text2 - text0)
+    phases['render'].append(t3 - t2 - (text2 - text1))
+    phases['output'].append(t4 - t3)
+    phases['mangle'].append(t5 - t4)
+    phases['optimize'].append(t6 - t5)
+    phases['total'].append(t6 - t0)
+    phases['bytes_output'].append(len(buf))
+    phases['bytes_optimized'].append(len(optimized))
+
+
+def percentile(values, pct):
+    """ Return the nearest-rank percentile of a sorted list.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, ceil(pct / 100 * len(values)) - 1))]
+
+
+def summarize(phases):
+    """ Compute the statistics for the phase timings of one style.
+    """
+    totals = sorted(phases['total'])
+    result = {'count': len(totals),
+              'total': sum(totals),
+              'shields_per_sec': len(totals) / sum(totals) if sum(totals) else 0,
+              'latency_p50': percentile(totals, 50),
+              'latency_p99': percentile(totals, 99),
+              'phases': {},
+              'bytes': {'output': sum(phases.get('bytes_output', ())),
+                        'optimized': sum(phases.get('bytes_optimized', ()))}}
+
+    for phase in PHASES:
+        values = sorted(phases.get(phase, ()))
+        result['phases'][phase] = {'total': sum(values),
+                                   'p50': percentile(values, 50),
+                                   'p99': percentile(values, 99)}
+
+    return result
+
+
+def main(args):
+    factory = render_test.create_factory()
+
+    corpus = render_test_corpus() + synthetic_corpus(args.synthetic, args.seed)
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    timings = defaultdict(lambda: defaultdict(list))
+    for _ in range(args.repeat):
+        for style, phases in measure(factory, corpus, args.format,
+                                     args.svg_precision).items():
+            for phase, values in phases.items():
+                timings[style][phase].extend(values)
+
+    styles = {style: summarize(phases) for style, phases in sorted(timings.items())}
+    everything = defaultdict(list)
+    for phases in timings.values():
+        for phase, values in phases.items():
+            everything[phase].extend(values)
+
+    result = {'environment': {'python': platform.python_version(),
+                              'cairo': cairo.cairo_version_string(),
+                              'platform': platform.platform()},
+              'corpus': {'render_test': len(render_test.TEST_SYMBOLS),
+                         'synthetic': args.synthetic, 'seed': args.seed,
+                         'repeat': args.repeat, 'format': args.format,
+                         'svg_precision': args.svg_precision},
+              'total': summarize(everything),
+              'styles': styles,
+              'memory': {'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}
+
+    if args.trace_memory:
+        result['memory']['traced_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+    return 0
+
+
+def print_report(result):
+    header = f"{'style':<22} {'count':>6} {'shields/s':>10} {'p50 ms':>8} {'p99 ms':>8}"
+    header += ''.join(f' {p + " ms":>13}' for p in PHASES)
+    print(header)
+    for name, stats in list(result['styles'].items()) + [('TOTAL', result['total'])]:
+        line = f"{name:<22} {stats['count']:>6} {stats['shields_per_sec']:>10.1f}" \
+               f" {1000 * stats['latency_p50']:>8.3f} {1000 * stats['latency_p99']:>8.3f}"
+        line += ''.join(f" {1000 * stats['phases'][p]['total']:>13.1f}" for p in PHASES)
+        print(line)
+
+    print()
+    size = result['total']['bytes']
+    if size['output']:
+        print(f"output size: {size['output']} bytes, optimized: {size['optimized']} bytes"
+              f" ({100 * (1 - size['optimized'] / size['output']):.1f}% smaller)")
+    for key, value in result['memory'].items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--synthetic', type=int, default=2000,
+                        help='Size of the synthetic corpus (default: 2000)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed for the synthetic corpus')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Number of runs over the corpus')
+    parser.add_argument('--format', choices=('svg', 'png'), default='svg')
+    parser.add_argument('--svg-precision', type=int, default=2,
+                        help='Decimals kept by the SVG optimisation (default: 2)')
+    parser.add_argument('--json', metavar='FILE',
+                        help='Write the results as JSON into FILE')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Trace the peak of Python memory allocations')
+    sys.exit(main(parser.parse_args()))
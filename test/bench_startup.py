@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+"""
+Measures the cold start time of wmt_shields in fresh interpreters.
+Run from within the test directory:
+
+    python bench_startup.py [<repeat>]
+
+For each scenario the median run time over `repeat` interpreters is
+reported, minus the time of an interpreter that does nothing. The
+script fails when a scenario exceeds its budget or loads the graphics
+libraries where it should not.
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+GRAPHICS_MODULES = ('cairo', 'gi')
+
+# name, code, budget in ms (None for no budget), graphics allowed
+SCENARIOS = (
+    ('import', 'import wmt_shields', 80, False),
+    ('classify', """
+import wmt_shields
+import render_test
+factory = render_test.create_factory()
+inputs = [(tags, region, {'style': level})
+          for level, region, tags in render_test.TEST_SYMBOLS]
+list(factory.classify(inputs))
+""", 250, False),
+    ('cached lookup', """
+import tempfile
+from wmt_shields import ShieldCache, PackStore
+with tempfile.TemporaryDirectory() as tmpdir:
+    cache = ShieldCache(store=PackStore(tmpdir + '/pack'))
+    cache.put('a.svg', b'<svg/>')
+    cache.get('a.svg')
+""", 80, False),
+    ('first render', """
+import render_test
+render_test.create_factory().create({'ref': '1'}, '', style='NAT').create_image('svg')
+""", None, True),
+)
+
+REPORT = """
+import sys, json
+print(json.dumps([m for m in {modules!r} if m in sys.modules]))
+"""
+
+
+def run(code):
+    """ Run `code` in a new interpreter and return the wall time and the
+        graphics modules that were loaded or None if the code failed.
+    """
+    script = code + REPORT.format(modules=GRAPHICS_MODULES)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', script],
+                          capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        return elapsed, None
+
+    return elapsed, json.loads(proc.stdout.splitlines()[-1])
+
+
+def main(repeat):
+    baseline = statistics.median(run('pass')[0] for _ in range(repeat))
+    print(f"Interpreter start: {1000 * baseline:.1f} ms")
+
+    failed = False
+    for name, code, budget, graphics_allowed in SCENARIOS:
+        results = [run(code) for _ in range(repeat)]
+        if any(modules is None for _, modules in results):
+            print(f"{name:14} failed to run")
+            continue
+
+        ms = 1000 * (statistics.median(t for t, _ in results) - baseline)
+        loaded = results[0][1]
+        notes = []
+        if budget is not None:
+            notes.append(f"budget {budget} ms")
+            if ms > budget:
+                notes.append('OVER BUDGET')
+                failed = True
+        if loaded:
+            notes.append('loads ' + ', '.join(loaded))
+            if not graphics_allowed:
+                failed = True
+        print(f"{name:14} {ms:7.1f} ms  ({'; '.join(notes)})")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -0,0 +1,65 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+"""
+Measures the tag lookups of shield creation on the tags of render_test.py,
+as they are and padded with the tags a typical route relation has, and
+times `ShieldFactory.classify()` over the padded inputs. Run from within
+the test directory:
+
+    python bench_tags.py [<repeat>]
+"""
+import sys
+import time
+
+from wmt_shields.common.tags import Tags
+import render_test
+
+ROUTE_TAGS = {'type': 'route', 'route': 'hiking', 'network': 'rwn',
+              'name': 'Rundweg am See', 'operator': 'Wanderverein',
+              'website': 'https://example.com', 'wikidata': 'Q1',
+              'distance': '12', 'description': 'Rundweg', 'roundtrip': 'yes'}
+
+
+def measure(func, inputs, repeat):
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for tags in inputs:
+            func(tags)
+
+    return time.perf_counter() - t
+
+
+def main(repeat):
+    plain = [tags for _, _, tags in render_test.TEST_SYMBOLS]
+    padded = [dict(ROUTE_TAGS, **tags) for tags in plain]
+    num = len(plain) * repeat
+
+    print(f"Inputs:         {len(plain)} x {repeat}")
+    for name, inputs in (('test tags', plain), ('route tags', padded)):
+        prefix = measure(lambda t: Tags(t).starting_with('kct_'), inputs, repeat)
+        ref = measure(lambda t: Tags(t).make_ref(), inputs, repeat)
+        color = measure(lambda t: Tags(t).as_color(), inputs, repeat)
+        print(f"{name}:")
+        print(f"  starting_with: {1e6 * prefix / num:.2f} us/lookup")
+        print(f"  make_ref:      {1e6 * ref / num:.2f} us/lookup")
+        print(f"  as_color:      {1e6 * color / num:.2f} us/lookup")
+
+    factory = render_test.create_factory()
+    classify_inputs = [(dict(ROUTE_TAGS, **tags), region, {'style': level})
+                       for level, region, tags in render_test.TEST_SYMBOLS]
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for _ in factory.classify(classify_inputs):
+            pass
+    classify = time.perf_counter() - t
+
+    print(f"classify:       {1e6 * classify / num:.1f} us/input")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
@@ -2,12 +2,68 @@
 #
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2020 Sarah Hoffmann
+"""
+Fake shield maker and style for the tests of the factory and everything
+built on top of it.
+"""
 
+import threading
+
+from wmt_shields.common.shield_maker import ShieldMaker
 from wmt_shields.common.tags import Tags
 from wmt_shields.common.config import ShieldConfig
 
-def NullShield(object):
-    pass
+class FakeShield(ShieldMaker):
+    """ Shield with the uuid `<prefix>_<style>_<ref>`. The image is the
+        format string `image`, which may use the fields `uuid`, `format`
+        and `scale`.
+
+        All renders are counted in `FakeShield.renders`. When
+        `FakeShield.release` is set to an event, rendering waits
+        until the event is set.
+    """
+    renders = 0
+    release = None
+    _lock = threading.Lock()
+
+    def __init__(self, prefix, ref, image, config):
+        self.config = config
+        self.prefix = prefix
+        self.ref = ref
+        self.image = image
+        self.uuid_pattern = f'{prefix}_{{}}_{ref}'
+
+    def spec_args(self):
+        return self.prefix, self.ref, self.image
+
+    def _create_image(self, format, scale=1):
+        with FakeShield._lock:
+            FakeShield.renders += 1
+        if FakeShield.release is not None:
+            FakeShield.release.wait(5)
+
+        return self.image.format(uuid=self.uuid(), format=format, scale=scale).encode()
+
+
+class FakeStyle(object):
+    """ Style that creates a `FakeShield` for all tags with a value for
+        `key`. The reference of the shield is the value of the tag or,
+        when given, the result of `ref(value, region)`. `catalogue`
+        is the optional list of tags for the catalogue of the style.
+    """
+
+    def __init__(self, prefix, image='{uuid}', key='ref', ref=None,
+                 name=None, catalogue=None, shield=FakeShield):
+        self.prefix = prefix
+        self.image = image
+        self.key = key
+        self.ref = ref
+        self.name = name or prefix
+        self.catalogue = catalogue
+        self.shield = shield
 
-def create_for(tags: Tags, region: str, config: ShieldConfig):
-    return RefSymbol(ref, config)
+    def create_for(self, tags: Tags, region: str, config: ShieldConfig):
+        value = tags.get(self.key)
+        if value:
+            ref = value if self.ref is None else self.ref(value, region)
+            return self.shield(self.prefix, ref, self.image, config)
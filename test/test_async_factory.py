@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import asyncio
+import threading
+import unittest
+
+from wmt_shields import ShieldFactory, AsyncShieldFactory
+
+from mock_shields import FakeShield, FakeStyle
+
+BLOCKING_STYLE = FakeStyle('blk', '{uuid}.{format}@{scale}')
+
+
+class TestAsyncShieldFactory(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        FakeShield.release = threading.Event()
+        FakeShield.renders = 0
+        self.factory = AsyncShieldFactory(ShieldFactory([BLOCKING_STYLE], {}),
+                                          max_workers=2)
+
+    def tearDown(self):
+        FakeShield.release.set()
+        self.factory.close()
+
+    async def wait_for_renders(self, num):
+        while FakeShield.renders < num:
+            await asyncio.sleep(0.001)
+
+    async def test_no_matching_style(self):
+        self.assertIsNone(await self.factory.create_image({'name' : 'x'}, ''))
+
+    async def test_shared_render(self):
+        tasks = [asyncio.create_task(self.factory.create_image({'ref' : 'A'}, ''))
+                 for _ in range(3)]
+        other = asyncio.create_task(self.factory.create_image({'ref' : 'A'}, '',
+                                                              format='png'))
+        await self.wait_for_renders(2)
+        self.assertEqual(2, self.factory.inflight)
+        FakeShield.release.set()
+
+        self.assertEqual([b'blk_None_A.svg@1'] * 3, await asyncio.gather(*tasks))
+        self.assertEqual(b'blk_None_A.png@1', await other)
+        self.assertEqual(2, FakeShield.renders)
+        self.assertEqual(0, self.factory.inflight)
+
+    async def test_timeout(self):
+        waiting = asyncio.create_task(self.factory.create_image({'ref' : 'A'}, ''))
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.factory.create_image({'ref' : 'A'}, '', timeout=0.01)
+
+        FakeShield.release.set()
+        self.assertEqual(b'blk_None_A.svg@1', await waiting)
+        self.assertEqual(1, FakeShield.renders)
+
+    async def test_cancel(self):
+        cancelled = asyncio.create_task(self.factory.create_image({'ref' : 'A'}, ''))
+        waiting = asyncio.create_task(self.factory.create_image({'ref' : 'A'}, ''))
+        await self.wait_for_renders(1)
+
+        cancelled.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await cancelled
+
+        FakeShield.release.set()
+        self.assertEqual(b'blk_None_A.svg@1', await waiting)
+        self.assertEqual(1, FakeShield.renders)
+
+    async def test_cancel_queued_job(self):
+        busy = [asyncio.create_task(self.factory.create_image({'ref' : r}, ''))
+                for r in 'AB']
+        await self.wait_for_renders(2)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.factory.create_image({'ref' : 'C'}, '', timeout=0.01)
+        # let the cancellation reach the executor
+        await asyncio.sleep(0.01)
+
+        FakeShield.release.set()
+        await asyncio.gather(*busy)
+        self.assertEqual(2, FakeShield.renders)
+        self.assertEqual(0, self.factory.inflight)
@@ -0,0 +1,117 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import unittest
+import tempfile
+
+from wmt_shields import ShieldFactory
+from wmt_shields.common.cache import LRUCache, DirectoryStore, ShieldCache,\
+                                     config_fingerprint
+
+from mock_shields import FakeShield, FakeStyle
+
+COUNTING_STYLE = FakeStyle('count', '<{uuid}>')
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_put(self):
+        c = LRUCache(2)
+        self.assertIsNone(c.get('a'))
+        c.put('a', 1)
+        self.assertEqual(1, c.get('a'))
+        self.assertEqual('x', c.get('b', 'x'))
+
+        self.assertEqual(1, c.hits)
+        self.assertEqual(2, c.misses)
+
+    def test_eviction(self):
+        c = LRUCache(2)
+        c.put('a', 1)
+        c.put('b', 2)
+        c.get('a')
+        c.put('c', 3)
+
+        self.assertIn('a', c)
+        self.assertNotIn('b', c)
+        self.assertIn('c', c)
+        self.assertEqual(1, c.evictions)
+
+
+class TestShieldCache(unittest.TestCase):
+
+    def test_memory_only(self):
+        c = ShieldCache(maxsize=1)
+        c.put('a', b'1')
+        c.put('b', b'2')
+
+        self.assertIsNone(c.get('a'))
+        self.assertEqual(b'2', c.get('b'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 1,
+                          'store_hits': 0, 'size': 1}, c.stats())
+
+    def test_with_store(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            c = ShieldCache(maxsize=1, store=DirectoryStore(tmpdir))
+            c.put('x/a.svg', b'1')
+            c.put('x/b.svg', b'2')
+
+            self.assertEqual(b'1', c.get('x/a.svg'))
+            self.assertEqual(1, c.store_hits)
+            self.assertEqual(1, c.hits)
+            self.assertEqual(0, c.misses)
+
+            c = ShieldCache(maxsize=1, store=DirectoryStore(tmpdir))
+            self.assertEqual(b'2', c.get('x/b.svg'))
+            self.assertIsNone(c.get('x/c.svg'))
+            self.assertEqual(1, c.misses)
+
+
+class TestConfigFingerprint(unittest.TestCase):
+
+    def test_stable(self):
+        class Cfg:
+            a = 1
+            b = (1, 2)
+
+        self.assertEqual(config_fingerprint(Cfg), config_fingerprint(Cfg()))
+        self.assertEqual(config_fingerprint({'a': 1, 'b': (1, 2)}),
+                         config_fingerprint({'b': (1, 2), 'a': 1}))
+
+    def test_changes(self):
+        self.assertNotEqual(config_fingerprint({'a': 1}),
+                            config_fingerprint({'a': 2}))
+        self.assertNotEqual(config_fingerprint({'a': 1}),
+                            config_fingerprint({'a': 1}, seed='x'))
+
+
+class TestFactoryCache(unittest.TestCase):
+
+    def test_repeated_create_image(self):
+        cache = ShieldCache()
+        f = ShieldFactory([COUNTING_STYLE], {}, cache=cache)
+        FakeShield.renders = 0
+
+        img = f.create({'ref': 'A'}, '', style='REG').create_image()
+        self.assertEqual(b'<count_REG_A>', img)
+        self.assertEqual(img, f.create({'ref': 'A'}, '', style='REG').create_image())
+        self.assertEqual(1, FakeShield.renders)
+
+        f.create({'ref': 'A'}, '', style='NAT').create_image()
+        self.assertEqual(2, FakeShield.renders)
+
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+
+    def test_config_change(self):
+        cache = ShieldCache()
+        FakeShield.renders = 0
+
+        f = ShieldFactory([COUNTING_STYLE], {'text_font': 'A'}, cache=cache)
+        f.create({'ref': 'A'}, '').create_image()
+        f = ShieldFactory([COUNTING_STYLE], {'text_font': 'B'}, cache=cache)
+        f.create({'ref': 'A'}, '').create_image()
+
+        self.assertEqual(2, FakeShield.renders)
@@ -0,0 +1,60 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import tempfile
+import unittest
+
+from wmt_shields import ShieldFactory, DirectoryStore
+from wmt_shields.catalogue import catalogue_inputs, build_catalogue
+import wmt_shields.filters as filters
+
+from mock_shields import FakeStyle
+
+CONFIG = {'kct_colors': {'red': (1, 0, 0), 'blue': (0, 0, 1)},
+          'kct_types': {'major', 'learning'},
+          'color_names': {'red': (1, 0, 0)},
+          'style_config': {'REG': {}, 'LOC': {}}}
+
+def lower_letter(letter, region):
+    return letter.lower()
+
+LETTER_STYLE = FakeStyle('letter', key='letter', ref=lower_letter,
+                         catalogue=[{'letter': letter} for letter in 'ABab'])
+
+
+class TestCatalogue(unittest.TestCase):
+
+    def test_inputs_for_all_levels(self):
+        f = ShieldFactory(['.kct_symbol', '.color_box'], CONFIG)
+
+        inputs = catalogue_inputs(f)
+
+        self.assertEqual(2 * (4 + 1), len(inputs))
+        self.assertEqual(({'kct_blue': 'learning'}, '', {'style': 'LOC'}), inputs[0])
+        self.assertEqual(({'colour': 'red'}, '', {'style': 'REG'}), inputs[-1])
+
+    def test_inputs_with_levels_and_regions(self):
+        f = ShieldFactory([filters.tags_all('.color_box', {'route': 'ski'})], CONFIG)
+
+        inputs = catalogue_inputs(f, levels=[None], regions=('', 'it'))
+
+        self.assertEqual([({'colour': 'red', 'route': 'ski'}, '', {}),
+                          ({'colour': 'red', 'route': 'ski'}, 'it', {})], inputs)
+
+    def test_build_catalogue(self):
+        f = ShieldFactory([LETTER_STYLE, '.color_box'], CONFIG)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = DirectoryStore(tmpdir)
+            inputs = [i for i in catalogue_inputs(f) if 'letter' in i[0]]
+            manifest = build_catalogue(f, inputs, store=store, jobs=2)
+
+            self.assertEqual(4, manifest['count'])
+            self.assertEqual(['letter_LOC_a', 'letter_LOC_b', 'letter_REG_a', 'letter_REG_b'],
+                             list(manifest['shields']))
+            self.assertEqual({'style': 'letter', 'tags': {'letter': 'A'},
+                              'region': '', 'settings': {'style': 'LOC'}},
+                             manifest['shields']['letter_LOC_a'])
+            self.assertEqual(b'letter_REG_b', store.get('letter_REG_b.svg'))
@@ -0,0 +1,128 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from wmt_shields import DirectoryStore, PackStore, CompressingStore
+from wmt_shields.common.compress import Compressor, compress
+from wmt_shields.common.config import ShieldConfig
+
+from mock_shields import FakeShield
+
+SVG = b'<?xml version="1.0" ?><svg>' + b'<path d="M 1 1 L 2 2"/>' * 20 + b'</svg>'
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class TestCompress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_gzip_reproducible(self):
+        out = compress(SVG, 'gzip')
+
+        self.assertEqual(SVG, gzip.decompress(out))
+        self.assertEqual(out, compress(SVG, 'gzip'))
+
+    @unittest.skipIf(brotli is None, "brotli not installed")
+    def test_brotli(self):
+        self.assertEqual(SVG, brotli.decompress(compress(SVG, 'br')))
+
+    def test_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            compress(SVG, 'zstd')
+        with self.assertRaises(ValueError):
+            Compressor(('gzip', 'zstd'))
+
+    def test_variants_only_when_smaller(self):
+        with Compressor() as c:
+            self.assertEqual(['gzip'], list(c.variants('a.svg', SVG)))
+            self.assertEqual({}, c.variants('b.svg', b'<a/>'))
+
+            self.assertEqual({'a.svg': {'size': len(SVG), 'gzip': len(compress(SVG, 'gzip'))},
+                              'b.svg': {'size': 4}}, c.metadata)
+
+    def test_to_file(self):
+        fname = str(Path(self.tmpdir.name) / 'fixed.svg')
+        with Compressor(workers=2, root=self.tmpdir.name) as c:
+            FakeShield('fixed', '', SVG.decode(), ShieldConfig({}, {})).to_file(fname, compressor=c)
+            c.write_metadata(fname + '.json')
+
+        with open(fname + '.gz', 'rb') as f:
+            self.assertEqual(SVG, gzip.decompress(f.read()))
+        with open(fname + '.json') as f:
+            meta = json.load(f)
+        self.assertEqual({'gzip': '.gz'}, meta['encodings'])
+        self.assertEqual(len(SVG), meta['shields']['fixed.svg']['size'])
+
+    def test_files_keyed_by_relative_path(self):
+        shield = FakeShield('fixed', '', SVG.decode(), ShieldConfig({}, {}))
+        with Compressor(root=self.tmpdir.name) as c:
+            for sub in ('a', 'b'):
+                (Path(self.tmpdir.name) / sub).mkdir()
+                shield.to_file(str(Path(self.tmpdir.name) / sub / 'x.svg'), compressor=c)
+            c.wait()
+
+        self.assertEqual(['a/x.svg', 'b/x.svg'], sorted(c.metadata_json()['shields']))
+
+    def test_errors_are_raised_by_wait(self):
+        def fail():
+            raise RuntimeError('boom')
+
+        c = Compressor(workers=1)
+        c.submit(fail)
+        with self.assertRaises(RuntimeError):
+            c.wait()
+        c.close()
+
+    def test_close_stops_pool_on_error(self):
+        def fail():
+            raise RuntimeError('boom')
+
+        c = Compressor(workers=1)
+        c.submit(fail)
+        with self.assertRaises(RuntimeError):
+            c.close()
+        with self.assertRaises(RuntimeError):
+            c.submit(fail)
+
+    def test_directory_store(self):
+        store = CompressingStore(DirectoryStore(self.tmpdir.name), workers=2)
+        for i in range(20):
+            store.put(f'{i}.svg', SVG)
+        store.close()
+
+        self.assertEqual(SVG, gzip.decompress(store.get('13.svg.gz')))
+        meta = json.loads(store.get('compressed.json'))
+        self.assertEqual(20, len(meta['shields']))
+
+        # metadata of earlier runs is kept
+        store = CompressingStore(DirectoryStore(self.tmpdir.name))
+        store.put('x.svg', SVG)
+        store.close()
+
+        meta = json.loads(store.get('compressed.json'))
+        self.assertEqual(21, len(meta['shields']))
+
+    def test_pack_store(self):
+        pack = PackStore(Path(self.tmpdir.name) / 'pack')
+        store = CompressingStore(pack, workers=2)
+        store.put('a.svg', SVG)
+        store.close()
+
+        self.assertEqual(['a.svg', 'a.svg.gz', 'compressed.json'], pack.keys())
+        self.assertEqual(SVG, gzip.decompress(pack.get('a.svg.gz')))
+        pack.close()
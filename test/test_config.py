@@ -5,7 +5,7 @@
 
 import unittest
 
-from wmt_shields.common.config import ShieldConfig
+from wmt_shields.common.config import ShieldConfig, compile_config
 
 class TestConfig(unittest.TestCase):
 
@@ -44,3 +44,104 @@ class TestConfig(unittest.TestCase):
         self.assertEqual(3, ShieldConfig({'style' : 'X', 'style_config' : cfg},
                                          {'attr' : 2}).attr)
 
+
+    def test_derived_colors(self):
+        s = ShieldConfig({'osmc_colors': {'red': (1, 0, 0)}}, {})
+
+        self.assertEqual({'red': '#ff0000'}, s.osmc_colors_hex)
+        self.assertIsNone(s.kct_colors_hex)
+
+
+class TestCompiledConfig(unittest.TestCase):
+
+    def test_empty_config(self):
+        s = compile_config({})
+
+        self.assertIsNone(s.style)
+        self.assertIsNone(s.foo)
+
+    def test_config_as_class(self):
+        class SomeConfig:
+            someattr = 34
+
+            def method(self):
+                pass
+
+        self.assertEqual(34, compile_config(SomeConfig).someattr)
+        self.assertEqual(34, compile_config(SomeConfig()).someattr)
+        self.assertIsNone(compile_config(SomeConfig, {'someattr': None}).someattr)
+        self.assertIsNone(compile_config(SomeConfig).method)
+
+    def test_immutable(self):
+        s = compile_config({'attr': 1})
+
+        with self.assertRaises(AttributeError):
+            s.attr = 2
+        with self.assertRaises(AttributeError):
+            s.newattr = 2
+
+    def test_derive(self):
+        s = compile_config({'orig': (1, 2, 3)}, {'extra': 1})
+
+        self.assertEqual((1, 2, 3), s.derive(newattr='something').orig)
+        self.assertEqual(1, s.derive(newattr='something').extra)
+        self.assertEqual('new value', s.derive(orig='new value').orig)
+        self.assertEqual((1, 2, 3), s.orig)
+
+    def test_classes_bounded(self):
+        from wmt_shields.common.config import _compiled_class
+
+        s = compile_config({'orig': 1})
+        for i in range(_compiled_class.cache_info().maxsize + 10):
+            self.assertEqual(i, getattr(s.derive(**{f'x{i}': i, 'l': [i]}), f'x{i}'))
+
+        self.assertEqual(_compiled_class.cache_info().maxsize,
+                         _compiled_class.cache_info().currsize)
+        self.assertIs(type(compile_config({'orig': 1})), type(compile_config({'orig': 2})))
+
+    def test_derive_shared(self):
+        s = compile_config({'orig': 1})
+
+        self.assertIs(s.derive(a=1, b=2), s.derive(b=2, a=1))
+        self.assertIsNot(s.derive(a=1), s.derive(a=2))
+        self.assertIsNot(s.derive(a=1), compile_config({'orig': 1}).derive(a=1))
+        self.assertEqual([1], s.derive(a=[1]).a)
+
+    def test_attribute_from_style(self):
+        cfg = {'X': {'attr': 3}}
+
+        self.assertEqual(2, compile_config({'style': 'X'}, {'attr': 2}).attr)
+        self.assertEqual(3, compile_config({'style': 'X', 'style_config': cfg},
+                                           {'attr': 2}).attr)
+        self.assertEqual(3, compile_config({'style_config': cfg},
+                                           {'style': 'X'}).attr)
+        self.assertEqual(2, compile_config({'style': 'Y', 'style_config': cfg},
+                                           {'attr': 2}).attr)
+
+    def test_same_as_shield_config(self):
+        cfg = {'style': 'X', 'a': 1, 'b': 2,
+               'style_config': {'X': {'b': 3, 'c': 4}}}
+        extra = {'a': 5, 'd': 6}
+        orig = ShieldConfig(cfg, extra)
+        compiled = compile_config(orig)
+
+        for attr in ('style', 'a', 'b', 'c', 'd', 'e'):
+            self.assertEqual(getattr(orig, attr), getattr(compiled, attr))
+            self.assertEqual(getattr(orig, attr),
+                             getattr(compile_config(cfg, extra), attr))
+
+    def test_sets_and_derived_settings(self):
+        s = compile_config({'jel_types': ('a', 'b'),
+                            'kct_colors': {'red': (1, 0, 0), 'blue': (0, 0, 1)}})
+
+        self.assertEqual(frozenset(('a', 'b')), s.jel_types)
+        self.assertIsNone(s.kct_types)
+        self.assertEqual({'red': '#ff0000', 'blue': '#0000ff'}, s.kct_colors_hex)
+        self.assertIsNone(s.osmc_colors_hex)
+
+    def test_snapshot(self):
+        orig = {'attr': 1}
+        s = compile_config(orig)
+        orig['attr'] = 2
+
+        self.assertEqual(1, s.attr)
@@ -0,0 +1,99 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import unittest
+
+import cairo
+
+from wmt_shields.common.geometry import record_geometry
+from wmt_shields.styles.osmc_symbol import ForegroundImage, SvgImage,\
+                                          BackgroundImage
+
+import render_test
+
+SIZE = 64
+
+def draw(func, w=1, h=1):
+    """ Draw with `func` on a surface with unit coordinates and return
+        the pixel data.
+    """
+    surface = cairo.ImageSurface(cairo.FORMAT_A8, SIZE, SIZE)
+    ctx = cairo.Context(surface)
+    ctx.scale(SIZE / w, SIZE / h)
+    func(ctx)
+    surface.flush()
+
+    return bytes(surface.get_data())
+
+
+class TestGeometry(unittest.TestCase):
+
+    def assert_same_image(self, expected, result):
+        diff = sum(abs(a - b) for a, b in zip(expected, result))
+        self.assertLess(diff / len(expected), 1.0)
+        self.assertGreater(sum(result), 0)
+
+    def test_replay_stroke_and_fill(self):
+        def painter(ctx):
+            ctx.rectangle(0.1, 0.1, 0.3, 0.3)
+            ctx.fill()
+            ctx.set_line_width(0.1)
+            ctx.move_to(0.5, 0.5)
+            ctx.line_to(0.9, 0.9)
+            ctx.stroke()
+
+        geom = record_geometry(painter)
+
+        self.assertEqual(['fill', 'stroke'], [op[0] for op in geom.ops])
+        self.assertAlmostEqual(0.1, geom.ops[1][2])
+        self.assertIsNone(geom.path)
+        self.assert_same_image(draw(painter), draw(geom.replay))
+
+    def test_open_path(self):
+        def painter(ctx):
+            ctx.rectangle(0.1, 0.1, 0.3, 0.3)
+
+        geom = record_geometry(painter)
+
+        self.assertEqual([], geom.ops)
+        self.assertIsNotNone(geom.path)
+
+        def fill_replay(ctx):
+            geom.replay(ctx)
+            ctx.fill()
+
+        self.assert_same_image(draw(lambda c: (painter(c), c.fill())),
+                               draw(fill_replay))
+
+    def test_all_osmc_foregrounds(self):
+        for name in render_test.OSMC_FOREGROUNDS:
+            symbol = name[1:]
+            if SvgImage.has_symbol(symbol):
+                continue
+            with self.subTest(symbol=symbol):
+                self.assertTrue(ForegroundImage.has_symbol(symbol))
+                fg = ForegroundImage(None, symbol)
+                painter = getattr(fg, '_paint_' + symbol)
+
+                def direct(ctx):
+                    ctx.set_line_width(0.3)
+                    painter(ctx)
+
+                geom = record_geometry(painter, line_width=0.3)
+                self.assert_same_image(draw(direct), draw(geom.replay))
+
+    def test_all_osmc_backgrounds(self):
+        for name in render_test.OSMC_BACKGROUNDS:
+            symbol = name[1:]
+            if not symbol:
+                continue
+            for w, h in ((16, 16), (22, 16)):
+                with self.subTest(symbol=symbol, w=w, h=h):
+                    bg = BackgroundImage('red', symbol)
+                    painter = getattr(bg, '_paint_' + symbol)
+                    geom = record_geometry(painter, w, h, None)
+                    if geom.ops:
+                        self.assert_same_image(draw(lambda c: painter(c, w, h, None), w, h),
+                                               draw(geom.replay, w, h))
@@ -0,0 +1,55 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import unittest
+
+from wmt_shields.styles.osmc_symbol import parse_osmc_symbol, OsmcSpec, EMPTY_SPEC
+
+COLORS = frozenset(('black', 'white', 'red', 'blue', 'yellow'))
+
+class TestOsmcSpec(unittest.TestCase):
+
+    def test_background_only(self):
+        self.assertEqual(OsmcSpec(('red', None)), parse_osmc_symbol('red:red', COLORS))
+        self.assertEqual(OsmcSpec(('red', 'frame')),
+                         parse_osmc_symbol('red:red_frame', COLORS))
+        self.assertEqual(OsmcSpec(('red', None)),
+                         parse_osmc_symbol('red:red_nonsense', COLORS))
+        self.assertEqual(EMPTY_SPEC, parse_osmc_symbol('red:pink', COLORS))
+
+    def test_default_foreground_colors(self):
+        spec = parse_osmc_symbol('blue:white:shell', COLORS)
+        self.assertEqual(((False, 'yellow', 'shell'),), spec.foregrounds)
+
+        spec = parse_osmc_symbol('blue:white:hiker', COLORS)
+        self.assertEqual(((True, 'black', 'hiker'),), spec.foregrounds)
+
+        spec = parse_osmc_symbol('blue:white:pink_bar', COLORS)
+        self.assertEqual(((False, 'black', 'bar'),), spec.foregrounds)
+
+    def test_red_diamond(self):
+        spec = parse_osmc_symbol('red:white:blue_red_diamond', COLORS)
+        self.assertEqual(((False, 'blue', 'diamond'), (False, 'red', 'diamond_right')),
+                         spec.foregrounds)
+
+    def test_ref(self):
+        self.assertEqual(OsmcSpec(('white', None), (), 'A1', 'black'),
+                         parse_osmc_symbol('red:white::A1', COLORS))
+        self.assertEqual(OsmcSpec(('white', None), (), 'A1', 'red'),
+                         parse_osmc_symbol('red:white::A1:red', COLORS))
+        self.assertEqual(OsmcSpec(('white', None), ((False, 'red', 'bar'),), 'A1', 'blue'),
+                         parse_osmc_symbol('red:white:red_bar::A1:blue', COLORS))
+
+    def test_ref_too_long(self):
+        self.assertEqual(OsmcSpec(('white', 'stripe')),
+                         parse_osmc_symbol('red:white_stripe::A', COLORS))
+        self.assertEqual('', parse_osmc_symbol('red:white::ABCDE', COLORS).ref)
+
+    def test_equivalent_symbols(self):
+        spec = parse_osmc_symbol('red:white:red_bar', COLORS)
+
+        self.assertIs(spec, parse_osmc_symbol('red:white:red_bar', COLORS))
+        self.assertEqual(spec, parse_osmc_symbol(' blue : white : red_bar ', COLORS))
+        self.assertEqual(hash(spec), hash(parse_osmc_symbol('green:white:red_bar', COLORS)))
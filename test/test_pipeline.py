@@ -0,0 +1,101 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from wmt_shields import ShieldFactory, DirectoryStore, PackStore, UuidManifest
+from wmt_shields.pipeline import Pipeline, shield_pipeline, sqlite_source,\
+                                 db_source, row_to_input
+
+from mock_shields import FakeStyle
+
+REF_STYLE = FakeStyle('ref', '<{uuid}/>')
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = str(Path(self.tmpdir.name) / 'routes.db')
+        conn = sqlite3.connect(self.db)
+        conn.execute('CREATE TABLE routes (tags TEXT, region TEXT, extra TEXT)')
+        rows = [(json.dumps({'ref': str(i % 50)}), 'de', None) for i in range(500)]
+        rows.append((json.dumps({'name': 'x'}), None, None))
+        rows.append((json.dumps({'ref': '1'}), 'de', json.dumps({'style': 'REG'})))
+        conn.executemany('INSERT INTO routes VALUES (?, ?, ?)', rows)
+        conn.commit()
+        conn.close()
+
+        self.factory = ShieldFactory([REF_STYLE], {})
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def source(self, query='SELECT tags, region, extra FROM routes'):
+        return sqlite_source(self.db, query, batch_size=64)
+
+    def test_sequential_to_directory(self):
+        store = DirectoryStore(Path(self.tmpdir.name) / 'out')
+
+        stats = shield_pipeline(self.factory, self.source(), store, queue_size=8)
+
+        self.assertEqual(['source', 'classify', 'render', 'sink'],
+                         [s.name for s in stats])
+        self.assertEqual([502, 51, 51, 51], [s.items for s in stats])
+        self.assertEqual(b'<ref_None_7/>', store.get('ref_None_7.svg'))
+        self.assertEqual(b'<ref_REG_1/>', store.get('ref_REG_1.svg'))
+
+    def test_parallel_to_pack(self):
+        store = PackStore(Path(self.tmpdir.name) / 'pack')
+
+        stats = shield_pipeline(self.factory, self.source(), store, jobs=2)
+
+        self.assertEqual(51, stats[-1].items)
+        self.assertEqual(51, len(store))
+        self.assertEqual(b'<ref_None_49/>', store.get('ref_None_49.svg'))
+
+    def test_manifest(self):
+        store = DirectoryStore(Path(self.tmpdir.name) / 'out')
+        manifest = UuidManifest(Path(self.tmpdir.name) / 'manifest')
+
+        shield_pipeline(self.factory,
+                        self.source('SELECT tags, region FROM routes WHERE rowid < 10'),
+                        store, manifest=manifest)
+        stats = shield_pipeline(self.factory, self.source(), store,
+                                manifest=UuidManifest(manifest.filename))
+
+        self.assertEqual(51 - 9, stats[-1].items)
+
+    def test_db_source(self):
+        conn = sqlite3.connect(self.db)
+        source = db_source(conn.cursor(), 'SELECT tags, region FROM routes WHERE rowid = ?',
+                           (501, ))
+
+        self.assertEqual([({'name': 'x'}, '', {})], list(source()))
+        conn.close()
+
+    def test_row_to_input(self):
+        self.assertEqual(({'a': 'b'}, 'x', {'style': 'A'}),
+                         row_to_input(({'a': 'b'}, 'x', {'style': 'A'})))
+        self.assertEqual(({'a': 'b'}, '', {}), row_to_input(('{"a": "b"}', None)))
+
+    def test_failing_stage(self):
+        def fail(items):
+            for i, item in enumerate(items):
+                if i == 10:
+                    raise ValueError('broken')
+                yield item
+
+        pipeline = Pipeline(queue_size=2)
+        pipeline.add('source', lambda: iter(range(10000)))
+        pipeline.add('fail', fail)
+        pipeline.add('sink', lambda items: (i for i in items))
+
+        with self.assertRaisesRegex(ValueError, 'broken'):
+            pipeline.run()
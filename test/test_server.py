@@ -0,0 +1,186 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import io
+import os
+import operator
+import json
+import asyncio
+import contextlib
+import tempfile
+import unittest
+
+from wmt_shields import ShieldFactory, ShieldCache, DirectoryStore
+from wmt_shields.server import ShieldServer
+
+from mock_shields import FakeShield, FakeStyle
+
+COUNTING_STYLE = FakeStyle('cnt', '{uuid}@{scale}.{format}', ref=operator.add)
+
+
+class TestShieldServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        FakeShield.renders = 0
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = DirectoryStore(self.tmpdir.name)
+        self.server = await self.start_server()
+
+    async def asyncTearDown(self):
+        for srv, shield_server in self.servers:
+            srv.close()
+            await srv.wait_closed()
+            shield_server.close()
+        self.tmpdir.cleanup()
+
+    async def start_server(self, styles=(COUNTING_STYLE, ), config=None):
+        if not hasattr(self, 'servers'):
+            self.servers = []
+        shield_server = ShieldServer(ShieldFactory(styles, config or {}),
+                                     ShieldCache(10, self.store))
+        srv = await shield_server.start('127.0.0.1', 0)
+        self.servers.append((srv, shield_server))
+        return srv
+
+    def etag(self, key, server=0):
+        return f'"{self.servers[server][1].fingerprint}-{key}"'
+
+    async def request(self, path, headers=None, server=None):
+        port = (server or self.server).sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        req = f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        for k, v in (headers or {}).items():
+            req += f"{k}: {v}\r\n"
+        writer.write((req + "\r\n").encode())
+        response = await reader.read()
+        writer.close()
+
+        head, _, body = response.partition(b'\r\n\r\n')
+        lines = head.decode().split('\r\n')
+        resp_headers = dict(l.split(': ', 1) for l in lines[1:])
+
+        return int(lines[0].split()[1]), resp_headers, body
+
+    async def test_render_from_query(self):
+        status, headers, body = await self.request('/shield?ref=A&region=x&style=LOC')
+
+        self.assertEqual(200, status)
+        self.assertEqual(b'cnt_LOC_Ax@1.svg', body)
+        self.assertEqual(self.etag('cnt_LOC_Ax.svg'), headers['ETag'])
+        self.assertEqual('image/svg+xml', headers['Content-Type'])
+
+        status, headers, body = await self.request('/shield?ref=A&region=x&style=LOC')
+        self.assertEqual(200, status)
+        self.assertEqual(1, FakeShield.renders)
+
+        status, headers, body = await self.request('/shield?ref=A&format=png&scale=2')
+        self.assertEqual(b'cnt_None_A@2.png', body)
+        self.assertEqual('image/png', headers['Content-Type'])
+        self.assertEqual(self.etag('cnt_None_A@2x.png'), headers['ETag'])
+
+    async def test_bad_requests(self):
+        self.assertEqual(404, (await self.request('/shield?name=A'))[0])
+        self.assertEqual(400, (await self.request('/shield?ref=A&format=gif'))[0])
+        self.assertEqual(400, (await self.request('/shield?ref=A&scale=x'))[0])
+        self.assertEqual(404, (await self.request('/foo'))[0])
+        self.assertEqual(404, (await self.request('/shield/..%2Fx.svg'))[0])
+
+    async def test_conditional_request(self):
+        status, headers, body = await self.request('/shield?ref=A',
+                                                   {'If-None-Match': self.etag('cnt_None_A.svg')})
+
+        self.assertEqual(304, status)
+        self.assertEqual(b'', body)
+        self.assertEqual(self.etag('cnt_None_A.svg'), headers['ETag'])
+        self.assertEqual(0, FakeShield.renders)
+
+        # other formats of the same shield have their own ETag
+        status, _, _ = await self.request('/shield?ref=A&format=png&scale=2',
+                                          {'If-None-Match': self.etag('cnt_None_A.svg')})
+        self.assertEqual(200, status)
+        status, _, _ = await self.request('/shield/cnt_None_A@2x.png',
+                                          {'If-None-Match': self.etag('cnt_None_A@2x.png')})
+        self.assertEqual(304, status)
+
+        status, _, _ = await self.request('/shield?ref=A',
+                                          {'If-None-Match': '"other", "foo"'})
+        self.assertEqual(200, status)
+
+        # a changed configuration invalidates the ETags
+        server = await self.start_server(config={'text_font': 'other'})
+        self.assertNotEqual(self.etag('cnt_None_A.svg'), self.etag('cnt_None_A.svg', 1))
+        status, headers, _ = await self.request('/shield?ref=A', server=server,
+                                                headers={'If-None-Match': self.etag('cnt_None_A.svg')})
+        self.assertEqual(200, status)
+        self.assertEqual(self.etag('cnt_None_A.svg', 1), headers['ETag'])
+
+    async def test_errors_are_answered(self):
+        class BrokenStyle(object):
+            @staticmethod
+            def create_for(tags, region, config):
+                raise RuntimeError('broken style')
+
+        server = await self.start_server(styles=[BrokenStyle])
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            status, _, _ = await self.request('/shield?ref=A', server=server)
+        self.assertEqual(500, status)
+
+        status, _, body = await self.request('/metrics', server=server)
+        metrics = json.loads(body)
+        self.assertEqual({'500': 1}, metrics['status'])
+        self.assertEqual(1, metrics['routes']['error']['requests'])
+
+    async def test_lookup_by_uuid(self):
+        self.assertEqual(404, (await self.request('/shield/cnt_None_A.svg'))[0])
+
+        await self.request('/shield?ref=A')
+        await self.request('/shield?ref=A&format=png&scale=2')
+
+        status, headers, body = await self.request('/shield/cnt_None_A.svg')
+        self.assertEqual(200, status)
+        self.assertEqual(b'cnt_None_A@1.svg', body)
+        self.assertEqual(self.etag('cnt_None_A.svg'), headers['ETag'])
+
+        status, _, body = await self.request('/shield/cnt_None_A@2x.png')
+        self.assertEqual(200, status)
+        self.assertEqual(b'cnt_None_A@2.png', body)
+
+        # second server only knows the shield from the store
+        server = await self.start_server()
+        status, _, body = await self.request('/shield/cnt_None_A.svg', server=server)
+        self.assertEqual(200, status)
+        self.assertEqual(b'cnt_None_A@1.svg', body)
+        self.assertEqual(2, FakeShield.renders)
+
+    async def test_keep_alive(self):
+        port = self.server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+        for ref in 'AB':
+            writer.write(f"GET /shield?ref={ref} HTTP/1.1\r\n\r\n".encode())
+            status = await reader.readline()
+            self.assertEqual(b'HTTP/1.1 200 OK\r\n', status)
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+            self.assertEqual(f'cnt_None_{ref}@1.svg'.encode(),
+                             await reader.readexactly(length))
+
+        writer.close()
+
+    async def test_metrics(self):
+        await self.request('/shield?ref=A')
+        await self.request('/shield?ref=A')
+        await self.request('/shield/cnt_None_B.svg')
+
+        status, headers, body = await self.request('/metrics')
+
+        self.assertEqual(200, status)
+        metrics = json.loads(body)
+        self.assertEqual(2, metrics['routes']['render']['requests'])
+        self.assertEqual(1, metrics['routes']['uuid']['requests'])
+        self.assertEqual({'200': 2, '404': 1}, metrics['status'])
+        self.assertEqual(1, metrics['cache']['hits'])
+        self.assertEqual(os.getpid(), metrics['pid'])
@@ -3,13 +3,24 @@
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
+import os
+import sys
+import pickle
 import unittest
+import tempfile
+import subprocess
 from pathlib import Path
 
-from wmt_shields.common.shield_maker import load_shield_maker, ShieldMaker
+from wmt_shields.common.shield_maker import load_shield_maker, ShieldMaker, ShieldSpec,\
+                                            SvgTemplate
+from wmt_shields.common.text import text_metrics
 from wmt_shields.common.config import ShieldConfig
 from wmt_shields.common.tags import Tags
-from wmt_shields import ShieldFactory
+from wmt_shields import ShieldFactory, UuidManifest
+import wmt_shields.filters as filters
+from wmt_shields.wmt_config import WmtConfig
+
+from mock_shields import FakeShield, FakeStyle
 from wmt_shields.styles.ref_symbol import RefSymbol
 
 test_dir = Path(__file__).parent.resolve()
@@ -30,7 +41,7 @@ class TestLoadShields(unittest.TestCase):
 
     def test_load_external(self):
         f = load_shield_maker('mock_shields')
-        self.assertTrue(hasattr(f, 'NullShield'))
+        self.assertTrue(hasattr(f, 'FakeShield'))
 
     def test_load_class(self):
         f = load_shield_maker(Dummy())
@@ -61,6 +72,21 @@ class TestBaseShieldMaker(unittest.TestCase):
 
         self.assertEqual("X+None", TestShield().uuid())
 
+    def test_svg_template_locks_per_handle(self):
+        class Handle:
+            width = 12
+
+            def render_cairo(self, ctx):
+                ctx.append(locked.lock.locked())
+
+        locked = SvgTemplate(Handle())
+        other = SvgTemplate(Handle())
+        ctx = []
+        with other.lock:
+            locked.render_cairo(ctx)
+        self.assertEqual([True], ctx)
+        self.assertEqual(12, locked.width)
+
     def test_dimensions(self):
         class TestShield(ShieldMaker):
             def __init__(self):
@@ -140,3 +166,254 @@ class TestShieldFactory(unittest.TestCase):
         s = f.create({'name' : 'x', 'ref' : '5'}, '')
         self.assertIsInstance(s, RefFactory)
 
+    def test_config_cache_drops_least_recently_used(self):
+        class SmallFactory(ShieldFactory):
+            MAX_COMPILED_CONFIGS = 2
+
+        f = SmallFactory([RefFactory()], NullConfig())
+
+        config = f.get_config(style='A')
+        f.get_config(style='B')
+        f.get_config(style='A')
+        f.get_config(style='C')
+
+        self.assertIn((('style', 'A'), ), f._configs)
+        self.assertNotIn((('style', 'B'), ), f._configs)
+        self.assertIs(config, f.get_config(style='A'))
+
+
+class KeyedFactory(object):
+    """ Matches everything but only declares some keys.
+    """
+    calls = 0
+    dispatch_keys = ('ref', 'kct_*')
+    dispatch_regions = ('it', )
+
+    @staticmethod
+    def create_for(tags: Tags, region: str, config: ShieldConfig):
+        KeyedFactory.calls += 1
+        return KeyedFactory()
+
+class TestDispatch(unittest.TestCase):
+
+    def test_undeclared_always_tried(self):
+        f = ShieldFactory([NameFactory(), KeyedFactory, RefFactory()], NullConfig())
+
+        self.assertIsInstance(f.create({'name' : 'x', 'ref' : '1'}, 'it'),
+                              NameFactory)
+        self.assertIsInstance(f.create({'ref' : '1'}, 'it'), KeyedFactory)
+        self.assertIsInstance(f.create({'ref' : '1'}, 'de'), RefFactory)
+
+    def test_skip_by_key(self):
+        f = ShieldFactory([KeyedFactory], NullConfig())
+        KeyedFactory.calls = 0
+
+        self.assertIsNone(f.create({'name' : 'x'}, 'it'))
+        self.assertIsNone(f.create({'kct_foo' : 'x'}, 'fr'))
+        self.assertEqual(0, KeyedFactory.calls)
+
+        self.assertIsNotNone(f.create({'kct_foo' : 'x'}, 'it'))
+        self.assertIsNotNone(f.create({'ref' : 'x', 'name' : 'y'}, 'it'))
+        self.assertEqual(2, KeyedFactory.calls)
+
+    def test_dynamic_declaration(self):
+        class DynFactory(KeyedFactory):
+            def dispatch_keys(config):
+                return config.keys
+            dispatch_regions = None
+
+        f = ShieldFactory([DynFactory], {'keys' : ('foo', )})
+
+        self.assertIsNone(f.create({'ref' : 'x'}, ''))
+        self.assertIsNotNone(f.create({'foo' : 'x'}, ''))
+        self.assertIsNotNone(f.create({'ref' : 'x'}, '', keys=('ref', )))
+
+    def test_shield_names_per_call(self):
+        f = ShieldFactory(['.image_symbol'],
+                          {'style_config': {'REG': {'shield_names': {'b': {'network': 'b'}}}}})
+        names = {'a': {'operator': 'a'}}
+
+        self.assertIsNone(f.create({'operator': 'a'}, ''))
+        self.assertEqual('shield_None_a',
+                         f.create({'operator': 'a'}, '', shield_names=names).uuid())
+        self.assertEqual('shield_REG_b', f.create({'network': 'b'}, '', style='REG').uuid())
+
+
+IMAGE_STYLE = FakeStyle('img')
+
+class TestRenderMany(unittest.TestCase):
+
+    INPUTS = [({'ref' : 'A'}, '', {}),
+              ({'ref' : 'B'}, '', {'style' : 'REG'}),
+              ({'name' : 'x'}, '', {}),
+              ({'ref' : 'A'}, '', None),
+              ({'ref' : 'A'}, '', {'style' : 'REG'})]
+
+    EXPECTED = [('img_None_A', b'img_None_A'),
+                ('img_REG_B', b'img_REG_B'),
+                ('img_REG_A', b'img_REG_A')]
+
+    def test_render_many_sequential(self):
+        f = ShieldFactory([IMAGE_STYLE], NullConfig())
+
+        self.assertEqual(self.EXPECTED, list(f.render_many(self.INPUTS)))
+
+    def test_render_many_parallel(self):
+        f = ShieldFactory([IMAGE_STYLE], NullConfig())
+
+        self.assertCountEqual(self.EXPECTED,
+                              list(f.render_many(iter(self.INPUTS), jobs=2)))
+
+
+class SpecShield(FakeShield):
+    """ Shield with a different image when it is recreated from a spec.
+    """
+    def spec_args(self):
+        return self.prefix, self.ref, '{uuid}:spec'
+
+SPEC_STYLE = FakeStyle('spec', '{uuid}:tags', shield=SpecShield)
+
+
+class TestShieldSpec(unittest.TestCase):
+
+    def test_spec_roundtrip(self):
+        f = ShieldFactory(['.osmc_symbol', '.ref_symbol'], WmtConfig())
+
+        for tags in ({'ref': 'A 1'}, {'osmc:symbol': 'red:white:red_bar:B:black'}):
+            shield = f.create(tags, '', style='REG')
+            spec = f.create_spec(tags, '', style='REG')
+
+            self.assertIsInstance(spec, ShieldSpec)
+            self.assertEqual((('style', 'REG'), ), spec.kwargs)
+            data = pickle.dumps(spec)
+            self.assertNotIn(b'osmc_colors', data)
+            self.assertEqual(shield.uuid(), f.create_from_spec(pickle.loads(data)).uuid())
+
+        self.assertIsNone(f.create_spec({'foo': 'x'}, ''))
+
+    def test_spec_not_supported(self):
+        class PlainShield(ShieldMaker):
+            def __init__(self, config):
+                self.config = config
+                self.uuid_pattern = 'plain_{}'
+
+            def _create_image(self, format, scale=1):
+                return self.uuid().encode()
+
+        class PlainStyle(object):
+            @staticmethod
+            def create_for(tags: Tags, region: str, config: ShieldConfig):
+                return PlainShield(config)
+
+        f = ShieldFactory([PlainStyle], NullConfig())
+
+        self.assertIsNone(f.create_spec({'ref': 'A'}, ''))
+        self.assertEqual([('plain_None', b'plain_None')],
+                         list(f.render_many([({'ref': 'A'}, '', {})], jobs=2)))
+
+    def test_spec_keeps_derived_config(self):
+        f = ShieldFactory(['.cai_hiking_symbol'], WmtConfig())
+        tags = {'osmc:symbol': 'red:red:white_bar:123:black'}
+
+        shield = f.create(tags, 'it')
+        copy = f.create_from_spec(pickle.loads(pickle.dumps(f.create_spec(tags, 'it'))))
+
+        self.assertEqual((1., 1., 1.), shield.config.border_color)
+        self.assertEqual(shield.config.border_color, copy.config.border_color)
+        self.assertEqual(shield.uuid(), copy.uuid())
+
+    def test_specs_are_hashable(self):
+        f = ShieldFactory(['.nordic_symbol', '.color_box'], WmtConfig())
+
+        specs = {f.create_spec({'colour': 'red'}, ''),
+                 f.create_spec({'colour': 'red', 'piste:type': 'nordic'}, ''),
+                 f.create_spec({'colour': 'red'}, '')}
+
+        self.assertEqual(2, len(specs))
+
+    def test_render_many_sends_specs(self):
+        f = ShieldFactory([SPEC_STYLE, IMAGE_STYLE], NullConfig())
+        inputs = [({'ref': 'A'}, '', {'style': 'LOC'}), ({'ref': 'A'}, '', {})]
+
+        self.assertCountEqual([('spec_LOC_A', b'spec_LOC_A:spec'),
+                               ('spec_None_A', b'spec_None_A:spec')],
+                              list(f.render_many(inputs, jobs=2)))
+        self.assertEqual([('spec_None_A', b'spec_None_A:tags')],
+                         list(f.render_many(inputs[1:])))
+
+
+class TestClassify(unittest.TestCase):
+
+    def test_classify(self):
+        f = ShieldFactory([IMAGE_STYLE, '.color_box'], NullConfig())
+
+        self.assertEqual([('img', 'img_None_A'),
+                          ('img', 'img_REG_B'),
+                          (None, None),
+                          ('img', 'img_None_A'),
+                          ('img', 'img_REG_A')],
+                         list(f.classify(iter(TestRenderMany.INPUTS))))
+
+    def test_classify_without_text_layout(self):
+        f = ShieldFactory(['.ref_symbol'], WmtConfig())
+        before = text_metrics.cache_info()
+
+        result = list(f.classify([({'ref' : 'XYZ'}, '', {})]))
+
+        self.assertEqual([('ref_symbol', 'ref_None_00580059005a')], result)
+        self.assertEqual(before, text_metrics.cache_info())
+
+    def test_classify_without_graphics(self):
+        code = """
+import sys
+from wmt_shields import ShieldFactory, ShieldCache, PackStore
+from wmt_shields.wmt_config import WmtConfig, WMT_STYLES
+f = ShieldFactory(WMT_STYLES, WmtConfig())
+list(f.classify([({'ref': 'A1'}, '', {}), ({'osmc:symbol': 'red:white:red_bar'}, '', {})]))
+print(' '.join(m for m in ('cairo', 'gi', 'asyncio') if m in sys.modules))
+"""
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        proc = subprocess.run([sys.executable, '-c', code], env=env,
+                              capture_output=True, text=True, check=True)
+
+        self.assertEqual('', proc.stdout.strip())
+
+    def test_style_name_of_filter(self):
+        f = ShieldFactory([filters.tags_all('.ref_symbol', {'a': 'b'})], {})
+
+        self.assertEqual(['ref_symbol'], f.style_names)
+
+    def test_new_shields(self):
+        f = ShieldFactory([IMAGE_STYLE], NullConfig())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = Path(tmpdir) / 'manifest'
+            with UuidManifest(fname, 'fp1') as manifest:
+                new = list(f.new_shields(TestRenderMany.INPUTS[:2], manifest))
+
+            self.assertEqual([('img', 'img_None_A', TestRenderMany.INPUTS[0]),
+                              ('img', 'img_REG_B', TestRenderMany.INPUTS[1])],
+                             new)
+
+            with UuidManifest(fname, 'fp1') as manifest:
+                self.assertEqual(2, len(manifest))
+                new = list(f.new_shields(TestRenderMany.INPUTS, manifest))
+
+            self.assertEqual([('img', 'img_REG_A', TestRenderMany.INPUTS[4])],
+                             new)
+            self.assertEqual(3, len(UuidManifest(fname, 'fp1')))
+
+            # changed configuration invalidates the manifest
+            self.assertEqual(0, len(UuidManifest(fname, 'fp2')))
+
+    def test_manifest_not_saved_on_error(self):
+        f = ShieldFactory([IMAGE_STYLE], NullConfig())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fname = Path(tmpdir) / 'manifest'
+            with self.assertRaises(RuntimeError):
+                with UuidManifest(fname) as manifest:
+                    list(f.new_shields(TestRenderMany.INPUTS, manifest))
+                    raise RuntimeError('rendering failed')
+
+            self.assertEqual(0, len(UuidManifest(fname)))
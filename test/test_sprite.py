@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import unittest
+import json
+import tempfile
+from pathlib import Path
+
+from wmt_shields import ShieldFactory
+from wmt_shields.sprite import ShelfPacker, SpriteSheet
+from wmt_shields.wmt_config import WmtConfig
+
+class TestShelfPacker(unittest.TestCase):
+
+    def test_insert(self):
+        p = ShelfPacker(30, 20)
+
+        self.assertEqual((0, 0), p.insert(10, 10))
+        self.assertEqual((10, 0), p.insert(15, 8))
+        self.assertEqual((0, 10), p.insert(10, 6))
+        self.assertEqual((10, 10), p.insert(20, 5))
+        self.assertEqual((25, 0), p.insert(5, 5))
+        self.assertIsNone(p.insert(31, 1))
+        self.assertIsNone(p.insert(5, 7))
+
+    def test_padding(self):
+        p = ShelfPacker(30, 20, padding=2)
+
+        self.assertEqual((0, 0), p.insert(10, 10))
+        self.assertEqual((12, 0), p.insert(10, 10))
+        self.assertEqual((0, 12), p.insert(10, 6))
+
+    def test_occupy(self):
+        p = ShelfPacker(30, 20)
+        placed = [(10, 10), (15, 8), (10, 6), (20, 5), (5, 5)]
+        positions = [p.insert(*dim) for dim in placed]
+
+        restored = ShelfPacker(30, 20)
+        for (x, y), (w, h) in sorted(zip(positions, placed), key=lambda e: e[0][::-1]):
+            restored.occupy(x, y, w, h)
+
+        self.assertEqual(p.shelves, restored.shelves)
+        self.assertEqual(p.bottom, restored.bottom)
+
+
+class TestSpriteSheet(unittest.TestCase):
+
+    def test_write_and_append(self):
+        f = ShieldFactory(['.ref_symbol'], WmtConfig)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            basename = str(Path(tmpdir) / 'sprite')
+            sheet = SpriteSheet(pixel_ratio=2, max_width=64, max_height=64)
+            sheet.add_from(f, [({'ref' : 'A'}, '', {}),
+                               ({'ref' : 'WWWWW'}, '', {}),
+                               ({'ref' : 'A'}, '', {})])
+            self.assertEqual(2, len(sheet))
+            sheet.write(basename)
+
+            with open(basename + '@2x.json') as fd:
+                index = json.load(fd)
+            self.assertEqual({'ref_None_0041', 'ref_None_00570057005700570057'},
+                             set(index))
+            self.assertEqual(2, index['ref_None_0041']['pixelRatio'])
+
+            sheet = SpriteSheet.load(basename, pixel_ratio=2,
+                                     max_width=64, max_height=64)
+            self.assertIn('ref_None_0041', sheet)
+            entry = sheet.add(f.create({'ref' : 'B'}, ''))
+            sheet.write(basename)
+
+            with open(basename + '@2x.json') as fd:
+                new_index = json.load(fd)
+            for uuid, old_entry in index.items():
+                self.assertEqual(old_entry, new_index[uuid])
+            self.assertEqual(entry, new_index['ref_None_0042'])
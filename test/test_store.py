@@ -0,0 +1,222 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from wmt_shields import PackStore, ShieldCache
+from wmt_shields.store import main as store_main
+
+class TestPackStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'shields'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_put_get(self):
+        store = PackStore(self.path)
+
+        self.assertIsNone(store.get('a.svg'))
+        store.put('a.svg', b'<svg>A</svg>')
+        store.put('b.svg', b'<svg>B</svg>')
+
+        data = store.get('a.svg')
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(b'<svg>A</svg>', data)
+        self.assertEqual(b'<svg>B</svg>', store.get('b.svg'))
+        self.assertIn('b.svg', store)
+        self.assertEqual(2, len(store))
+
+    def test_persistence(self):
+        store = PackStore(self.path)
+        store.put('a.svg', b'A')
+        store.flush_index()
+        store.put('b.svg', b'B')
+        store.close()
+
+        store = PackStore(self.path)
+        self.assertEqual(b'A', store.get('a.svg'))
+        self.assertEqual(b'B', store.get('b.svg'))
+        self.assertEqual(['a.svg', 'b.svg'], store.keys())
+
+    def test_index_lookup(self):
+        store = PackStore(self.path)
+        for i in range(200):
+            store.put(f'{i:03d}.svg', f'data{i}'.encode())
+        store.flush_index()
+
+        store = PackStore(self.path)
+        self.assertEqual({}, store._state.tail)
+        for i in range(200):
+            self.assertEqual(f'data{i}'.encode(), store.get(f'{i:03d}.svg'))
+        self.assertIsNone(store.get('0000.svg'))
+        self.assertIsNone(store.get('999.svg'))
+
+    def test_newer_record_wins(self):
+        store = PackStore(self.path)
+        store.put('a.svg', b'old')
+        store.flush_index()
+        store.put('a.svg', b'new')
+
+        self.assertEqual(b'new', store.get('a.svg'))
+        self.assertEqual(b'new', PackStore(self.path).get('a.svg'))
+
+    def test_compact(self):
+        store = PackStore(self.path)
+        for i in range(10):
+            store.put('a.svg', b'x' * 100)
+        store.put('b.svg', b'B')
+        old_view = store.get('b.svg')
+
+        before, after = store.compact()
+
+        self.assertLess(after, before)
+        self.assertEqual(after, os.path.getsize(str(self.path) + '.data'))
+        self.assertEqual(b'x' * 100, store.get('a.svg'))
+        self.assertEqual(b'B', store.get('b.svg'))
+        self.assertEqual(b'B', old_view)
+
+        store.put('c.svg', b'C')
+        self.assertEqual(b'C', PackStore(self.path).get('c.svg'))
+
+    def test_multiple_instances(self):
+        writer = PackStore(self.path)
+        reader = PackStore(self.path)
+
+        writer.put('a.svg', b'A')
+        self.assertEqual(b'A', reader.get('a.svg'))
+
+        writer.compact()
+        writer.put('b.svg', b'B')
+        self.assertEqual(b'B', reader.get('b.svg'))
+        self.assertEqual(b'A', reader.get('a.svg'))
+
+        # a writer with an outdated file handle must not write into
+        # the replaced file
+        reader.compact()
+        writer.put('c.svg', b'C')
+        self.assertEqual(b'C', PackStore(self.path).get('c.svg'))
+
+    def test_multiple_processes(self):
+        PackStore(self.path).put('start', b'')
+
+        pids = []
+        for proc in range(4):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    store = PackStore(self.path)
+                    for i in range(50):
+                        store.put(f'{proc}-{i}', f'{proc}:{i}'.encode() * i)
+                finally:
+                    os._exit(0)
+            pids.append(pid)
+
+        for pid in pids:
+            os.waitpid(pid, 0)
+
+        store = PackStore(self.path)
+        self.assertEqual(201, len(store))
+        for proc in range(4):
+            for i in range(50):
+                self.assertEqual(f'{proc}:{i}'.encode() * i, store.get(f'{proc}-{i}'))
+
+    def test_incomplete_record(self):
+        store = PackStore(self.path)
+        store.put('a.svg', b'A')
+        store.put('b.svg', b'B' * 20)
+
+        with open(str(self.path) + '.data', 'r+b') as f:
+            f.truncate(os.path.getsize(str(self.path) + '.data') - 5)
+
+        store = PackStore(self.path)
+        self.assertEqual(b'A', store.get('a.svg'))
+        self.assertIsNone(store.get('b.svg'))
+
+    def test_corrupt_record(self):
+        store = PackStore(self.path)
+        store.put('a.svg', b'A')
+        store.put('b.svg', b'B' * 20)
+        store.put('c.svg', b'C')
+        store.close()
+
+        with open(str(self.path) + '.data', 'r+b') as f:
+            data = f.read()
+            f.seek(data.index(b'BBBB'))
+            f.write(b'X')
+
+        store = PackStore(self.path)
+        self.assertEqual(b'A', store.get('a.svg'))
+        self.assertIsNone(store.get('b.svg'))
+        self.assertEqual(b'C', store.get('c.svg'))
+
+        store.flush_index()
+        store = PackStore(self.path)
+        self.assertEqual(['a.svg', 'c.svg'], store.keys())
+
+        store.compact()
+        self.assertEqual(b'C', PackStore(self.path).get('c.svg'))
+
+    def test_torn_record_followed_by_other_writer(self):
+        store = PackStore(self.path)
+        store.put('a.svg', b'A')
+        reader = PackStore(self.path)
+        self.assertEqual(b'A', reader.get('a.svg'))
+
+        # a writer crashed after writing a header with a garbage length
+        with open(str(self.path) + '.data', 'ab') as f:
+            f.write(b'\xa7WMR\xff\xff\xff\xff\xff\x00\x00\x00\x00BB')
+
+        writer = PackStore(self.path)
+        writer.put('b.svg', b'B')
+        writer.put('c.svg', b'C')
+
+        for store in (reader, PackStore(self.path)):
+            self.assertEqual(b'A', store.get('a.svg'))
+            self.assertEqual(b'B', store.get('b.svg'))
+            self.assertEqual(b'C', store.get('c.svg'))
+
+        writer.flush_index()
+        self.assertEqual(['a.svg', 'b.svg', 'c.svg'], PackStore(self.path).keys())
+        writer.compact()
+        self.assertEqual(['a.svg', 'b.svg', 'c.svg'], PackStore(self.path).keys())
+
+    def test_views_survive_remaps(self):
+        store = PackStore(self.path)
+        store.put('a.svg', b'A')
+        view = store.get('a.svg')
+
+        for i in range(100):
+            store.put(f'{i}.svg', b'x' * 1000)
+        store.refresh()
+        store.compact()
+
+        self.assertEqual(b'A', view)
+        view.release()
+
+    def test_shield_cache(self):
+        cache = ShieldCache(store=PackStore(self.path))
+        cache.put('x/a.svg', b'A')
+
+        cache = ShieldCache(store=PackStore(self.path))
+        self.assertEqual(b'A', cache.get('x/a.svg'))
+        self.assertEqual(1, cache.store_hits)
+
+    def test_import_command(self):
+        srcdir = Path(self.tmpdir.name) / 'src'
+        (srcdir / 'sub').mkdir(parents=True)
+        (srcdir / 'a.svg').write_bytes(b'A')
+        (srcdir / 'sub' / 'b.svg').write_bytes(b'B')
+
+        store_main(['import', str(self.path), str(srcdir)])
+
+        store = PackStore(self.path)
+        self.assertEqual(['a.svg', 'sub/b.svg'], store.keys())
+        self.assertEqual(b'B', store.get('sub/b.svg'))
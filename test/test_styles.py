@@ -26,6 +26,7 @@ class TestStyles(unittest.TestCase):
         self.assertIsInstance(shieldmaker.dimensions()[0], int)
         self.assertIsInstance(shieldmaker.dimensions()[1], int)
         self.assertIsNotNone(shieldmaker.create_image())
+        self.assertTrue(shieldmaker.create_image('png').startswith(b'\x89PNG'))
 
     def test_ref_symbol(self):
         for cfg in (NullConfig(), WmtConfig):
@@ -40,6 +41,44 @@ class TestStyles(unittest.TestCase):
                 self.assert_shield(f.create({'ref' : 'AAAAAAAA'}, ''),
                                    'ref_None_00410041004100410041')
 
+    def test_png_scales(self):
+        f = ShieldFactory(['.ref_symbol'], WmtConfig)
+        shield = f.create({'ref' : 'A4'}, '')
+        w, h = shield.dimensions()
+
+        images = shield.create_images(scales=(1, 2))
+
+        self.assertEqual([1, 2], sorted(images))
+        for scale, img in images.items():
+            # width and height from the PNG header
+            self.assertEqual(w * scale, int.from_bytes(img[16:20], 'big'))
+            self.assertEqual(h * scale, int.from_bytes(img[20:24], 'big'))
+
+    def test_ref_text_size_cached(self):
+        from wmt_shields.common.text import text_metrics
+
+        f = ShieldFactory(['.ref_symbol', '.osmc_symbol'], WmtConfig)
+        ref = f.create({'ref' : 'X7Q'}, '')
+        osmc = f.create({'osmc:symbol' : 'red:white::X7Q:black'}, '')
+        ref.dimensions()
+        hits = text_metrics.cache_info().hits
+
+        self.assertEqual(ref.dimensions()[0], osmc.dimensions()[0])
+        self.assertEqual(hits + 2, text_metrics.cache_info().hits)
+
+    def test_text_layout_shares_context(self):
+        import cairo
+        from wmt_shields.common import text
+
+        ctx = cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 10, 10))
+        fnt = WmtConfig.text_font
+        first = text.create_layout(ctx, fnt, 'A')
+        second = text.create_layout(ctx, fnt, 'B')
+
+        self.assertIs(first.get_context(), second.get_context())
+        self.assertIs(text.font_description(fnt), text.font_description(fnt))
+        self.assertEqual(first.get_pixel_size(), text.text_metrics(fnt, 'A')[:2])
+
     def test_cai_hiking_symbol(self):
         for cfg in (NullConfig(), WmtConfig):
             with self.subTest(i=cfg):
@@ -172,6 +211,25 @@ class TestStyles(unittest.TestCase):
                         f.create({'osmc:symbol' : 'white:black:wheel'}, ''),
                         'osmc_None_black_wheel_black')
 
+    def test_osmc_layers(self):
+        from wmt_shields.styles.osmc_symbol import _layer_cache
+
+        f = ShieldFactory(['.osmc_symbol'], WmtConfig)
+        first = f.create({'osmc:symbol' : 'red:white_frame:red_bar:A:black'}, '')
+        second = f.create({'osmc:symbol' : 'red:white_frame:blue_bar:A:black'}, '')
+        cache = _layer_cache()
+        cache.clear()
+
+        img = first.create_image('png')
+        self.assertEqual(3, len(cache)) # background, foreground, text
+        second.create_image('png')
+        self.assertEqual(4, len(cache)) # only the new foreground
+        self.assertEqual(img, first.create_image('png'))
+
+        # SVG output is drawn directly
+        first.create_image('svg')
+        self.assertEqual(4, len(cache))
+
 
     def test_ref_color_symbol(self):
         for cfg in (ShieldConfig({'colorbox_names' : WmtConfig.colorbox_names}, {}), WmtConfig):
@@ -215,3 +273,20 @@ class TestStyles(unittest.TestCase):
             f.create({'operator' : 'Swiss mobility', 'network' : 'nwn', 'ref' : '7'} , ''),
             'swiss_None_0037')
 
+    def test_prewarm_templates(self):
+        from wmt_shields.common.shield_maker import _svg_template
+
+        f = ShieldFactory(['.jel_symbol', '.kct_symbol', '.osmc_symbol'], WmtConfig)
+        f.prewarm()
+        num_handles = _svg_template.cache_info().currsize
+
+        self.assertGreaterEqual(num_handles,
+                                len(WmtConfig.jel_types)
+                                + len(WmtConfig.kct_colors) * len(WmtConfig.kct_types)
+                                + len(WmtConfig.osmc_colors) * 2)
+
+        self.assert_shield(f.create({'kct_red' : 'major'}, ''),
+                           'kct_None_red-major')
+        self.assert_shield(f.create({'osmc:symbol' : 'white:black:red_hiker'}, ''),
+                           'osmc_None_black_hiker_red')
+        self.assertEqual(num_handles, _svg_template.cache_info().currsize)
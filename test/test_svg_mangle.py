@@ -0,0 +1,100 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import unittest
+from pathlib import Path
+
+from wmt_shields.common.svg_mangle import mangle_svg, mangle_svg_dom,\
+                                          translate_path
+
+CAIRO_SVG = b'''<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="20px" height="16px" viewBox="0 0 20 16" version="1.1">
+<defs>
+<g>
+<symbol overflow="visible" id="glyph0-1">
+<path style="stroke:none;" d="M 1.5 -3 L 2 0 C 1 1 2 2 3 3 Z M 0.5 0.25 l 1 1 "/>
+</symbol>
+<symbol overflow="visible" id="glyph0-2">
+<path style="stroke:none;" d="M 1 1 Z"/>
+<g><path d="M 1 1"/></g>
+</symbol>
+<image id="img" width="1" height="1" xlink:href="data:x"/>
+</g>
+</defs>
+<g id="surface1">
+<!-- a & b -->
+<rect x="0" y="0" width="20" height="16" title="a&amp;b&quot;&lt;"/>
+<g style="fill:rgb(0%,0%,0%);fill-opacity:1;">
+  <use xlink:href="#glyph0-1" x="5.5" y="11"/>
+  <use xlink:href="#glyph0-2" x="8" y="11"/>
+  <use xlink:href="#glyph0-3" x="8" y="11"/>
+  <use xlink:href="#glyph0-2"/>
+</g>
+<text>x &amp; &lt;y&gt;</text>
+<image width="3" height="3"><foo/></image>
+</g>
+</svg>
+'''
+
+DATA_DIR = Path(__file__).parent.parent / 'wmt_shields' / 'data'
+
+NO_USE_SVG = b'''<svg xmlns:xlink="http://www.w3.org/1999/xlink"><defs>
+<symbol id="s"><path d="M 1 1"/></symbol><image width="1" height="1"/></defs>
+<g><!-- <use xlink:href="#s" x="1" y="1"/> --><path d="M 0 0"/></g></svg>'''
+
+NO_SYMBOL_SVG = b'''<svg xmlns:xlink="http://www.w3.org/1999/xlink">
+<![CDATA[<symbol id="s"/>]]><use xlink:href="#s" x="1" y="1"/><use/></svg>'''
+
+UNRESOLVED_USE_SVG = b'''<svg xmlns:xlink="http://www.w3.org/1999/xlink">
+<symbol id="s"><path d="M 1 1"/><text><![CDATA[a<b]]></text></symbol>
+<use xlink:href="#t" x="1" y="1"/><use xlink:href="#s" x="1" y="1"/><use xlink:href="#s"/></svg>'''
+
+def svg_documents():
+    """ Return all test documents as (name, content) pairs: the
+        fixtures above and all SVG images from the shield directories.
+    """
+    docs = [('cairo', CAIRO_SVG), ('no use', NO_USE_SVG),
+            ('no symbol', NO_SYMBOL_SVG), ('unresolved use', UNRESOLVED_USE_SVG)]
+    for path in sorted(DATA_DIR.glob('*/*.svg')):
+        docs.append((str(path.relative_to(DATA_DIR)), path.read_bytes()))
+
+    return docs
+
+
+class TestSvgMangle(unittest.TestCase):
+
+    def test_translate_path(self):
+        self.assertEqual('M 2.000000 4.000000 l 1.000000 -1.000000 ',
+                         translate_path('M 1 2  l 1 -1', 1, 2))
+        self.assertEqual('', translate_path('', 1, 2))
+
+    def test_same_as_dom(self):
+        docs = svg_documents()
+        self.assertGreater(len(docs), 200)
+
+        for name, buf in docs:
+            with self.subTest(svg=name):
+                self.assertEqual(mangle_svg_dom(buf.decode('utf8')),
+                                 mangle_svg(buf).decode('utf8'))
+
+    def test_symbols_kept_without_uses(self):
+        out = mangle_svg(NO_USE_SVG)
+
+        self.assertIn(b'<symbol id="s"><path d="M 1 1"/></symbol>', out)
+        self.assertNotIn(b'<image', out)
+        self.assertIn(b'<use', mangle_svg(NO_SYMBOL_SVG))
+
+    def test_mapnik_compatible(self):
+        out = mangle_svg(CAIRO_SVG)
+
+        self.assertNotIn(b'<image', out)
+        self.assertNotIn(b'<symbol', out)
+        self.assertNotIn(b'<use', out)
+        self.assertIn(b'd="M 7.000000 8.000000 L 7.500000 11.000000 ', out)
+        self.assertIn(b'<g><path d="M 1 1"/></g>', out)
+
+    def test_bad_svg(self):
+        with self.assertRaises(RuntimeError):
+            mangle_svg(b'<svg><g></svg>')
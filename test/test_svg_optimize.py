@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import unittest
+
+from wmt_shields.common.svg_mangle import mangle_svg
+from wmt_shields.common.svg_optimize import optimize_svg, format_number,\
+                                            round_numbers
+from wmt_shields.common.shield_maker import ShieldMaker
+from wmt_shields.common.config import ShieldConfig
+
+from test_svg_mangle import CAIRO_SVG
+
+HEADER = '<?xml version="1.0" ?><svg width="20px" height="16px">'
+
+def optimize(content, precision=2):
+    svg = f'<svg width="20px" height="16px">{content}</svg>'
+    out = optimize_svg(svg.encode('utf8'), precision).decode('utf8')
+
+    assert out.startswith(HEADER)
+    return out[len(HEADER):-len('</svg>')]
+
+
+class TestSvgOptimize(unittest.TestCase):
+
+    def test_format_number(self):
+        self.assertEqual('1.5', format_number(1.5, 2))
+        self.assertEqual('1.33', format_number(1.33333, 2))
+        self.assertEqual('10', format_number(10.0, 2))
+        self.assertEqual('10', format_number(10.0, 0))
+        self.assertEqual('0', format_number(-0.001, 2))
+
+    def test_round_numbers(self):
+        self.assertEqual('M 7 8 L 7.5 11.01 Z', round_numbers('M 7.000000 8.0000 L 7.500000 11.009000 Z ', 2))
+        self.assertEqual('M1,2l0.5-1', round_numbers('M1.0001,2l.5-1', 3))
+        self.assertEqual('M2 0', round_numbers('M1.5.5', 0))
+
+    def test_mangled_cairo_output(self):
+        out = optimize_svg(mangle_svg(CAIRO_SVG), 2).decode('utf8')
+
+        self.assertEqual('<?xml version="1.0" ?><svg xmlns="http://www.w3.org/2000/svg"'
+                         ' xmlns:xlink="http://www.w3.org/1999/xlink" width="20px" height="16px"'
+                         ' viewBox="0 0 20 16" version="1.1">'
+                         '<rect x="0" y="0" width="20" height="16" title="a&amp;b&quot;&lt;"/>'
+                         '<g style="fill:rgb(0%,0%,0%)">'
+                         '<path d="M 7 8 L 7.5 11 C 6.5 12 7.5 13 8.5 14 Z M 6 11.25 l 1 1"/>'
+                         '<path d="M 9 12 Z"/><path d="M 1 1"/></g>'
+                         '<text>x &amp; &lt;y&gt;</text></svg>', out)
+
+    def test_mapnik_compatible(self):
+        out = optimize_svg(mangle_svg(CAIRO_SVG))
+
+        for tag in (b'<image', b'<symbol', b'<use'):
+            self.assertNotIn(tag, out)
+
+    def test_empty_groups(self):
+        self.assertEqual('<path d="M 1 1"/>',
+                         optimize('<defs><g/></defs><g><g id="a"/></g><g><path d="M 1 1"/></g>'))
+
+    def test_default_styles(self):
+        self.assertEqual('<path style="fill:red"/>',
+                         optimize('<path style="fill:red;fill-opacity:1;opacity:1;stroke:none;"/>'))
+        self.assertEqual('<path/>', optimize('<path transform="matrix(1,0,0,1,0,0)"/>'))
+        self.assertEqual('<path transform="matrix(0.333333,0,0,1,0,0)"/>',
+                         optimize('<path transform="matrix(0.333333,0,0,1,0,0)"/>'))
+
+    def test_inherited_styles(self):
+        self.assertEqual('<g style="stroke-width:2" transform="scale(2)">'
+                         '<path style="stroke-width:1"/><path/></g>',
+                         optimize('<g style="stroke-width:2" transform="scale(2)">'
+                                  '<path style="stroke-width:1"/><path style="stroke-width:2"/></g>'))
+
+    def test_merge_styles(self):
+        self.assertEqual('<g style="fill:red"><path d="M 1 1"/><path d="M 2 2"/></g>'
+                         '<path style="fill:blue" d="M 3 3"/>',
+                         optimize('<path style="fill:red;" d="M 1 1"/>'
+                                  '<path style="fill:red;" d="M 2 2"/>'
+                                  '<path style="fill:blue;" d="M 3 3"/>'))
+
+    def test_merge_group_into_child(self):
+        self.assertEqual('<path style="fill:red;stroke:blue" d="M 1 1"/>',
+                         optimize('<g style="fill:red"><path style="stroke:blue" d="M 1 1"/></g>'))
+
+    def test_keep_styles_of_presentation_attributes(self):
+        svg = '<g style="fill:red"><path fill="blue"/></g>'\
+              '<path style="fill:red" fill="blue"/><path style="fill:red" fill="blue"/>'
+        self.assertEqual(svg, optimize(svg))
+
+    def test_keep_styles_that_are_not_inherited(self):
+        svg = '<path style="opacity:0.5"/><path style="opacity:0.5"/>'
+        self.assertEqual(svg, optimize(svg))
+
+    def test_keep_referenced_ids(self):
+        self.assertEqual('<clipPath id="c"><rect width="1.5"/></clipPath>'
+                         '<path style="clip-path:url(#c)"/>',
+                         optimize('<clipPath id="c"><rect id="r" width="1.499"/></clipPath>'
+                                  '<path style="clip-path:url(#c)"/>'))
+
+    def test_bad_svg(self):
+        with self.assertRaises(RuntimeError):
+            optimize_svg(b'<svg><g></svg>')
+
+
+class PlainShield(ShieldMaker):
+    def __init__(self, config):
+        self.config = config
+        self.uuid_pattern = 'plain_{}'
+
+    def _render_surface(self, format, scale=1):
+        return CAIRO_SVG
+
+
+class TestShieldMakerOptimize(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        shield = PlainShield(ShieldConfig({}, {}))
+
+        self.assertEqual(mangle_svg(CAIRO_SVG), shield.create_image())
+
+    def test_enabled_with_precision(self):
+        shield = PlainShield(ShieldConfig({'svg_precision': 1}, {}))
+
+        self.assertEqual(optimize_svg(mangle_svg(CAIRO_SVG), 1), shield.create_image())
@@ -5,7 +5,7 @@
 
 import unittest
 
-from wmt_shields.common.tags import Tag, Tags, OsmColor
+from wmt_shields.common.tags import Tag, Tags, OsmColor, TagMatcher
 
 class TestTags(unittest.TestCase):
 
@@ -31,6 +31,21 @@ class TestTags(unittest.TestCase):
         self.assertIn(tags.starting_with('name').v, ('simple', 'einfach'))
         self.assertIsNone(tags.starting_with('ref:'))
 
+    def test_starting_with_multiple(self):
+        tags = Tags({'kct_red': 'major', 'kct_blue': 'minor', 'name': 'x'})
+
+        self.assertEqual(Tag('kct_red', 'major'), tags.starting_with('kct_'))
+        self.assertEqual(Tag('kct_blue', 'minor'), tags.starting_with('kct_b'))
+        self.assertIsNone(tags.starting_with('kct_x'))
+        self.assertIsNone(tags.starting_with('o'))
+        self.assertIsNone(Tags({}).starting_with('kct_'))
+
+    def test_contains(self):
+        tags = Tags({'name': 'x'})
+
+        self.assertIn('name', tags)
+        self.assertNotIn('ref', tags)
+
     def test_contains_all_tags(self):
         tags = Tags({'amenity': 'restaurant', 'tourism': 'hotel', 'name': 'F2'})
 
@@ -75,3 +90,29 @@ class TestTags(unittest.TestCase):
                          Tags({'colour': '#ffffff'}).as_color())
         self.assertEqual(OsmColor('red', (1.0, 0, 0)),
                          Tags({'color': 'red'}).as_color(color_names={'red': (1.0, 0, 0)}))
+
+    def test_as_color_invalid_hex(self):
+        self.assertIsNone(Tags({'color': '#ffff'}).as_color())
+        self.assertIsNone(Tags({'color': '#gggggg'}).as_color())
+        self.assertEqual(OsmColor('000000', (1/256, 1/256, 1/256)),
+                         Tags({'color': '#000000'}).as_color())
+
+
+class TestTagMatcher(unittest.TestCase):
+
+    def test_first_match_wins(self):
+        matcher = TagMatcher({'a': {'network': 'rwn', 'operator': 'A'},
+                              'b': (('operator', 'A'), ),
+                              'c': {'network': 'rwn'}})
+
+        self.assertEqual('a', matcher.match(Tags({'network': 'rwn', 'operator': 'A'})))
+        self.assertEqual('b', matcher.match(Tags({'network': 'lwn', 'operator': 'A'})))
+        self.assertEqual('c', matcher.match(Tags({'network': 'rwn', 'operator': 'B'})))
+        self.assertIsNone(matcher.match(Tags({'network': 'lwn'})))
+
+    def test_empty_entry(self):
+        matcher = TagMatcher({'a': {'network': 'rwn'}, 'all': {}, 'b': {'ref': '1'}})
+
+        self.assertEqual('a', matcher.match(Tags({'network': 'rwn', 'ref': '1'})))
+        self.assertEqual('all', matcher.match(Tags({'ref': '1'})))
+        self.assertIsNone(TagMatcher({}).match(Tags({'ref': '1'})))
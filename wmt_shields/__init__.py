@@ -4,3 +4,27 @@
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
 from .factory import ShieldFactory
+from .common.cache import ShieldCache, DirectoryStore
+from .manifest import UuidManifest
+
+# Modules that are not needed for creating shields are only
+# imported when used.
+_LAZY_ATTRIBUTES = {
+    'AsyncShieldFactory': 'async_factory',
+    'PackStore': 'store',
+    'CompressingStore': 'common.compress',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        from importlib import import_module
+        value = getattr(import_module('.' + _LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -0,0 +1,98 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Front-end for using the shield factory from asyncio applications.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+class AsyncShieldFactory(object):
+    """ Wraps a `ShieldFactory`, so that shields can be rendered without
+        blocking the event loop. Rendering is done in a pool of at most
+        `max_workers` threads. Concurrent requests for the same shield
+        share a single rendering job.
+
+        `timeout` sets the default time in seconds to wait for a shield,
+        None waits forever.
+    """
+
+    def __init__(self, factory, max_workers=4, timeout=None):
+        self.factory = factory
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='wmt-shields')
+        self._inflight = {} # (uuid, format, scale) -> [future, waiters]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """ Shut down the rendering threads. Jobs that are still running
+            are finished first.
+        """
+        self._executor.shutdown(wait=True)
+
+    @property
+    def inflight(self):
+        """ Number of shields currently waiting for or being rendered.
+        """
+        return len(self._inflight)
+
+    async def create_image(self, tags, region, *, format='svg', scale=1,
+                           timeout=None, **kwargs):
+        """ Render the shield for the given tags and return the image
+            as a byte buffer or None if no style matches. The parameters
+            are the same as for `ShieldFactory.create()` and
+            `ShieldMaker.create_image()`.
+
+            Raises `asyncio.TimeoutError` when the shield is not ready
+            after `timeout` seconds. A timeout or a cancellation only
+            concerns the current request. The rendering continues as
+            long as other requests wait for the same shield.
+        """
+        shield = self.factory.create(tags, region, **kwargs)
+        if shield is None:
+            return None
+
+        return await self.render(shield, format=format, scale=scale,
+                                 timeout=timeout)
+
+    async def render(self, shield, *, format='svg', scale=1, timeout=None):
+        """ Render an already created shield maker. See `create_image()`.
+        """
+        key = (shield.uuid(), format, scale)
+        entry = self._inflight.get(key)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, shield.create_image,
+                                          format, scale)
+            entry = [future, 0]
+            self._inflight[key] = entry
+            future.add_done_callback(lambda f: self._job_done(key, f))
+
+        future = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future),
+                                          self.timeout if timeout is None else timeout)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not future.done():
+                # Nobody is interested anymore. This only stops jobs
+                # that have not yet started.
+                future.cancel()
+
+    def _job_done(self, key, future):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is future:
+            del self._inflight[key]
+
+        # avoid warnings about unretrieved errors when all requests are gone
+        if not future.cancelled():
+            future.exception()
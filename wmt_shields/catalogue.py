@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Precomputation of all shields that do not depend on free text.
+
+Many shields come from finite sets: JEL and KCT symbols, named colours,
+OSMC symbols without text and so on. Styles announce these sets through
+an optional function `catalogue(config: ShieldConfig)`, which returns the
+tags of all shields of the style that do not contain text. The catalogue
+combines them with all style levels from the `style_config` setting,
+renders the resulting shields and writes a manifest. Only shields with
+variable text then need to be rendered on demand.
+
+Create a catalogue with the waymarkedtrails styles with:
+
+    python -m wmt_shields.catalogue --store /srv/shields/pack --manifest catalogue.json
+"""
+
+import sys
+import json
+import argparse
+
+from .factory import ShieldFactory
+from .common.cache import config_fingerprint
+from .common.shield_maker import style_attribute
+
+
+def catalogue_inputs(factory, levels=None, regions=('', )):
+    """ Return the `(tags, region, kwargs)` tuples for all shields in the
+        catalogue of `factory`. `levels` are the values for the `style`
+        setting, by default all levels from `style_config`. The result
+        may contain tuples that result in the same shield.
+    """
+    if levels is None:
+        levels = sorted(factory.get_config().style_config or ()) or [None]
+
+    inputs = []
+    for level in levels:
+        kwargs = {} if level is None else {'style': level}
+        config = factory.get_config(**kwargs)
+        for style in factory.styles:
+            for tags in style_attribute(style, 'catalogue', config) or ():
+                inputs.extend((tags, region, kwargs) for region in regions)
+
+    return inputs
+
+
+def build_catalogue(factory, inputs, store=None, sprite=None, jobs=None,
+                    format='svg'):
+    """ Create the shields for the `(tags, region, kwargs)` tuples in
+        `inputs` and return the manifest of the catalogue.
+
+        Shields are saved with `store.put()` under the name
+        `<uuid>.<format>`; with `jobs` larger than 1 they are rendered in
+        that many worker processes. Alternatively or additionally the
+        shields are added to the `SpriteSheet` `sprite`.
+
+        The manifest is a dictionary with the configuration fingerprint,
+        the format and, for each uuid, the style and the tags of the
+        first input that results in the shield.
+    """
+    shields = {}
+    unique = []
+    for inp, (style, uuid) in zip(inputs, factory.classify(inputs)):
+        if uuid is not None and uuid not in shields:
+            tags, region, kwargs = inp
+            shields[uuid] = {'style': style, 'tags': tags,
+                             'region': region, 'settings': kwargs}
+            unique.append(inp)
+
+    if store is not None:
+        for uuid, image in factory.render_many(unique, jobs=jobs, format=format):
+            store.put(f'{uuid}.{format}', image)
+
+    if sprite is not None:
+        sprite.add_from(factory, unique)
+
+    return {'fingerprint': config_fingerprint(factory.config),
+            'format': format,
+            'count': len(shields),
+            'shields': dict(sorted(shields.items()))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render all shields without text.')
+    parser.add_argument('--config', default='wmt_shields.wmt_config:WmtConfig',
+                        help='Configuration object to use (module:name)')
+    parser.add_argument('--style', action='append', dest='styles',
+                        help='Style to use, may be repeated'
+                             ' (default: the waymarkedtrails styles)')
+    parser.add_argument('--level', action='append', dest='levels',
+                        help='Style level to create, may be repeated'
+                             ' (default: all levels of the configuration)')
+    parser.add_argument('--format', choices=('svg', 'png'), default='svg')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of worker processes (default: 1)')
+    parser.add_argument('--store', metavar='PACK',
+                        help='Pack file where the shields are saved')
+    parser.add_argument('--directory', metavar='DIR',
+                        help='Directory where the shields are saved')
+    parser.add_argument('--compress', action='append', choices=('gzip', 'br'),
+                        help='Also save precompressed variants of the shields'
+                             ' with this encoding, may be repeated')
+    parser.add_argument('--sprite', metavar='BASENAME',
+                        help='Write the shields into a sprite sheet')
+    parser.add_argument('--manifest', metavar='FILE',
+                        help='Write the JSON manifest into FILE')
+    args = parser.parse_args(argv)
+
+    from .server import load_object
+    from .wmt_config import WMT_STYLES
+
+    config = load_object(args.config)
+    factory = ShieldFactory(args.styles or WMT_STYLES,
+                            config() if isinstance(config, type) else config)
+
+    store = None
+    if args.store:
+        from .store import PackStore
+        store = PackStore(args.store)
+    elif args.directory:
+        from .common.cache import DirectoryStore
+        store = DirectoryStore(args.directory)
+
+    pack = store
+    if store is not None and args.compress:
+        from .common.compress import CompressingStore
+        store = CompressingStore(store, args.compress, workers=args.jobs)
+
+    sprite = None
+    if args.sprite:
+        from .sprite import SpriteSheet
+        sprite = SpriteSheet()
+
+    inputs = catalogue_inputs(factory, args.levels)
+    manifest = build_catalogue(factory, inputs, store=store, sprite=sprite,
+                               jobs=args.jobs, format=args.format)
+
+    if store is not pack:
+        store.close()
+    if args.store:
+        pack.flush_index()
+    if sprite is not None:
+        sprite.write(args.sprite)
+
+    if args.manifest:
+        with open(args.manifest, 'w') as f:
+            json.dump(manifest, f, indent=1)
+
+    print(f"{manifest['count']} shields in the catalogue.")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from .config import ShieldConfig
+
+class LRUCache(object):
+    """ A thread-safe dictionary which keeps at most `maxsize` entries.
+        When the cache is full, the least recently used entry is dropped.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """ Return the entry for `key` or `default` if there is none.
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """ Add or replace the entry for `key`.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DirectoryStore(object):
+    """ Persistent storage of rendered shields with one file per shield.
+        Keys are used as relative file names within `directory`.
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+
+    def get(self, key):
+        """ Return the data stored for `key` or None if it is unknown.
+        """
+        try:
+            with open(os.path.join(self.directory, key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        """ Save `data` under `key`. The file is replaced atomically, so that
+            concurrent readers never see a partially written shield.
+        """
+        path = os.path.join(self.directory, key)
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmpname, path)
+        except BaseException:
+            os.unlink(tmpname)
+            raise
+
+
+class ShieldCache(object):
+    """ Two-tier cache for rendered shield images: a bounded in-memory
+        LRU in front of an optional persistent `store`. The store must
+        implement `get(key)` and `put(key, data)`, see `DirectoryStore`.
+    """
+
+    def __init__(self, maxsize=1024, store=None):
+        self.memory = LRUCache(maxsize)
+        self.store = store
+        self.store_hits = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hits(self):
+        return self.memory.hits + self.store_hits
+
+    @property
+    def misses(self):
+        return self.memory.misses - self.store_hits
+
+    @property
+    def evictions(self):
+        return self.memory.evictions
+
+    def stats(self):
+        """ Return a dictionary with the current cache counters.
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'store_hits': self.store_hits,
+                'size': len(self.memory)}
+
+    def get(self, key):
+        """ Return the image saved under `key` or None if it is not cached.
+        """
+        data = self.memory.get(key)
+        if data is None and self.store is not None:
+            data = self.store.get(key)
+            if data is not None:
+                with self._lock:
+                    self.store_hits += 1
+                self.memory.put(key, data)
+
+        return data
+
+    def put(self, key, data):
+        self.memory.put(key, data)
+        if self.store is not None:
+            self.store.put(key, data)
+
+
+def config_fingerprint(config, seed=''):
+    """ Return a short hash over all settings in `config`, which may be
+        a dictionary, a class or an object. `seed` is mixed into the hash,
+        so that fingerprints can be chained for derived configurations.
+    """
+    if isinstance(config, dict):
+        items = config.items()
+    elif isinstance(config, ShieldConfig):
+        # the extra settings take precedence
+        return config_fingerprint(config._extra,
+                                  config_fingerprint(config._config, seed))
+    else:
+        items = ((k, getattr(config, k)) for k in dir(config)
+                 if not k.startswith('_'))
+        items = [(k, v) for k, v in items if not callable(v)]
+
+    content = repr(sorted(items, key=lambda i: i[0]))
+
+    return hashlib.sha1((seed + content).encode('utf8')).hexdigest()[:16]
@@ -0,0 +1,232 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Precompressed variants of rendered shields.
+
+Shields never change once they are rendered, so they can be compressed
+once at render time instead of on every request. For each image, the
+variants are saved next to the original with the extension of the
+encoding (`<uuid>.svg.gz`, `<uuid>.svg.br`), which is the layout that
+static web servers expect (e.g. `gzip_static` and `brotli_static` of
+nginx). Variants that are not smaller than the original are not saved.
+
+Compression runs in a pool of threads. zlib and brotli release the GIL,
+so that compression happens in parallel to the rendering of the next
+shields. Brotli needs the optional `brotli` package:
+
+    pip install waymarkedtrails-shields[brotli]
+
+The sizes of the original and of all variants are recorded in a JSON
+metadata file, so that a server can choose the encoding without looking
+at the files. Files are recorded with their path relative to the output
+directory.
+"""
+
+import os
+import gzip
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Supported encodings with the file extension of their variant.
+ENCODINGS = {'gzip': '.gz', 'br': '.br'}
+
+
+def compress(data, encoding):
+    """ Compress `data` with the given encoding ('gzip' or 'br') using the
+        highest compression level. The result does not depend on the time
+        of compression.
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+
+    if encoding == 'br':
+        return _brotli().compress(bytes(data), quality=11)
+
+    raise ValueError(f"Unknown encoding '{encoding}'.")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        raise RuntimeError("Brotli compression needs the 'brotli' package.")
+
+    return brotli
+
+
+class Compressor(object):
+    """ Creates compressed variants of images in a pool of `workers`
+        threads. At most `4 * workers` jobs are queued, further calls
+        to `submit()` block. The sizes of all compressed images are
+        collected in `metadata`. Files saved with `write_files()` are
+        recorded under their path relative to the directory `root`,
+        which defaults to the current directory.
+    """
+
+    def __init__(self, encodings=('gzip', ), workers=None, root=None):
+        for encoding in encodings:
+            if encoding not in ENCODINGS:
+                raise ValueError(f"Unknown encoding '{encoding}'.")
+            if encoding == 'br':
+                _brotli()
+
+        workers = workers or os.cpu_count() or 1
+        self.encodings = tuple(encodings)
+        self.root = os.path.abspath(root or os.curdir)
+        self.metadata = {}
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='compress')
+        self._slots = threading.BoundedSemaphore(4 * workers)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def variants(self, name, data):
+        """ Compress `data` with all encodings and record the sizes under
+            `name`. Returns a dictionary of encoding to compressed data
+            for all variants that are smaller than the original.
+        """
+        result = {}
+        sizes = {'size': len(data)}
+        for encoding in self.encodings:
+            out = compress(data, encoding)
+            if len(out) < len(data):
+                result[encoding] = out
+                sizes[encoding] = len(out)
+
+        with self._lock:
+            self.metadata[name] = sizes
+
+        return result
+
+    def write_files(self, filename, data):
+        """ Save the compressed variants of `data` next to the file
+            `filename`.
+        """
+        name = os.path.relpath(os.path.abspath(filename), self.root)
+        name = name.replace(os.sep, '/')
+        for encoding, out in self.variants(name, data).items():
+            with open(filename + ENCODINGS[encoding], 'wb') as f:
+                f.write(out)
+
+    def submit(self, func, *args):
+        """ Run `func(*args)` in the pool. Exceptions are raised again
+            by `wait()`.
+        """
+        self._slots.acquire()
+        try:
+            future = self._pool.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(self._release)
+        with self._lock:
+            self._collect(f for f in self._pending if f.done())
+            self._pending.add(future)
+
+    def wait(self):
+        """ Wait until all submitted jobs are finished.
+        """
+        with self._lock:
+            pending = list(self._pending)
+
+        for future in pending:
+            future.exception()
+
+        with self._lock:
+            self._collect(pending)
+            errors = self._errors
+            self._errors = []
+
+        if errors:
+            raise errors[0]
+
+    def write_metadata(self, filename):
+        """ Wait for all jobs and save the collected sizes as JSON in
+            `filename`.
+        """
+        self.wait()
+        with open(filename, 'w') as f:
+            json.dump(self.metadata_json(), f, indent=1, sort_keys=True)
+
+    def metadata_json(self):
+        """ Return the collected sizes in the format of the metadata file.
+        """
+        with self._lock:
+            return {'encodings': {e: ENCODINGS[e] for e in self.encodings},
+                    'shields': dict(self.metadata)}
+
+    def close(self):
+        """ Wait for all jobs and stop the pool. The pool is stopped
+            even when a job failed.
+        """
+        try:
+            self.wait()
+        finally:
+            self._pool.shutdown()
+
+    def _release(self, future):
+        self._slots.release()
+
+    def _collect(self, futures):
+        """ Forget about finished jobs and remember their errors.
+            Must be called with the lock held.
+        """
+        for future in list(futures):
+            self._pending.discard(future)
+            if future.exception() is not None:
+                self._errors.append(future.exception())
+
+
+class CompressingStore(object):
+    """ Wrapper around a store like `DirectoryStore` or `PackStore`
+        which saves precompressed variants of all images under the key
+        of the image with the extension of the encoding. Compression
+        runs in the background, call `flush()` to wait for it.
+
+        The sizes are saved in the store as JSON under `metadata_key`.
+        Sizes from an earlier run are kept.
+    """
+
+    def __init__(self, store, encodings=('gzip', ), workers=None,
+                 metadata_key='compressed.json'):
+        self.store = store
+        self.compressor = Compressor(encodings, workers)
+        self.metadata_key = metadata_key
+
+        old = store.get(metadata_key)
+        if old is not None:
+            self.compressor.metadata.update(json.loads(bytes(old))['shields'])
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def put(self, key, data):
+        """ Save `data` under `key` and schedule the compression.
+        """
+        self.store.put(key, data)
+        self.compressor.submit(self._put_variants, key, bytes(data))
+
+    def flush(self):
+        """ Wait for all pending compressions and save the metadata.
+        """
+        self.compressor.wait()
+        meta = json.dumps(self.compressor.metadata_json(), sort_keys=True)
+        self.store.put(self.metadata_key, meta.encode('utf-8'))
+
+    def close(self):
+        self.flush()
+        self.compressor.close()
+
+    def _put_variants(self, key, data):
+        for encoding, out in self.compressor.variants(key, data).items():
+            self.store.put(key + ENCODINGS[encoding], out)
@@ -3,6 +3,32 @@
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
+from functools import lru_cache
+
+from .tags import TagMatcher
+
+def hex_color(rgb):
+    """ Return the HTML notation for a color given as an RGB tuple.
+    """
+    return '#%02x%02x%02x' % tuple(int(x*255) for x in rgb)
+
+
+def _hex_table(colors):
+    return {name: hex_color(rgb) for name, rgb in colors.items()}
+
+# Settings that are only used for membership tests.
+_SET_ATTRIBUTES = ('jel_types', 'kct_types',
+                   'swiss_mobile_operators', 'swiss_mobile_networks')
+
+# Settings computed from other settings: name -> (source setting, function)
+_DERIVED_ATTRIBUTES = {
+    'osmc_colors_hex': ('osmc_colors', _hex_table),
+    'kct_colors_hex': ('kct_colors', _hex_table),
+    'osmc_color_names': ('osmc_colors', frozenset),
+    'shield_names_matcher': ('shield_names', TagMatcher),
+}
+
+
 class ShieldConfig(object):
     """ A shield configuration container.
     """
@@ -24,7 +50,15 @@ class ShieldConfig(object):
             if cfg is not None and self.style in cfg and name in cfg[self.style]:
                 return cfg[self.style][name]
 
-        return self._getattr_simple(name)
+        value = self._getattr_simple(name)
+
+        if value is None and name in _DERIVED_ATTRIBUTES:
+            source, func = _DERIVED_ATTRIBUTES[name]
+            value = getattr(self, source)
+            if value is not None:
+                value = func(value)
+
+        return value
 
     def _getattr_simple(self, name):
         if name in self._extra:
@@ -36,3 +70,116 @@ class ShieldConfig(object):
 
         return None
 
+
+class CompiledConfig(object):
+    """ Immutable snapshot of a shield configuration with all settings
+        resolved for one style. Use `compile_config()` to create one.
+
+        Reading a setting is a simple slot access. Settings that are only
+        used for membership tests are converted into frozensets and
+        the derived settings `osmc_colors_hex` and `kct_colors_hex`
+        contain the colors in HTML notation.
+    """
+    __slots__ = ('_source', )
+
+    def __getattr__(self, name):
+        # only called for unset slots and unknown settings
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompiledConfig is immutable.")
+
+    def __repr__(self):
+        return f"CompiledConfig(style={self.style!r})"
+
+    def derive(self, **kwargs):
+        """ Return the configuration with the settings in `kwargs`
+            taking precedence. Results are shared between all calls with
+            the same settings, when the settings are hashable.
+        """
+        try:
+            key = tuple(sorted(kwargs.items()))
+            hash(key)
+        except TypeError:
+            return compile_config(self._source, kwargs)
+
+        return _derive(self, key)
+
+
+@lru_cache(maxsize=256)
+def _derive(config, extra):
+    return compile_config(config._source, dict(extra))
+
+
+@lru_cache(maxsize=256)
+def _compiled_class(names):
+    """ Return the CompiledConfig class with slots for the settings
+        `names`. Classes are shared between configurations with the same
+        settings. Only the most recently used ones are kept, instances
+        keep their class alive.
+    """
+    return type('CompiledConfig', (CompiledConfig, ), {'__slots__': names})
+
+def _config_items(config):
+    """ Return a dictionary of all settings of the given configuration.
+    """
+    if isinstance(config, dict):
+        return dict(config)
+
+    if isinstance(config, CompiledConfig):
+        return dict(config._source)
+
+    if isinstance(config, ShieldConfig):
+        names = set(_config_items(config._config))
+        names.update(config._extra)
+        if config.style is not None:
+            names.update((config.style_config or {}).get(config.style, ()))
+        return {k: getattr(config, k) for k in names}
+
+    items = {}
+    for k in dir(config):
+        if not k.startswith('_'):
+            v = getattr(config, k)
+            if not callable(v):
+                items[k] = v
+
+    return items
+
+
+def compile_config(config, extra=None):
+    """ Create an immutable snapshot of the configuration `config` with
+        the settings in `extra` taking precedence. `config` may be
+        a dictionary, a class, an object or a ShieldConfig.
+    """
+    values = _config_items(config)
+    if extra:
+        values.update(extra)
+    raw_values = dict(values)
+
+    style = values.get('style')
+    if style is not None:
+        style_values = (values.get('style_config') or {}).get(style)
+        if style_values:
+            values.update(style_values)
+            values['style'] = style
+
+    for name in _SET_ATTRIBUTES:
+        if values.get(name) is not None:
+            values[name] = frozenset(values[name])
+
+    for name, (source, func) in _DERIVED_ATTRIBUTES.items():
+        if values.get(source) is not None:
+            values[name] = func(values[source])
+
+    names = tuple(sorted(k for k in values
+                         if k.isidentifier() and not k.startswith('_')
+                            and not hasattr(CompiledConfig, k)))
+
+    compiled = object.__new__(_compiled_class(names))
+    object.__setattr__(compiled, '_source', raw_values)
+    for name in names:
+        object.__setattr__(compiled, name, values[name])
+
+    return compiled
@@ -0,0 +1,85 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Precompiled geometry for symbols that are drawn over and over again.
+
+A drawing function is executed once against a recorder that stands in for
+a cairo context. The recorder keeps the resulting paths together with the
+operation (stroke or fill) and the line width. Later the geometry can be
+replayed into any context with the current source and transformation.
+"""
+
+from .graphics import cairo
+
+# Paths are recorded with this scale, so that curves like arcs are
+# approximated with enough precision for all practical output sizes.
+RECORDING_SCALE = 1024
+
+
+class Geometry(object):
+    """ Recorded drawing operations. `ops` is a list of tuples
+        `(operation, path, line width)`. `path` is a path that was left
+        open at the end of the recording or None.
+    """
+    __slots__ = ('ops', 'path')
+
+    def __init__(self, ops, path=None):
+        self.ops = ops
+        self.path = path
+
+    def replay(self, ctx):
+        """ Draw the geometry into `ctx`. Colours are not part of the
+            geometry, the current source of the context is used.
+        """
+        for op, path, line_width in self.ops:
+            ctx.append_path(path)
+            if op == 'stroke':
+                ctx.set_line_width(line_width)
+                ctx.stroke()
+            else:
+                ctx.fill()
+
+        if self.path is not None:
+            ctx.append_path(self.path)
+
+
+class _Recorder(object):
+    """ Stand-in for a cairo context, which records instead of drawing.
+        Everything not related to stroking or filling is forwarded to
+        a scratch context, which computes the paths.
+    """
+
+    def __init__(self, line_width):
+        self._ctx = cairo.Context(cairo.ImageSurface(cairo.FORMAT_A8, 1, 1))
+        self._ctx.scale(RECORDING_SCALE, RECORDING_SCALE)
+        self._ctx.set_line_width(line_width)
+        self.ops = []
+
+    def __getattr__(self, name):
+        return getattr(self._ctx, name)
+
+    def stroke(self):
+        self.ops.append(('stroke', self._ctx.copy_path(),
+                         self._ctx.get_line_width()))
+        self._ctx.new_path()
+
+    def fill(self):
+        self.ops.append(('fill', self._ctx.copy_path(), None))
+        self._ctx.new_path()
+
+    def geometry(self):
+        path = self._ctx.copy_path()
+        return Geometry(self.ops, path if any(True for _ in path) else None)
+
+
+def record_geometry(painter, *args, line_width=2.0):
+    """ Call `painter` with a recording context as first parameter
+        followed by `args` and return the recorded `Geometry`.
+        `line_width` sets the initial line width of the context.
+    """
+    recorder = _Recorder(line_width)
+    painter(recorder, *args)
+
+    return recorder.geometry()
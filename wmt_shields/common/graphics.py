@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Lazy access to the graphics libraries.
+
+Importing cairo and the GObject bindings for Pango and Rsvg takes a
+considerable amount of time. Modules therefore import the libraries
+from here instead:
+
+    from .graphics import cairo, Pango
+
+The names are placeholders, which load the real module on the first
+attribute access. Classifying tags or looking up cached shields never
+touches the graphics stack and does not pay for loading it.
+"""
+
+import importlib
+import threading
+
+_GI_VERSIONS = {'Pango': '1.0', 'PangoCairo': '1.0', 'Rsvg': '2.0'}
+
+_lock = threading.Lock()
+
+
+def _require_gi_versions():
+    import gi
+    for name, version in _GI_VERSIONS.items():
+        gi.require_version(name, version)
+
+
+def _import(name):
+    if name in _GI_VERSIONS:
+        _require_gi_versions()
+        return importlib.import_module('gi.repository.' + name)
+
+    return importlib.import_module(name)
+
+
+class _LazyModule(object):
+    """ Placeholder for the module `name`. Attributes are looked up in
+        the real module and then kept in the placeholder, so that later
+        accesses are as fast as a normal attribute lookup.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+
+        value = getattr(self._load(), attr)
+        setattr(self, attr, value)
+
+        return value
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    self._module = _import(self._name)
+
+        return self._module
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+cairo = _LazyModule('cairo')
+Pango = _LazyModule('Pango')
+PangoCairo = _LazyModule('PangoCairo')
+Rsvg = _LazyModule('Rsvg')
+
@@ -4,17 +4,18 @@
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
 import sys
-import pkg_resources
 import os
+import threading
+import importlib
+from math import ceil
+from functools import lru_cache
 from io import BytesIO
-from xml.dom.minidom import parseString as xml_parse
-from xml.parsers.expat import ExpatError
+from typing import NamedTuple, Any
 
-import cairo
-import gi
-gi.require_version('Pango', '1.0')
-gi.require_version('PangoCairo', '1.0')
-from gi.repository import Pango, PangoCairo
+from .graphics import cairo, PangoCairo, Rsvg
+from . import text
+from .svg_mangle import mangle_svg
+from .svg_optimize import optimize_svg
 
 def load_shield_maker(spec):
     """ Return a shield maker object. An object may either be a class with
@@ -36,10 +37,126 @@ def load_shield_maker(spec):
     return spec
 
 
+def style_name(style):
+    """ Return a short name for a loaded style. Styles may set the
+        name explicitly with a `name` attribute, otherwise the name of
+        the module or class is used.
+    """
+    name = getattr(style, 'name', None)
+    if isinstance(name, str):
+        return name
+
+    name = getattr(style, '__name__', None) or type(style).__name__
+
+    return name.rsplit('.', 1)[-1]
+
+
+def style_attribute(style, name, config):
+    """ Return the optional attribute `name` of a style. When the
+        attribute is a function, it is called with the configuration
+        and the result is returned. Returns None if the style does not
+        have the attribute.
+    """
+    value = getattr(style, name, None)
+
+    return value(config) if callable(value) else value
+
+
+def supports_spec(shield):
+    """ Check if a shield maker can be described by a `ShieldSpec`.
+    """
+    return isinstance(shield, ShieldMaker) \
+           and callable(getattr(shield, 'spec_args', None))
+
+
+class ShieldSpec(NamedTuple):
+    """ Compact description of a shield, from which the shield maker can
+        be recreated. `maker` is the class of the shield maker as
+        `module:name`, `args` are the parameters for its constructor
+        except the configuration and `kwargs` the extra settings for
+        the configuration as a sorted tuple of key/value pairs. Specs are
+        cheap to keep and to pickle, because they contain no configuration.
+        Use `ShieldFactory.create_from_spec()` to get the shield maker back.
+    """
+    maker: str
+    args: tuple[Any, ...]
+    kwargs: tuple[tuple[str, Any], ...] = ()
+
+
+@lru_cache(maxsize=64)
+def shield_maker_class(name):
+    """ Return the class for a maker name `module:name` of a ShieldSpec.
+    """
+    module, qualname = name.split(':', 1)
+    obj = importlib.import_module(module)
+    for part in qualname.split('.'):
+        obj = getattr(obj, part)
+
+    return obj
+
+
+def _read_resource(abspath):
+    if abspath.startswith('{data}'):
+        from importlib import resources
+        return (resources.files('wmt_shields') / 'data' / abspath[7:]).read_bytes()
+
+    with open(abspath, 'r') as f:
+        content = f.read()
+
+    return content.encode()
+
+
+def _rasterize(recording, w, h, scale):
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                 ceil(w * scale), ceil(h * scale))
+    ctx = cairo.Context(surface)
+    ctx.scale(scale, scale)
+    ctx.set_source_surface(recording, 0, 0)
+    ctx.paint()
+
+    image = BytesIO()
+    surface.write_to_png(image)
+
+    return image.getvalue()
+
+
+class SvgTemplate(object):
+    """ An Rsvg handle for an image template. Rsvg handles must not be
+        used by multiple threads at the same time, so every template has
+        its own lock for rendering. Other attributes are those of the
+        handle.
+    """
+    __slots__ = ('handle', 'lock')
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.handle, name)
+
+    def render_cairo(self, ctx):
+        with self.lock:
+            return self.handle.render_cairo(ctx)
+
+
+@lru_cache(maxsize=1024)
+def _svg_template(path, template_color, color):
+    content = _read_resource(path)
+    if color is not None:
+        content = content.replace(template_color.encode(), color.encode())
+
+    return SvgTemplate(Rsvg.Handle.new_from_data(content))
+
+_svg_lock = threading.Lock()
+
 class ShieldMaker(object):
     """ Base class for all shield making objects. It implements some common
         functionality.
     """
+    # Set by the ShieldFactory when rendered images should be cached.
+    cache = None
+    cache_fingerprint = ''
 
     def uuid(self):
         """ Return a unique identifier also usable as a filename. the default
@@ -49,6 +166,19 @@ class ShieldMaker(object):
         """
         return self.uuid_pattern.format(self.config.style or 'None')
 
+    def shield_spec(self, kwargs=None):
+        """ Return the `ShieldSpec` for the shield. `kwargs` are the
+            extra settings the shield was created with.
+
+            Shield makers support specs by implementing a function
+            `spec_args()`, which returns the parameters for their
+            constructor without the configuration. Use `supports_spec()`
+            to check for it.
+        """
+        cls = type(self)
+        return ShieldSpec(f'{cls.__module__}:{cls.__qualname__}', tuple(self.spec_args()),
+                          tuple(sorted((kwargs or {}).items())))
+
     def dimensions(self):
         """ Return a tuple of width and height of the final image (excluding
             borders). The default implementation returns `image_width` and
@@ -58,6 +188,9 @@ class ShieldMaker(object):
         return (self.config.image_width or 16, self.config.image_height or 16)
 
     def find_resource(self, subdir, filename):
+        return _read_resource(self._resource_path(subdir, filename))
+
+    def _resource_path(self, subdir, filename):
         subdir_str = str(subdir) if subdir is not None else ''
         filename = str(filename)
         if os.path.isabs(filename):
@@ -69,57 +202,137 @@ class ShieldMaker(object):
             abspath = os.path.join(self.config.data_dir or '', subdir_str,
                                    filename)
 
-        if abspath.startswith('{data}'):
-            return pkg_resources.resource_string('wmt_shields',
-                                                 os.path.join('data',
-                                                              abspath[7:]))
+        return abspath
 
-        with open(abspath, 'r') as f:
-            content = f.read()
-
-        return content.encode()
+    def load_svg(self, subdir, filename, color=None, template_color=None):
+        """ Return an `SvgTemplate` for the SVG resource `filename`. When
+            `color` is given, then all occurrences of the color string
+            `template_color` in the file are replaced with `color` first.
+            Templates are cached by file and color, so that every
+            template is usually read and parsed only once.
+        """
+        path = self._resource_path(subdir, filename)
+        with _svg_lock:
+            return _svg_template(path, template_color, color)
+
+    def render_svg_handle(self, ctx, handle):
+        """ Render a template obtained from `load_svg()` into `ctx`.
+            Templates are shared, so rendering of the same template is
+            serialised between threads.
+        """
+        handle.render_cairo(ctx)
 
-    def to_file(self, filename, format='svg'):
+    def to_file(self, filename, format='svg', scale=1, compressor=None):
         """ Render the shield into the file `filename` using the output format
-            `format`.
+            `format`. When a `Compressor` is given, precompressed variants
+            of the file are written in its thread pool as well.
         """
-        buf = self.create_image(format)
+        buf = self.create_image(format, scale)
 
         with open(filename, 'wb') as of:
             of.write(buf)
 
-    def create_image(self, format='svg'):
+        if compressor is not None:
+            compressor.submit(compressor.write_files, filename, buf)
+
+    def create_image(self, format='svg', scale=1):
         """ Render the shield into a byte buffer using the output format
-            `format`.
+            `format`, which may be 'svg' or 'png'. For raster formats
+            `scale` sets the pixel ratio of the image. When a cache is set,
+            previously rendered images are returned from the cache.
+        """
+        if self.cache is None:
+            return self._create_image(format, scale)
+
+        key = self._cache_key(format, scale)
+        buf = self.cache.get(key)
+        if buf is None:
+            buf = self._create_image(format, scale)
+            self.cache.put(key, buf)
+
+        return buf
+
+    def create_images(self, scales=(1, 2, 3)):
+        """ Render the shield as PNG in multiple pixel ratios. Returns a
+            dictionary of scale to image buffer. The shield is only drawn
+            once into a recording surface, which is then rasterised for
+            each scale.
+        """
+        images = {}
+        if self.cache is not None:
+            for scale in scales:
+                buf = self.cache.get(self._cache_key('png', scale))
+                if buf is not None:
+                    images[scale] = buf
+
+        missing = [scale for scale in scales if scale not in images]
+        if missing:
+            w, h = self.dimensions()
+            recording = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA,
+                                               cairo.Rectangle(0, 0, w, h))
+            self._paint(cairo.Context(recording))
+            for scale in missing:
+                buf = _rasterize(recording, w, h, scale)
+                if self.cache is not None:
+                    self.cache.put(self._cache_key('png', scale), buf)
+                images[scale] = buf
+
+        return images
+
+    def _cache_key(self, format, scale):
+        if scale == 1:
+            return f"{self.cache_fingerprint}/{self.uuid()}.{format}"
+
+        return f"{self.cache_fingerprint}/{self.uuid()}@{scale}x.{format}"
+
+    def _create_image(self, format, scale=1):
+        buf = self._render_surface(format, scale)
+
+        if format == 'svg':
+            try:
+                buf = self._mangle_svg(buf)
+                buf = self._optimize_svg(buf)
+            except Exception as ex:
+                print(f"WARNING: cannot mangle image {self.uuid()}: {ex}")
+
+        return buf
+
+    def _render_surface(self, format, scale=1):
+        """ Render the shield and return the raw output of cairo.
         """
         image = BytesIO()
+        w, h = self.dimensions()
 
         if format == 'svg':
-            surface = cairo.SVGSurface(image, *self.dimensions())
+            surface = cairo.SVGSurface(image, w, h)
             major, minor, patch = cairo.version_info
             if major == 1 and minor >= 18:
                 surface.set_document_unit(cairo.SVGUnit.PX)
+        elif format == 'png':
+            surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+                                         ceil(w * scale), ceil(h * scale))
         else:
             raise RuntimeError(f"Format {format} not implemented.")
 
         ctx = cairo.Context(surface)
+        if format == 'png':
+            ctx.scale(scale, scale)
+        self._paint(ctx)
+
+        if format == 'png':
+            surface.write_to_png(image)
+        else:
+            ctx.show_page()
+            surface.finish()
+
+        return image.getvalue()
+
+    def _paint(self, ctx):
         ctx.save()
         self.render(ctx)
         ctx.restore()
         self.render_frame(ctx)
 
-        ctx.show_page()
-        surface.finish()
-        buf = image.getvalue()
-
-        if format == 'svg':
-            try:
-                buf = self._mangle_svg(buf.decode('UTF8')).encode('UTF8')
-            except Exception as ex:
-                print(f"WARNING: cannot mangle image {self.uuid()}: {ex}")
-
-        return buf
-
     def render_frame(self, ctx):
         border = self.config.image_border_width or 0
 
@@ -148,71 +361,20 @@ class ShieldMaker(object):
 
 
     def _mangle_svg(self, buf):
-        try:
-            dom = xml_parse(buf)
-        except ExpatError:
-            raise RuntimeError("Cannot parse SVG shield.")
-
-        for svg in dom.getElementsByTagName("svg"):
-            image_ele = svg.getElementsByTagName("image")
-            # image elements are not supported by Mapnik. Remove.
-            for e in svg.getElementsByTagName("image"):
-                e.parentNode.removeChild(e)
-
-            sym_ele = svg.getElementsByTagName("symbol")
-            use_ele = svg.getElementsByTagName("use")
-
-            if sym_ele.length == 0 or use_ele.length == 0:
-                continue
-
-            symbols = {}
-            for e in sym_ele:
-                symbols['#' + e.getAttribute('id')] = e.cloneNode(True)
-                e.parentNode.removeChild(e)
-
-            for e in use_ele:
-                ref = e.getAttribute('xlink:href')
-
-                if ref in symbols and e.hasAttribute('x') and e.hasAttribute('y'):
-                    x   = float(e.getAttribute('x'))
-                    y   = float(e.getAttribute('y'))
-
-                    group = dom.createElement('g')
-
-                    for ce in symbols[ref].childNodes:
-                        node = ce.cloneNode(True)
-
-                        if node.nodeName == 'path':
-                            path = node.getAttribute('d')
-
-                            newpath = ''
-                            is_x = True
-                            for p in path.split():
-                                if not p:
-                                    continue
-
-                                if p[0].isupper():
-                                    dx = x
-                                    dy = y
-                                    newpath += p + ' '
-                                elif p[0].islower():
-                                    dx = 0
-                                    dy = 0
-                                    newpath += p + ' '
-                                elif p[0].isnumeric:
-                                    val = float(p) + (dx if is_x else dy)
-                                    is_x = not is_x
-                                    newpath += "%f " % val
-
-                            node.setAttribute('d', newpath)
-
-                        group.appendChild(node)
+        """ Make the raw SVG output of cairo compatible with Mapnik.
+        """
+        return mangle_svg(buf)
 
-                    e.parentNode.replaceChild(group, e)
-                else:
-                    e.parentNode.removeChild(e)
+    def _optimize_svg(self, buf):
+        """ Reduce the size of the SVG output when the setting
+            `svg_precision` is set. It is the number of decimals that
+            are kept for coordinates.
+        """
+        precision = self.config.svg_precision
+        if precision is None:
+            return buf
 
-        return dom.toxml()
+        return optimize_svg(buf, precision)
 
 
 class RefShieldMaker(ShieldMaker):
@@ -225,20 +387,16 @@ class RefShieldMaker(ShieldMaker):
 
     def _get_text_size(self, fnt):
         """ Compute the rendered size of `self.ref` in pixels.
+            The sizes are cached process-wide by font and text.
         """
-        l, _, _ = self.layout_ref(
-                cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 10,10)), fnt)
-        return l.get_pixel_size()
+        w, h, _ = text.text_metrics(fnt, self.ref)
+        return w, h
 
     def layout_ref(self, ctx, fnt):
-        layout = PangoCairo.create_layout(ctx)
-        if fnt is not None:
-            layout.set_font_description(Pango.FontDescription(fnt))
-        layout.set_text(self.ref, -1)
+        layout = text.create_layout(ctx, fnt, self.ref)
         tw, _ = layout.get_pixel_size()
-        baseh = layout.get_iter().get_baseline()/Pango.SCALE
 
-        return layout, tw, baseh
+        return layout, tw, text.baseline(layout)
 
     def render_layout(self, ctx, layout, color, x, y):
         if color is None:
@@ -0,0 +1,318 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Post-processing of the SVG output of cairo, so that the result can be
+used with Mapnik. Mapnik supports neither `<image>` elements nor the
+`<symbol>`/`<use>` construct that cairo uses for text glyphs. Images are
+therefore removed and, when the document has both symbols and uses,
+symbols are inlined with absolute coordinates.
+"""
+
+import re
+from xml.parsers.expat import ParserCreate, ExpatError
+
+_SYMBOL = re.compile(rb'<symbol[\s/>]')
+_USE = re.compile(rb'<use[\s/>]')
+
+def escape(data):
+    """ Escape text or an attribute value for XML output. Produces the
+        same output as the minidom serializer.
+    """
+    if '&' in data:
+        data = data.replace('&', '&amp;')
+    if '<' in data:
+        data = data.replace('<', '&lt;')
+    if '"' in data:
+        data = data.replace('"', '&quot;')
+    if '>' in data:
+        data = data.replace('>', '&gt;')
+
+    return data
+
+
+def translate_path(path, x, y):
+    """ Move an SVG path description by (x, y). Only absolute coordinates
+        need to be moved.
+    """
+    out = []
+    is_x = True
+    for p in path.split():
+        if p[0].isupper():
+            dx = x
+            dy = y
+            out.append(p)
+        elif p[0].islower():
+            dx = 0
+            dy = 0
+            out.append(p)
+        else:
+            out.append('%f' % (float(p) + (dx if is_x else dy)))
+            is_x = not is_x
+
+    return ' '.join(out) + ' ' if out else ''
+
+
+class _StreamingMangler(object):
+    """ Rewrites the SVG in a single pass over the parser events.
+
+        Symbols must be defined before they are used. This is always the
+        case in the output of cairo. When `inline` is False, symbols and
+        their uses are left alone.
+    """
+
+    def __init__(self, inline=True):
+        self.inline = inline
+        self.out = ['<?xml version="1.0" ?>']
+        self.tag_open = False  # True while the '>' of a start tag is missing
+        self.skip = 0          # depth inside an element that is dropped
+        self.symbols = {}
+        self.recording = None  # events of the symbol currently read
+        self.depth = 0         # element depth inside the recorded symbol
+        self.cdata = False     # True inside a CDATA section
+
+    def feed(self, buf):
+        parser = ParserCreate()
+        parser.buffer_text = True
+        parser.ordered_attributes = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.text
+        parser.CommentHandler = self.comment
+        parser.StartCdataSectionHandler = self.start_cdata
+        parser.EndCdataSectionHandler = self.end_cdata
+        parser.Parse(buf, True)
+
+        return ''.join(self.out).encode('utf8')
+
+    def start(self, name, attrs):
+        if self.skip:
+            self.skip += 1
+        elif self.recording is not None:
+            self.depth += 1
+            self.recording.append((0, name, attrs, self.depth))
+        elif name == 'image':
+            self.skip = 1
+        elif name == 'symbol' and self.inline:
+            self.recording = []
+            self.depth = 0
+            self.symbols['#' + _get_attr(attrs, 'id', '')] = self.recording
+        elif name == 'use' and self.inline:
+            self.skip = 1
+            self._inline_use(attrs)
+        else:
+            self._write_start(name, attrs)
+
+    def end(self, name):
+        if self.skip:
+            self.skip -= 1
+        elif self.recording is not None:
+            if self.depth == 0:
+                self.recording = None
+            else:
+                self.recording.append((1, name, None, self.depth))
+                self.depth -= 1
+        else:
+            self._write_end(name)
+
+    def text(self, data):
+        if self.skip:
+            return
+        if self.cdata:
+            self._raw(data)
+        elif self.recording is not None:
+            self.recording.append((2, data, None, self.depth))
+        else:
+            self._write_text(data)
+
+    def start_cdata(self):
+        if not self.skip:
+            self.cdata = True
+            self._raw('<![CDATA[')
+
+    def end_cdata(self):
+        if self.cdata:
+            self.cdata = False
+            self._raw(']]>')
+
+    def comment(self, data):
+        if not self.skip and self.recording is None:
+            self._close_tag()
+            self.out.append(f'<!--{data}-->')
+
+    def _raw(self, data):
+        """ Write unescaped output, used for CDATA sections.
+        """
+        if self.recording is not None:
+            self.recording.append((3, data, None, self.depth))
+        else:
+            self._close_tag()
+            self.out.append(data)
+
+    def _inline_use(self, attrs):
+        ref = _get_attr(attrs, 'xlink:href')
+        x = _get_attr(attrs, 'x')
+        y = _get_attr(attrs, 'y')
+        if ref not in self.symbols or x is None or y is None:
+            return
+
+        x = float(x)
+        y = float(y)
+        self._write_start('g', ())
+        for kind, data, attrs, depth in self.symbols[ref]:
+            if kind == 0:
+                if depth == 1 and data == 'path':
+                    attrs = list(attrs)
+                    for i in range(0, len(attrs), 2):
+                        if attrs[i] == 'd':
+                            attrs[i + 1] = translate_path(attrs[i + 1], x, y)
+                self._write_start(data, attrs)
+            elif kind == 1:
+                self._write_end(data)
+            elif kind == 2:
+                self._write_text(data)
+            else:
+                self._close_tag()
+                self.out.append(data)
+        self._write_end('g')
+
+    def _close_tag(self):
+        if self.tag_open:
+            self.out.append('>')
+            self.tag_open = False
+
+    def _write_start(self, name, attrs):
+        self._close_tag()
+        out = self.out
+        out.append('<' + name)
+        for i in range(0, len(attrs), 2):
+            out.append(f' {attrs[i]}="{escape(attrs[i + 1])}"')
+        self.tag_open = True
+
+    def _write_end(self, name):
+        if self.tag_open:
+            self.out.append('/>')
+            self.tag_open = False
+        else:
+            self.out.append(f'</{name}>')
+
+    def _write_text(self, data):
+        self._close_tag()
+        self.out.append(escape(data))
+
+
+def _get_attr(attrs, name, default=None):
+    for i in range(0, len(attrs), 2):
+        if attrs[i] == name:
+            return attrs[i + 1]
+
+    return default
+
+
+def _has_symbols_and_uses(buf):
+    """ Check if the document has both `<symbol>` and `<use>` elements.
+        Like `mangle_svg_dom()`, symbols are only inlined then.
+    """
+    if _SYMBOL.search(buf) is None or _USE.search(buf) is None:
+        return False
+
+    if b'<!' not in buf:
+        return True
+
+    # The markup might be part of a comment or a CDATA section.
+    found = set()
+
+    def start(name, attrs):
+        if name in ('symbol', 'use'):
+            found.add(name)
+
+    parser = ParserCreate()
+    parser.StartElementHandler = start
+    parser.Parse(buf, True)
+
+    return len(found) == 2
+
+
+def mangle_svg(buf):
+    """ Make the SVG document `buf` compatible with Mapnik. Takes and
+        returns the document as UTF-8 encoded bytes. The document is
+        processed in a single streaming pass.
+    """
+    try:
+        return _StreamingMangler(_has_symbols_and_uses(buf)).feed(buf)
+    except ExpatError:
+        raise RuntimeError("Cannot parse SVG shield.")
+
+
+def mangle_svg_dom(buf):
+    """ DOM-based implementation of `mangle_svg()`. Takes and returns
+        the document as a string. Kept as a reference for testing
+        and benchmarking.
+    """
+    from xml.dom.minidom import parseString as xml_parse
+
+    try:
+        dom = xml_parse(buf)
+    except ExpatError:
+        raise RuntimeError("Cannot parse SVG shield.")
+
+    for svg in dom.getElementsByTagName("svg"):
+        # image elements are not supported by Mapnik. Remove.
+        for e in svg.getElementsByTagName("image"):
+            e.parentNode.removeChild(e)
+
+        sym_ele = svg.getElementsByTagName("symbol")
+        use_ele = svg.getElementsByTagName("use")
+
+        if sym_ele.length == 0 or use_ele.length == 0:
+            continue
+
+        symbols = {}
+        for e in sym_ele:
+            symbols['#' + e.getAttribute('id')] = e.cloneNode(True)
+            e.parentNode.removeChild(e)
+
+        for e in use_ele:
+            ref = e.getAttribute('xlink:href')
+
+            if ref in symbols and e.hasAttribute('x') and e.hasAttribute('y'):
+                x   = float(e.getAttribute('x'))
+                y   = float(e.getAttribute('y'))
+
+                group = dom.createElement('g')
+
+                for ce in symbols[ref].childNodes:
+                    node = ce.cloneNode(True)
+
+                    if node.nodeName == 'path':
+                        path = node.getAttribute('d')
+
+                        newpath = ''
+                        is_x = True
+                        for p in path.split():
+                            if not p:
+                                continue
+
+                            if p[0].isupper():
+                                dx = x
+                                dy = y
+                                newpath += p + ' '
+                            elif p[0].islower():
+                                dx = 0
+                                dy = 0
+                                newpath += p + ' '
+                            elif p[0].isnumeric:
+                                val = float(p) + (dx if is_x else dy)
+                                is_x = not is_x
+                                newpath += "%f " % val
+
+                        node.setAttribute('d', newpath)
+
+                    group.appendChild(node)
+
+                e.parentNode.replaceChild(group, e)
+            else:
+                e.parentNode.removeChild(e)
+
+    return dom.toxml()
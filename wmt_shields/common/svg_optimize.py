@@ -0,0 +1,333 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Size optimisation for SVG shields after they have been made compatible
+with Mapnik by `mangle_svg()`. The optimiser rounds coordinates, drops
+whitespace, comments, unreferenced ids, empty and redundant groups and
+style declarations that do not change the rendering, and moves styles
+that are shared by neighbouring elements into a common group.
+
+The optimiser never introduces elements that Mapnik cannot handle. It
+only creates `<g>` elements, which Mapnik supports.
+"""
+
+import re
+from xml.parsers.expat import ParserCreate, ExpatError
+
+from .svg_mangle import escape
+
+# Attributes with coordinates or lengths that are rounded.
+_NUMERIC_ATTRIBUTES = frozenset(('d', 'points', 'x', 'y',
+                                 'x1', 'y1', 'x2', 'y2', 'cx', 'cy',
+                                 'r', 'rx', 'ry', 'width', 'height'))
+
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+# Initial values of inherited style properties, which may be dropped
+# when the parent has the same value.
+_INHERITED_DEFAULTS = {'fill-opacity': '1', 'fill-rule': 'nonzero',
+                       'stroke': 'none', 'stroke-opacity': '1',
+                       'stroke-width': '1', 'stroke-linecap': 'butt',
+                       'stroke-linejoin': 'miter', 'stroke-miterlimit': '4',
+                       'stroke-dasharray': 'none', 'stroke-dashoffset': '0'}
+
+# Further inherited properties without a default that is safe to drop.
+_INHERITED = frozenset(_INHERITED_DEFAULTS) | frozenset(('fill', 'color',
+                       'font-family', 'font-size', 'font-style', 'font-weight',
+                       'visibility'))
+
+# Defaults of properties that are not inherited.
+_OTHER_DEFAULTS = {'opacity': '1'}
+
+# Elements where whitespace in the text content is significant.
+_TEXT_ELEMENTS = frozenset(('text', 'tspan', 'textPath', 'title', 'desc', 'style'))
+
+# Elements that may contain a group.
+_CONTAINERS = frozenset(('svg', 'g'))
+
+# Transformations that do nothing. Other transformations are not rounded
+# because scale factors need a higher precision than coordinates.
+_IDENTITY = ('matrix(1,0,0,1,0,0)', 'matrix(1 0 0 1 0 0)', 'translate(0,0)',
+             'translate(0 0)', 'translate(0)', 'scale(1)', 'scale(1,1)')
+
+
+class _Element(object):
+    """ An element of the document tree. Attributes are kept as a dict,
+        which preserves their order. Children are elements or strings.
+    """
+    __slots__ = ('name', 'attrs', 'children')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+
+
+def _parse(buf):
+    root = _Element('', {})
+    stack = [root]
+
+    def start(name, attrs):
+        element = _Element(name, dict(zip(attrs[::2], attrs[1::2])))
+        stack[-1].children.append(element)
+        stack.append(element)
+
+    def end(name):
+        stack.pop()
+
+    def text(data):
+        if data.strip() or stack[-1].name in _TEXT_ELEMENTS:
+            stack[-1].children.append(data)
+
+    parser = ParserCreate()
+    parser.buffer_text = True
+    parser.ordered_attributes = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text
+    parser.Parse(buf, True)
+
+    return root.children[0]
+
+
+def format_number(value, precision):
+    """ Format a float with at most `precision` decimals and without
+        trailing zeros.
+    """
+    out = f'{value:.{precision}f}'
+    if '.' in out:
+        out = out.rstrip('0').rstrip('.')
+    if out in ('-0', '+0'):
+        out = '0'
+
+    return out
+
+
+def round_numbers(value, precision):
+    """ Round all numbers in the attribute value `value` and
+        normalise the whitespace.
+    """
+    def _round(m):
+        out = format_number(float(m.group(0)), precision)
+        # Numbers in compact notation like '1.5.5' must stay separate.
+        start = m.start()
+        if start > 0 and out[0] != '-' and m.string[start - 1] in '0123456789.':
+            out = ' ' + out
+        return out
+
+    return ' '.join(_NUMBER.sub(_round, value).split())
+
+
+def _parse_style(style):
+    decls = {}
+    for decl in style.split(';'):
+        key, sep, value = decl.partition(':')
+        if sep:
+            decls[key.strip()] = value.strip()
+
+    return decls
+
+
+def _format_style(decls):
+    return ';'.join(f'{k}:{v}' for k, v in decls.items())
+
+
+def _is_inheritable(decls):
+    return all(k in _INHERITED for k in decls)
+
+
+def _can_take_style(node):
+    """ Check that the style of the element `node` may be moved
+        between the element and a group. Presentation attributes
+        have a lower priority than styles, so that they must not be
+        present.
+    """
+    return isinstance(node, _Element) and not any(k in _INHERITED for k in node.attrs)
+
+
+class _Optimizer(object):
+
+    def __init__(self, precision):
+        self.precision = precision
+        self.references = set()
+
+    def collect_references(self, element):
+        """ Find all ids that are referenced with `url(#...)` or a link.
+        """
+        for key, value in element.attrs.items():
+            if key.endswith('href') and value.startswith('#'):
+                self.references.add(value[1:])
+            elif 'url(#' in value:
+                self.references.update(re.findall(r'url\(#([^)]+)\)', value))
+
+        for child in element.children:
+            if isinstance(child, _Element):
+                self.collect_references(child)
+
+    def optimize(self, element, inherited):
+        """ Optimise the subtree of `element`, where `inherited` are the
+            inherited style properties of the parent.
+        """
+        attrs = element.attrs
+        if element.name != 'svg':
+            for key, value in attrs.items():
+                if key in _NUMERIC_ATTRIBUTES:
+                    attrs[key] = round_numbers(value, self.precision)
+            if 'transform' in attrs \
+               and round_numbers(attrs['transform'], 6) in _IDENTITY:
+                del attrs['transform']
+            if 'id' in attrs and attrs['id'] not in self.references:
+                del attrs['id']
+
+        inherited = self._clean_style(attrs, inherited)
+
+        children = []
+        for child in element.children:
+            if isinstance(child, str):
+                children.append(child)
+                continue
+
+            self.optimize(child, inherited)
+            if child.name in ('g', 'defs') and not child.children:
+                continue
+            if child.name == 'g' and not child.attrs:
+                children.extend(child.children)
+            elif child.name == 'g' and list(child.attrs) == ['style'] \
+                 and len(child.children) == 1 \
+                 and _can_take_style(child.children[0]) \
+                 and _is_inheritable(_parse_style(child.attrs['style'])):
+                children.append(self._merge_into_child(child))
+            else:
+                children.append(child)
+
+        if element.name in _CONTAINERS:
+            children = self._merge_styles(children)
+
+        element.children = children
+
+    def _clean_style(self, attrs, inherited):
+        """ Remove style declarations and presentation attributes that
+            do not change the rendering. Returns the style properties
+            the children inherit.
+        """
+        own = {}
+        for key in list(attrs):
+            if key in _INHERITED_DEFAULTS or key in _OTHER_DEFAULTS:
+                own[key] = attrs[key].strip()
+                if self._is_redundant(key, own[key], inherited):
+                    del attrs[key]
+
+        if 'style' in attrs:
+            decls = _parse_style(attrs['style'])
+            for key in list(decls):
+                own[key] = decls[key]
+                if self._is_redundant(key, decls[key], inherited):
+                    del decls[key]
+            if decls:
+                attrs['style'] = _format_style(decls)
+            else:
+                del attrs['style']
+
+        if not own:
+            return inherited
+
+        result = dict(inherited)
+        result.update((k, v) for k, v in own.items() if k in _INHERITED)
+
+        return result
+
+    @staticmethod
+    def _is_redundant(key, value, inherited):
+        if key in _INHERITED:
+            return inherited.get(key, _INHERITED_DEFAULTS.get(key)) == value
+
+        return _OTHER_DEFAULTS.get(key) == value
+
+    @staticmethod
+    def _merge_into_child(group):
+        """ Move the style of a group with a single child into the child.
+        """
+        child = group.children[0]
+        decls = _parse_style(group.attrs['style'])
+        decls.update(_parse_style(child.attrs.get('style', '')))
+        child.attrs['style'] = _format_style(decls)
+
+        return child
+
+    @staticmethod
+    def _merge_styles(children):
+        """ Wrap runs of neighbouring elements with the same style into
+            a group that carries the style.
+        """
+        out = []
+        run = []
+        run_style = None
+
+        def flush():
+            if len(run) > 1:
+                group = _Element('g', {'style': run_style})
+                for element in run:
+                    del element.attrs['style']
+                group.children = list(run)
+                out.append(group)
+            else:
+                out.extend(run)
+            run.clear()
+
+        for child in children:
+            style = child.attrs.get('style') if _can_take_style(child) else None
+            if style is not None and style == run_style:
+                run.append(child)
+                continue
+
+            flush()
+            if style is not None and _is_inheritable(_parse_style(style)):
+                run_style = style
+                run.append(child)
+            else:
+                run_style = None
+                out.append(child)
+
+        flush()
+
+        return out
+
+
+def _serialize(element, out):
+    out.append('<' + element.name)
+    for key, value in element.attrs.items():
+        out.append(f' {key}="{escape(value)}"')
+
+    if not element.children:
+        out.append('/>')
+        return
+
+    out.append('>')
+    for child in element.children:
+        if isinstance(child, str):
+            out.append(escape(child))
+        else:
+            _serialize(child, out)
+    out.append(f'</{element.name}>')
+
+
+def optimize_svg(buf, precision=2):
+    """ Reduce the size of the SVG document `buf`. Coordinates are
+        rounded to `precision` decimals. Takes and returns the document
+        as UTF-8 encoded bytes.
+    """
+    try:
+        root = _parse(buf)
+    except ExpatError:
+        raise RuntimeError("Cannot parse SVG shield.")
+
+    optimizer = _Optimizer(precision)
+    optimizer.collect_references(root)
+    optimizer.optimize(root, {})
+
+    out = ['<?xml version="1.0" ?>']
+    _serialize(root, out)
+
+    return ''.join(out).encode('utf8')
@@ -4,15 +4,18 @@
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
 import re
+from functools import lru_cache
 from dataclasses import dataclass
 from typing import Dict, Sequence
 
+_HEX_COLOR = re.compile('#([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})$')
+
 @dataclass
 class Tag:
     k: str
     v: str
 
-@dataclass
+@dataclass(frozen=True)
 class OsmColor:
     name: str
     rgb: str
@@ -28,6 +31,11 @@ class Tags(object):
     def __getattr__(self, name: str):
         return getattr(self._tags, name)
 
+    def __contains__(self, key: str) -> bool:
+        return key in self._tags
+
+    def get(self, key: str, default: str=None) -> str:
+        return self._tags.get(key, default)
 
     def first_of(self, *keys, default: str=None) -> str:
         """ Return the first value for a list of keys. If none of the
@@ -57,8 +65,9 @@ class Tags(object):
         if isinstance(tags, dict):
             tags = tags.items()
 
+        get = self._tags.get
         for k, v in tags:
-            if self._tags.get(k) != v:
+            if get(k) != v:
                 return False
 
         return True
@@ -71,21 +80,14 @@ class Tags(object):
         """
         ref = self.first_of(*refs)
         if ref is not None:
-            return re.sub(' ', '', ref)[:maxlen]
+            return _shorten_ref(ref, maxlen)
 
         # try some magic with the name
         name = self.first_of(*names)
         if name is None:
             return None
 
-        if len(name) <= maxlen:
-            return name
-
-        ref = ''.join(filter(lambda c: c.isdigit() or c.isupper(), name))[:maxlen]
-        if len(ref) < 2:
-            ref = re.sub(' ', '', name)[:maxlen]
-
-        return ref
+        return _abbreviate_name(name, maxlen)
 
     def as_color(self, keys: Sequence[str]=('color', 'colour'),
                  color_names: dict=None) -> OsmColor:
@@ -105,11 +107,73 @@ class Tags(object):
         if color_names is not None and color in color_names:
             return OsmColor(color, color_names[color])
 
-        m = re.match('#([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})([0-9A-Fa-f]{2})$', color)
-        if not m:
+        rgb = _parse_hex_color(color)
+        if rgb is None:
             return None
 
-        return OsmColor(color[1:], ((1.0+int(m.group(1),16))/256.0,
-                                   (1.0+int(m.group(2),16))/256.0,
-                                   (1.0+int(m.group(3),16))/256.0))
+        return OsmColor(color[1:], rgb)
+
+
+class TagMatcher(object):
+    """ Finds the first entry in an ordered mapping of names to tag lists
+        where all tags are contained in a set of OSM tags. The tag lists
+        are indexed by their first tag, so that only entries are checked
+        which can possibly match.
+    """
+
+    def __init__(self, entries: dict):
+        self._unconditional = None
+        self._index = {}
+        for order, (name, tags) in enumerate(entries.items()):
+            tags = list(tags.items() if isinstance(tags, dict) else tags)
+            if not tags:
+                if self._unconditional is None:
+                    self._unconditional = (order, name)
+                continue
+            k, v = tags[0]
+            self._index.setdefault(k, {}).setdefault(v, []).append((order, name, tags[1:]))
+
+    def match(self, tags: Tags):
+        """ Return the name of the first entry matching `tags` or None.
+        """
+        best = self._unconditional
+        for key, values in self._index.items():
+            value = tags.get(key)
+            if value is None or value not in values:
+                continue
+            for order, name, rest in values[value]:
+                if best is not None and best[0] < order:
+                    break
+                if tags.contains_all_tags(rest):
+                    best = (order, name)
+                    break
+
+        return None if best is None else best[1]
+
+
+@lru_cache(maxsize=4096)
+def _shorten_ref(ref, maxlen):
+    return ref.replace(' ', '')[:maxlen]
+
+
+@lru_cache(maxsize=4096)
+def _abbreviate_name(name, maxlen):
+    if len(name) <= maxlen:
+        return name
+
+    ref = ''.join(c for c in name if c.isdigit() or c.isupper())[:maxlen]
+    if len(ref) < 2:
+        ref = name.replace(' ', '')[:maxlen]
+
+    return ref
+
+
+@lru_cache(maxsize=1024)
+def _parse_hex_color(color):
+    m = _HEX_COLOR.match(color)
+    if not m:
+        return None
 
+    return ((1.0+int(m.group(1),16))/256.0,
+            (1.0+int(m.group(2),16))/256.0,
+            (1.0+int(m.group(3),16))/256.0)
@@ -0,0 +1,97 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Text layout for shields.
+
+Creating a Pango context means resolving the font map and font options,
+and every new context starts with an empty font cache. This module keeps
+one long-lived Pango context per thread and set of font options, so that
+fonts are resolved once and then reused for all shields. Parsed font
+descriptions are shared as well.
+
+Layouts are always created for a specific cairo context. The Pango context
+is updated to the transformation of the cairo context before the layout is
+created. A layout should be used right away, before the next layout is
+created in the same thread.
+"""
+
+import threading
+from functools import lru_cache
+
+from .graphics import cairo, Pango, PangoCairo
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=64)
+def font_description(fnt):
+    """ Return the Pango font description for the font string `fnt`
+        or None if no font is given.
+    """
+    return None if fnt is None else Pango.FontDescription(fnt)
+
+
+def _font_options_key(ctx):
+    options = ctx.get_target().get_font_options()
+    options.merge(ctx.get_font_options())
+
+    return (options.get_antialias(), options.get_hint_style(),
+            options.get_hint_metrics(), options.get_subpixel_order())
+
+
+def pango_context(ctx):
+    """ Return the Pango context of the current thread that matches the
+        font options of the cairo context `ctx`, updated to the state
+        of `ctx`.
+    """
+    contexts = getattr(_local, 'contexts', None)
+    if contexts is None:
+        contexts = _local.contexts = {}
+
+    key = _font_options_key(ctx)
+    pctx = contexts.get(key)
+    if pctx is None:
+        pctx = PangoCairo.FontMap.get_default().create_context()
+        contexts[key] = pctx
+
+    PangoCairo.update_context(ctx, pctx)
+
+    return pctx
+
+
+def create_layout(ctx, fnt, text):
+    """ Return a Pango layout for `text` in font `fnt` to be drawn
+        on the cairo context `ctx`.
+    """
+    layout = Pango.Layout.new(pango_context(ctx))
+    desc = font_description(fnt)
+    if desc is not None:
+        layout.set_font_description(desc)
+    layout.set_text(text, -1)
+
+    return layout
+
+
+def baseline(layout):
+    """ Return the baseline of the first line of `layout` in pixels.
+    """
+    return layout.get_iter().get_baseline()/Pango.SCALE
+
+
+@lru_cache(maxsize=4096)
+def text_metrics(fnt, text):
+    """ Return width, height and baseline of `text` rendered with the
+        font `fnt`. The measurement is done on a scratch surface which is
+        shared by all calls from the same thread.
+    """
+    ctx = getattr(_local, 'scratch', None)
+    if ctx is None:
+        ctx = cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 10, 10))
+        _local.scratch = ctx
+
+    layout = create_layout(ctx, fnt, text)
+    w, h = layout.get_pixel_size()
+
+    return w, h, baseline(layout)
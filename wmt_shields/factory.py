@@ -3,9 +3,12 @@
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
-from .common.config import ShieldConfig
+from .common.config import compile_config
 from .common.tags import Tags
-from .common.shield_maker import load_shield_maker
+from .common.shield_maker import load_shield_maker, style_attribute,\
+                                 style_name, ShieldMaker, ShieldSpec,\
+                                 shield_maker_class, supports_spec
+from .common.cache import config_fingerprint, LRUCache
 
 class ShieldFactory(object):
     """ A shield factory renders a shield according to the configured styles.
@@ -25,21 +28,331 @@ class ShieldFactory(object):
         takes a list of tags, a string describing the region and a pointer
         to the configuration to use. It must return a ShieldMaker object
         or None if the style is not responsible for these kind of tags.
+
+        Styles may declare which tags they react to with the optional
+        attributes `dispatch_keys` and `dispatch_regions`, either as a
+        tuple or as a function taking the configuration and returning
+        the tuple. The style is then only tried when the tags contain at
+        least one of the keys (a key ending in '*' matches all keys with
+        the given prefix) and the region is one of the given regions.
+        Styles without these attributes are always tried. Functions are
+        evaluated with the effective configuration, which includes the
+        extra settings given to `create()`.
+
+        `cache` optionally takes a `ShieldCache` object. When given, the
+        shield makers returned by the factory save their rendered images
+        in the cache, keyed by their uuid and a fingerprint of the
+        effective configuration.
+
+        The configuration is read once when the factory is created.
+        Styles receive an immutable `CompiledConfig` snapshot, so later
+        changes to `config` have no effect on the factory.
     """
 
-    def __init__(self, styles, config):
+    MAX_COMPILED_CONFIGS = 1024
+
+    def __init__(self, styles, config, cache=None):
         self.config = config
         self.styles = [load_shield_maker(style) for style in styles]
+        self.style_names = [style_name(style) for style in self.styles]
+        self.cache = cache
+        self._fingerprint = config_fingerprint(config)
+        self._base_config = compile_config(config)
+        # Dispatch attributes given as functions may depend on the
+        # configuration. Otherwise one index is enough for all settings.
+        self._config_dispatch = any(callable(getattr(style, attr, None))
+                                    for style in self.styles
+                                    for attr in ('dispatch_keys', 'dispatch_regions'))
+        self._base_index = _DispatchIndex(self.styles, self._base_config)
+        self._base_entry = (self._base_config, self._fingerprint, self._base_index)
+        self._configs = LRUCache(self.MAX_COMPILED_CONFIGS)
 
     def create(self, tags, region, **kwargs):
-        config = ShieldConfig(self.config, kwargs)
+        return self._create(tags, region, kwargs)[1]
+
+    def create_spec(self, tags, region, **kwargs):
+        """ Return the `ShieldSpec` for the shield that `create()` would
+            return or None if no style matches or the shield maker does
+            not support specs.
+        """
+        shield = self.create(tags, region, **kwargs)
+        return shield.shield_spec(kwargs) if supports_spec(shield) else None
+
+    def create_from_spec(self, spec: ShieldSpec):
+        """ Recreate a shield maker from a `ShieldSpec` with the
+            configuration of this factory.
+        """
+        config, fingerprint, _ = self._get_config(dict(spec.kwargs))
+        shield = shield_maker_class(spec.maker)(*spec.args, config)
+        if self.cache is not None:
+            shield.cache = self.cache
+            shield.cache_fingerprint = fingerprint
+
+        return shield
+
+    def classify(self, inputs):
+        """ Determine the shields for a sequence of `(tags, region, kwargs)`
+            tuples without rendering them. Yields a tuple
+            `(style name, uuid)` for each input or `(None, None)` if
+            no style matches. Only the shield makers are created, no
+            images or text layouts, so this is cheap enough to process
+            the tags of a complete database.
+        """
+        for tags, region, kwargs in inputs:
+            idx, shield = self._create(tags, region, kwargs or {})
+            if shield is None:
+                yield None, None
+            else:
+                yield self.style_names[idx], shield.uuid()
+
+    def new_shields(self, inputs, manifest):
+        """ Classify the `(tags, region, kwargs)` tuples in `inputs` and
+            yield `(style name, uuid, input)` for all shields whose uuid
+            is not yet part of the `UuidManifest` `manifest`. Every uuid
+            is yielded only once and added to the manifest. The caller
+            should flush the manifest once the new shields have been saved.
+            This is `unique_shields()` with the style name instead of the
+            shield maker.
+        """
+        for idx, uuid, inp, _ in self._unique(inputs, manifest):
+            yield self.style_names[idx], uuid, inp
+
+    def _create(self, tags, region, kwargs):
+        config, fingerprint, index = self._get_config(kwargs)
         t = Tags(tags)
+        for idx in index.candidates(tags, region):
+            shield = self.styles[idx].create_for(t, region, config)
+            if shield is not None:
+                if self.cache is not None and isinstance(shield, ShieldMaker):
+                    shield.cache = self.cache
+                    shield.cache_fingerprint = fingerprint
+                return idx, shield
+
+        return None, None
+
+    def get_config(self, **kwargs):
+        """ Return the compiled configuration that is used for shields
+            created with the extra settings `kwargs`.
+        """
+        return self._get_config(kwargs)[0]
+
+    def _get_config(self, kwargs):
+        """ Return the compiled configuration, its fingerprint and the
+            dispatch index for the given extra settings. Snapshots are
+            shared between all shields created with the same settings,
+            the least recently used ones are dropped when there are more
+            than `MAX_COMPILED_CONFIGS`.
+        """
+        if not kwargs:
+            return self._base_entry
+
+        try:
+            key = tuple(sorted(kwargs.items()))
+            hash(key)
+        except TypeError:
+            key = None
+        else:
+            entry = self._configs.get(key)
+            if entry is not None:
+                return entry
+
+        config = self._base_config.derive(**kwargs)
+        index = _DispatchIndex(self.styles, config) if self._config_dispatch\
+                else self._base_index
+        entry = (config, config_fingerprint(kwargs, self._fingerprint), index)
+
+        if key is not None:
+            self._configs.put(key, entry)
+
+        return entry
+
+    def prewarm(self):
+        """ Load all image templates used by the configured styles, so
+            that they need not be read and parsed during rendering.
+            Styles may support this by supplying a function
+            `prewarm(config: ShieldConfig)`.
+        """
         for style in self.styles:
-            shield = style.create_for(t, region, config)
+            if hasattr(style, 'prewarm'):
+                style.prewarm(self._base_config)
+
+    def warm_up(self):
+        """ Render a simple shield, so that fonts and the Pango context,
+            which are initialised lazily, are ready before the first real
+            shield is rendered. In a server, call this before forking
+            workers, so that the cost is only paid once.
+        """
+        shield = self.create({'ref': '0'}, '')
+        if isinstance(shield, ShieldMaker):
+            try:
+                shield._create_image('svg')
+            except Exception:
+                pass # any real problem will show up again with the first job
+
+    def render_many(self, inputs, jobs=None, format='svg'):
+        """ Render the shields for a sequence of `(tags, region, kwargs)`
+            tuples and yield `(uuid, image)` pairs as they become ready.
+            Every shield is rendered only once even if multiple inputs
+            result in the same uuid. Inputs where no style matches are
+            ignored.
+
+            When `jobs` is larger than 1, the rendering is done in a pool
+            of that many worker processes. The results are then returned
+            in the order they finish.
+        """
+        if jobs is None or jobs <= 1:
+            for uuid, _, shield in self.unique_shields(inputs):
+                yield uuid, shield.create_image(format)
+            return
+
+        with self.worker_pool(jobs) as pool:
+            yield from self.render_in_pool(pool, self.unique_shields(inputs),
+                                           format, window=4 * jobs)
+
+    def worker_pool(self, jobs):
+        """ Return a pool of `jobs` worker processes for rendering with
+            `render_in_pool()`. All processes are started immediately.
+            Create the pool before starting any threads, the workers
+            are forked where possible.
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Workers get a copy of the factory when they are forked. Other
+        # start methods require the styles and configuration to be
+        # picklable.
+        if 'fork' in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context('fork')
+        else:
+            mp_context = None
+
+        pool = ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context,
+                                   initializer=_init_worker, initargs=(self, ))
+        pool.submit(int).result()
+
+        return pool
+
+    def render_in_pool(self, pool, items, format='svg', window=16):
+        """ Render the `(uuid, input, shield)` tuples in `items`, as
+            returned by `unique_shields()`, in the worker pool `pool`
+            and yield `(uuid, image)` pairs in the order they finish.
+            At most `window` shields are queued in the pool at any time.
+
+            Workers receive the `ShieldSpec` of the shield or, for shield
+            makers that do not support specs, the input.
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        pending = set()
+        for uuid, inp, shield in items:
+            job = shield.shield_spec(inp[2]) if supports_spec(shield) else inp
+            pending.add(pool.submit(_render_in_worker, uuid, job, format))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    def unique_shields(self, inputs, manifest=None):
+        """ Create the shields for a sequence of `(tags, region, kwargs)`
+            tuples and yield `(uuid, input, shield)` for the first input
+            of each uuid. Inputs where no style matches are ignored.
+            When a `UuidManifest` is given, uuids already recorded there
+            are skipped and new ones are added.
+        """
+        for _, uuid, inp, shield in self._unique(inputs, manifest):
+            yield uuid, inp, shield
+
+    def _unique(self, inputs, manifest):
+        """ Yield `(style index, uuid, input, shield)` for the first
+            input of each uuid that is not in `manifest`.
+        """
+        if manifest is None:
+            seen = set()
+            def is_new(uuid):
+                if uuid in seen:
+                    return False
+                seen.add(uuid)
+                return True
+        else:
+            is_new = manifest.add
+
+        for inp in inputs:
+            tags, region, kwargs = inp
+            idx, shield = self._create(tags, region, kwargs or {})
             if shield is not None:
-                return shield
+                uuid = shield.uuid()
+                if is_new(uuid):
+                    yield idx, uuid, inp, shield
+
+
+class _DispatchIndex(object):
+    """ Index of the styles by the tag keys and regions they react to
+        for one configuration.
+    """
+
+    def __init__(self, styles, config):
+        self._always = []
+        self._by_key = {}
+        self._by_prefix = []
+        self._regions = []
+
+        for i, style in enumerate(styles):
+            keys = style_attribute(style, 'dispatch_keys', config)
+            regions = style_attribute(style, 'dispatch_regions', config)
+            self._regions.append(None if regions is None else frozenset(regions))
+            if keys is None:
+                self._always.append(i)
+                continue
+
+            for key in keys:
+                if key.endswith('*'):
+                    self._by_prefix.append((key[:-1], i))
+                else:
+                    self._by_key.setdefault(key, []).append(i)
+
+        self._count = len(styles)
+        self.use_index = len(self._always) < len(styles)
+
+    def candidates(self, tags, region):
+        """ Return the indexes of the styles that may match, in their
+            original order.
+        """
+        if self.use_index:
+            found = set(self._always)
+            for key in tags:
+                styles = self._by_key.get(key)
+                if styles is not None:
+                    found.update(styles)
+            for prefix, i in self._by_prefix:
+                if i not in found and any(k.startswith(prefix) for k in tags):
+                    found.add(i)
+            indices = sorted(found)
+        else:
+            indices = range(self._count)
+
+        for i in indices:
+            if self._regions[i] is None or region in self._regions[i]:
+                yield i
+
+
+_worker_factory = None
 
-        return None
+def _init_worker(factory):
+    global _worker_factory
+    _worker_factory = factory
+    factory.warm_up()
 
 
+def _render_in_worker(uuid, job, format):
+    if isinstance(job, ShieldSpec):
+        shield = _worker_factory.create_from_spec(job)
+    else:
+        tags, region, kwargs = job
+        shield = _worker_factory.create(tags, region, **(kwargs or {}))
 
+    return uuid, shield.create_image(format)
@@ -5,15 +5,36 @@
 
 from .common.tags import Tags
 from .common.config import ShieldConfig
-from .common.shield_maker import load_shield_maker
+from .common.shield_maker import load_shield_maker, style_attribute, style_name
 
 def tags_all(style, filter_tags):
     style_mod = load_shield_maker(style)
     class _TagsAll:
+        name = style_name(style_mod)
+
         def create_for(tags: Tags, region: str, config: ShieldConfig):
             if tags.contains_all_tags(filter_tags):
                 return style_mod.create_for(tags, region, config)
 
             return None
 
+        def dispatch_keys(config: ShieldConfig):
+            tags = filter_tags.items() if isinstance(filter_tags, dict) else filter_tags
+            for k, _ in tags:
+                return (k, )
+
+            return style_attribute(style_mod, 'dispatch_keys', config)
+
+        def dispatch_regions(config: ShieldConfig):
+            return style_attribute(style_mod, 'dispatch_regions', config)
+
+        def catalogue(config: ShieldConfig):
+            tags = filter_tags.items() if isinstance(filter_tags, dict) else filter_tags
+            for stags in style_attribute(style_mod, 'catalogue', config) or ():
+                yield {**stags, **dict(tags)}
+
+        def prewarm(config: ShieldConfig):
+            if hasattr(style_mod, 'prewarm'):
+                style_mod.prewarm(config)
+
     return _TagsAll
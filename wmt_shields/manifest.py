@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Persistent record of the shields that have already been created.
+"""
+
+import os
+
+class UuidManifest(object):
+    """ Set of shield uuids that is saved in the text file `filename`
+        with one uuid per line. New uuids are only appended to the file,
+        so that updating even very large manifests is cheap.
+
+        When `fingerprint` is given, it is saved in the first line of
+        the file. A manifest that was created with a different
+        fingerprint, i.e. for a different configuration, is discarded.
+
+        Used as a context manager, the manifest is flushed at the end
+        unless an exception was raised. The new uuids may then belong to
+        shields that have not been saved.
+    """
+
+    def __init__(self, filename, fingerprint=None):
+        self.filename = str(filename)
+        self.fingerprint = fingerprint
+        self.uuids = set()
+        self._pending = []
+        self._load()
+
+    def __contains__(self, uuid):
+        return uuid in self.uuids
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def add(self, uuid):
+        """ Add a uuid to the manifest. Returns False when the uuid was
+            already known. The change is only saved with the next `flush()`.
+        """
+        if uuid in self.uuids:
+            return False
+
+        self.uuids.add(uuid)
+        self._pending.append(uuid)
+
+        return True
+
+    def flush(self):
+        """ Write all newly added uuids to the file.
+        """
+        if not self._pending:
+            return
+
+        with open(self.filename, 'a', encoding='utf-8') as f:
+            if f.tell() == 0 and self.fingerprint is not None:
+                f.write(f'# {self.fingerprint}\n')
+            for uuid in self._pending:
+                f.write(uuid)
+                f.write('\n')
+
+        self._pending = []
+
+    def _load(self):
+        try:
+            f = open(self.filename, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+
+        with f:
+            first = f.readline().rstrip('\n')
+            if first.startswith('# '):
+                if self.fingerprint is not None and first[2:] != self.fingerprint:
+                    f.close()
+                    os.unlink(self.filename)
+                    return
+            elif first:
+                self.uuids.add(first)
+
+            self.uuids.update(line.rstrip('\n') for line in f)
+
+        self.uuids.discard('')
@@ -0,0 +1,289 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Streaming creation of shields for all routes in a database.
+
+A pipeline is a chain of stages. Each stage is a function that takes an
+iterator over the output of the previous stage and returns an iterator
+over its own output. Every stage runs in its own thread and the stages
+are connected by bounded queues, so that memory use does not grow with
+the size of the database. A typical pipeline for shields is
+
+    db_source -> classify -> render -> sink
+
+and can be set up with `shield_pipeline()`:
+
+    conn = psycopg.connect(...)
+    stats = shield_pipeline(factory,
+                            db_source(conn.cursor(), 'SELECT tags, region FROM routes'),
+                            PackStore('/srv/shields/pack'), jobs=4)
+    for stage in stats:
+        print(stage)
+"""
+
+import json
+import time
+import queue
+import threading
+
+_END = object()
+
+
+class StageStats(object):
+    """ Throughput of a single stage. `elapsed` is the run time of the
+        stage, `wait_in` and `wait_out` the part of it that the stage
+        was waiting for input from the previous stage and for room in
+        the queue to the next stage.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.elapsed = 0.0
+        self.wait_in = 0.0
+        self.wait_out = 0.0
+
+    @property
+    def rate(self):
+        """ Items produced per second.
+        """
+        return self.items / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return f"{self.name}: {self.items} items in {self.elapsed:.2f}s"\
+               f" ({self.rate:.1f}/s, waiting {self.wait_in:.2f}s for input,"\
+               f" {self.wait_out:.2f}s for output)"
+
+
+class _Aborted(Exception):
+    """ Raised in a stage when another stage has failed.
+    """
+
+
+class Pipeline(object):
+    """ A chain of stages connected by queues with room for
+        `queue_size` items each.
+    """
+
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self.stages = []
+        self._abort = threading.Event()
+
+    def add(self, name, stage):
+        """ Append a stage. For the first stage, `stage` is called without
+            parameters and must return an iterable.
+        """
+        self.stages.append((name, stage))
+        return self
+
+    def run(self):
+        """ Run the pipeline until the first stage is exhausted and
+            the output of the last stage has been consumed. Returns
+            a list of `StageStats`, one for each stage. If any stage
+            fails, the other stages are stopped and the exception is
+            raised again.
+        """
+        self._abort.clear()
+        stats = [StageStats(name) for name, _ in self.stages]
+        errors = []
+        threads = []
+        inq = None
+        for (_, stage), stat in zip(self.stages, stats):
+            outq = queue.Queue(self.queue_size)
+            thread = threading.Thread(target=self._run_stage,
+                                      args=(stage, stat, inq, outq, errors),
+                                      daemon=True)
+            thread.start()
+            threads.append(thread)
+            inq = outq
+
+        # Discard the output of the last stage.
+        for _ in self._read(inq, None):
+            pass
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        return stats
+
+    def _run_stage(self, stage, stat, inq, outq, errors):
+        start = time.perf_counter()
+        try:
+            items = stage() if inq is None else stage(self._read(inq, stat))
+            for item in items:
+                self._put(outq, item, stat)
+                stat.items += 1
+        except _Aborted:
+            pass
+        except BaseException as ex:
+            errors.append(ex)
+            self._abort.set()
+        finally:
+            stat.elapsed = time.perf_counter() - start
+            try:
+                self._put(outq, _END, stat)
+            except _Aborted:
+                pass
+
+    def _read(self, inq, stat):
+        while True:
+            start = time.perf_counter()
+            item = self._get(inq)
+            if stat is not None:
+                stat.wait_in += time.perf_counter() - start
+            if item is _END:
+                return
+            yield item
+
+    def _get(self, inq):
+        while True:
+            try:
+                return inq.get(timeout=0.1)
+            except queue.Empty:
+                if self._abort.is_set():
+                    raise _Aborted()
+
+    def _put(self, outq, item, stat):
+        start = time.perf_counter()
+        while True:
+            try:
+                outq.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self._abort.is_set():
+                    raise _Aborted()
+        stat.wait_out += time.perf_counter() - start
+
+
+def row_to_input(row):
+    """ Convert a database row `(tags, region[, kwargs])` into the
+        `(tags, region, kwargs)` tuple expected by the shield factory.
+        Tags and extra settings may be given as JSON strings.
+    """
+    tags = row[0]
+    if isinstance(tags, str):
+        tags = json.loads(tags)
+
+    kwargs = row[2] if len(row) > 2 else None
+    if isinstance(kwargs, str):
+        kwargs = json.loads(kwargs)
+
+    return tags, row[1] or '', kwargs or {}
+
+
+def db_source(cursor, query, params=None, batch_size=1000, convert=row_to_input):
+    """ Source stage which executes `query` on a DB-API `cursor` and
+        yields the rows converted with `convert`. Rows are fetched in
+        batches of `batch_size`.
+    """
+    def _source():
+        if params is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, params)
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield convert(row)
+
+    return _source
+
+
+def sqlite_source(database, query, params=None, batch_size=1000, convert=row_to_input):
+    """ Source stage which reads from the SQLite file `database`.
+        The connection is opened in the thread of the stage.
+    """
+    def _source():
+        import sqlite3
+
+        conn = sqlite3.connect(database)
+        try:
+            yield from db_source(conn.cursor(), query, params,
+                                 batch_size, convert)()
+        finally:
+            conn.close()
+
+    return _source
+
+
+def classify(factory, manifest=None):
+    """ Stage which creates the shield makers for `(tags, region, kwargs)`
+        tuples and yields `(uuid, input, shield)` once per uuid. When a
+        `UuidManifest` is given, shields that are recorded there are
+        skipped.
+    """
+    def _classify(inputs):
+        return factory.unique_shields(inputs, manifest)
+
+    return _classify
+
+
+def render(factory, format='svg', pool=None, window=16):
+    """ Stage which renders the output of `classify()` and yields
+        `(uuid, image)` pairs. The shields are rendered in the stage's
+        thread or, when given, in the worker pool `pool` from
+        `ShieldFactory.worker_pool()`.
+    """
+    def _render(items):
+        if pool is None:
+            for uuid, _, shield in items:
+                yield uuid, shield.create_image(format)
+        else:
+            yield from factory.render_in_pool(pool, items, format, window)
+
+    return _render
+
+
+def sink(store, format='svg'):
+    """ Stage which saves the `(uuid, image)` pairs with `store.put()`
+        under the name `<uuid>.<format>`. `store` may for example be a
+        `DirectoryStore` or `PackStore`. Yields the names.
+    """
+    def _sink(items):
+        for uuid, image in items:
+            name = f'{uuid}.{format}'
+            store.put(name, image)
+            yield name
+
+    return _sink
+
+
+def shield_pipeline(factory, source, store, jobs=None, format='svg',
+                    manifest=None, queue_size=256):
+    """ Render all shields for the inputs produced by the source stage
+        `source` and save them in `store`. With `jobs` larger than 1,
+        shields are rendered in that many worker processes. Returns
+        the list of `StageStats`.
+
+        When a `UuidManifest` is given, only shields missing from the
+        manifest are rendered and the manifest is saved once all
+        shields are stored.
+    """
+    pipeline = Pipeline(queue_size)
+    pipeline.add('source', source)
+    pipeline.add('classify', classify(factory, manifest))
+
+    if jobs is None or jobs <= 1:
+        pipeline.add('render', render(factory, format))
+        pipeline.add('sink', sink(store, format))
+        stats = pipeline.run()
+    else:
+        # The workers must be forked before any thread is started.
+        with factory.worker_pool(jobs) as pool:
+            pipeline.add('render', render(factory, format, pool, 4 * jobs))
+            pipeline.add('sink', sink(store, format))
+            stats = pipeline.run()
+
+    if manifest is not None:
+        manifest.flush()
+
+    return stats
@@ -0,0 +1,416 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Small HTTP server for rendering shields on demand.
+
+The server knows two kinds of requests:
+
+    /shield?<tags>[&region=..][&style=..][&format=svg|png][&scale=..]
+
+renders the shield for the tags given in the query string. The parameters
+`region`, `style`, `format` and `scale` are reserved and not used as tags.
+
+    /shield/<uuid>[@<scale>x].<format>
+
+returns a shield that has been rendered before, either from the in-memory
+cache or from the persistent store.
+
+The uuid of the shield together with format, scale and a fingerprint
+of the configuration and the styles is used as a strong ETag, so that
+clients get new images after the configuration changed. Statistics about the request latency and the cache are
+available as JSON under `/metrics`. In prefork mode, every worker process
+keeps its own statistics and `/metrics` reports the ones of the process
+that happens to answer the request, identified by the `pid` field.
+
+Run the server with `python -m wmt_shields.server`.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+import argparse
+import importlib
+import traceback
+from collections import deque, Counter
+from math import ceil
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+from .factory import ShieldFactory
+from .async_factory import AsyncShieldFactory
+from .common.cache import ShieldCache, DirectoryStore, config_fingerprint
+
+RESERVED_PARAMS = ('region', 'style', 'format', 'scale')
+
+CONTENT_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+MAX_SCALE = 4
+
+_UUID_PATH = re.compile(r'/shield/(?P<uuid>[^/]+?)(?:@(?P<scale>[1-9])x)?\.(?P<format>svg|png)')
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request',
+            404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class ServerMetrics(object):
+    """ Collects the request statistics of one server process. Latencies
+        are computed over the last `window` requests of each route.
+    """
+
+    def __init__(self, window=10000):
+        self.started = time.time()
+        self.status = Counter()
+        self.latencies = {}
+        self.window = window
+
+    def record(self, route, status, duration):
+        self.status[status] += 1
+        lat = self.latencies.get(route)
+        if lat is None:
+            lat = self.latencies[route] = [0, deque(maxlen=self.window)]
+        lat[0] += 1
+        lat[1].append(duration)
+
+    def as_dict(self):
+        routes = {}
+        for route, (count, values) in self.latencies.items():
+            values = sorted(values)
+            routes[route] = {'requests': count,
+                             'latency_mean': sum(values) / len(values),
+                             'latency_p50': _percentile(values, 50),
+                             'latency_p99': _percentile(values, 99)}
+
+        return {'pid': os.getpid(),
+                'uptime': time.time() - self.started,
+                'status': {str(k): v for k, v in sorted(self.status.items())},
+                'routes': routes}
+
+
+def _percentile(values, pct):
+    return values[min(len(values) - 1, max(0, ceil(pct / 100 * len(values)) - 1))]
+
+
+class ShieldServer(object):
+    """ HTTP front-end for the shield factory `factory`.
+
+        Rendered shields are saved in `cache`, a `ShieldCache`, under the
+        key `<uuid>[@<scale>x].<format>`. Note that the uuid does not
+        reflect the configuration. A persistent store must therefore only
+        be shared between servers that use the same configuration.
+
+        `workers` is the maximum number of shields that are rendered
+        in parallel, `timeout` the maximum time in seconds to wait for
+        a shield. `max_age` sets the lifetime of the shields for HTTP caches.
+    """
+
+    def __init__(self, factory, cache=None, workers=4, timeout=10,
+                 max_age=86400, keep_alive=15):
+        self.factory = factory
+        self.cache = cache if cache is not None else ShieldCache()
+        self.renderer = AsyncShieldFactory(factory, max_workers=workers,
+                                           timeout=timeout)
+        self.metrics = ServerMetrics()
+        self.fingerprint = config_fingerprint(factory.config,
+                                              ','.join(factory.style_names))
+        self.max_age = max_age
+        self.keep_alive = keep_alive
+
+    async def start(self, host=None, port=None, sock=None):
+        """ Start listening and return the asyncio server object.
+        """
+        return await asyncio.start_server(self.handle_connection,
+                                          host=host, port=port, sock=sock)
+
+    async def serve(self, host=None, port=None, sock=None):
+        """ Run the server until it is cancelled.
+        """
+        server = await self.start(host, port, sock)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.renderer.close()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while await self._handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.TimeoutError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader, writer):
+        """ Read and answer a single request. Returns True when the
+            connection should be kept open.
+        """
+        line = await asyncio.wait_for(reader.readline(), self.keep_alive)
+        if not line:
+            return False
+
+        start = time.perf_counter()
+        parts = line.decode('latin-1').split()
+
+        headers = {}
+        while True:
+            hline = await asyncio.wait_for(reader.readline(), self.keep_alive)
+            if hline in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = hline.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            route, status, resp_headers, body = 'invalid', 400, {}, b''
+            keep_alive = False
+        elif parts[0] not in ('GET', 'HEAD'):
+            route, status, resp_headers, body = 'invalid', 405, {'Allow': 'GET, HEAD'}, b''
+            keep_alive = False
+        else:
+            try:
+                route, status, resp_headers, body = await self.dispatch(parts[1], headers)
+            except Exception:
+                # Errors from styles or the store must not drop the connection.
+                print(f"ERROR: request {parts[1]} failed:", file=sys.stderr)
+                traceback.print_exc()
+                route, status, resp_headers, body = 'error', 500, {}, b''
+            keep_alive = parts[2] == 'HTTP/1.1' \
+                         and headers.get('connection', '').lower() != 'close'
+
+        resp_headers['Content-Length'] = str(len(body))
+        if not keep_alive:
+            resp_headers['Connection'] = 'close'
+
+        out = [f"HTTP/1.1 {status} {_REASONS[status]}\r\n"]
+        out.extend(f"{k}: {v}\r\n" for k, v in resp_headers.items())
+        out.append("\r\n")
+        writer.write(''.join(out).encode('latin-1'))
+        if parts and parts[0] != 'HEAD':
+            writer.write(body)
+        await writer.drain()
+
+        self.metrics.record(route, status, time.perf_counter() - start)
+
+        return keep_alive
+
+    async def dispatch(self, target, headers):
+        """ Compute the answer for the request path `target`. Returns a
+            tuple of route name, HTTP status, response headers and body.
+        """
+        url = urlsplit(target)
+
+        if url.path == '/shield':
+            return ('render', ) + await self._render(url.query, headers)
+
+        if url.path == '/metrics':
+            metrics = self.metrics.as_dict()
+            metrics['cache'] = self.cache.stats()
+            metrics['inflight'] = self.renderer.inflight
+            return 'metrics', 200, {'Content-Type': 'application/json'},\
+                   json.dumps(metrics).encode()
+
+        m = _UUID_PATH.fullmatch(url.path)
+        if m is not None:
+            uuid = unquote(m['uuid'])
+            # The uuid becomes part of a file name in the store.
+            if '/' not in uuid and '\\' not in uuid and not uuid.startswith('.'):
+                return ('uuid', ) + await self._lookup(uuid, m['format'],
+                                                       int(m['scale'] or 1), headers)
+
+        return 'invalid', 404, {}, b''
+
+    async def _render(self, query, headers):
+        tags = {}
+        params = {}
+        for k, v in parse_qsl(query, keep_blank_values=True):
+            if k in RESERVED_PARAMS:
+                params[k] = v
+            else:
+                tags[k] = v
+
+        fmt = params.get('format', 'svg')
+        try:
+            scale = int(params.get('scale', 1))
+        except ValueError:
+            scale = 0
+        if fmt not in CONTENT_TYPES or not 1 <= scale <= MAX_SCALE:
+            return 400, {}, b''
+
+        kwargs = {'style': params['style']} if 'style' in params else {}
+        shield = self.factory.create(tags, params.get('region', ''), **kwargs)
+        if shield is None:
+            return 404, {}, b''
+
+        uuid = shield.uuid()
+        key = _cache_key(uuid, fmt, scale)
+        if _etag_matches(headers, self._etag(key)):
+            return 304, self._headers(key), b''
+
+        loop = asyncio.get_running_loop()
+        # The persistent store may need to read from disk.
+        data = await loop.run_in_executor(None, self.cache.get, key)
+        if data is None:
+            try:
+                data = await self.renderer.render(shield, format=fmt, scale=scale)
+            except asyncio.TimeoutError:
+                return 503, {}, b''
+            except Exception as ex:
+                print(f"ERROR: cannot render shield {uuid}: {ex}", file=sys.stderr)
+                return 500, {}, b''
+            await loop.run_in_executor(None, self.cache.put, key, data)
+
+        return 200, self._headers(key, fmt), data
+
+    async def _lookup(self, uuid, fmt, scale, headers):
+        key = _cache_key(uuid, fmt, scale)
+        if _etag_matches(headers, self._etag(key)):
+            return 304, self._headers(key), b''
+
+        data = await asyncio.get_running_loop().run_in_executor(None, self.cache.get, key)
+        if data is None:
+            return 404, {}, b''
+
+        return 200, self._headers(key, fmt), data
+
+    def _etag(self, key):
+        return f'"{self.fingerprint}-{key}"'
+
+    def _headers(self, key, fmt=None):
+        """ Return the response headers for the shield with the
+            cache key `key`.
+        """
+        headers = {'ETag': self._etag(key),
+                   'Cache-Control': f'public, max-age={self.max_age}'}
+        if fmt is not None:
+            headers['Content-Type'] = CONTENT_TYPES[fmt]
+
+        return headers
+
+
+def _cache_key(uuid, fmt, scale):
+    if scale == 1:
+        return f"{uuid}.{fmt}"
+
+    return f"{uuid}@{scale}x.{fmt}"
+
+
+def _etag_matches(headers, etag):
+    value = headers.get('if-none-match')
+    if value is None:
+        return False
+
+    tags = [t.strip() for t in value.split(',')]
+
+    return '*' in tags or etag in tags
+
+
+def serve(factory, host='127.0.0.1', port=8080, processes=1, store=None,
+          cache_size=1024, **kwargs):
+    """ Run a shield server until it is interrupted. With `processes`
+        larger than 1, the server runs in prefork mode: the socket is
+        opened and the factory is warmed up in the main process, then
+        the given number of worker processes are forked which share the
+        socket. Each worker has its own in-memory cache and statistics
+        but they share the persistent `store`. Further keyword arguments are handed
+        to `ShieldServer`.
+    """
+    sock = socket.create_server((host, port), backlog=1024)
+    factory.prewarm()
+    factory.warm_up()
+
+    def run_worker():
+        server = ShieldServer(factory, ShieldCache(cache_size, store), **kwargs)
+        try:
+            asyncio.run(server.serve(sock=sock))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+
+    if processes <= 1:
+        run_worker()
+        return
+
+    children = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker()
+            except BaseException:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children.append(pid)
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+
+def load_object(spec):
+    """ Load an object given as `module:name` or `module.name`.
+    """
+    if ':' in spec:
+        module, name = spec.split(':', 1)
+    else:
+        module, name = spec.rsplit('.', 1)
+
+    return getattr(importlib.import_module(module), name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render shields on demand.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Number of worker processes to fork (default: 1)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of render threads per process (default: 4)')
+    parser.add_argument('--config', default='wmt_shields.wmt_config:WmtConfig',
+                        help='Configuration object to use (module:name)')
+    parser.add_argument('--style', action='append', dest='styles',
+                        help='Style to use, may be repeated'
+                             ' (default: the waymarkedtrails styles)')
+    parser.add_argument('--store', metavar='DIR',
+                        help='Directory where rendered shields are saved')
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help='Number of shields to keep in memory per process')
+    args = parser.parse_args(argv)
+
+    from .wmt_config import WMT_STYLES
+
+    config = load_object(args.config)
+    factory = ShieldFactory(args.styles or WMT_STYLES,
+                            config() if isinstance(config, type) else config)
+
+    serve(factory, args.host, args.port, processes=args.processes,
+          store=DirectoryStore(args.store) if args.store else None,
+          cache_size=args.cache_size, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
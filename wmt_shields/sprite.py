@@ -0,0 +1,233 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Creation of sprite sheets which combine many shields into a single image.
+
+The sheets are written as PNG and SVG together with a JSON index in the
+format used by MapLibre/Mapbox for sprites. Sheets can be loaded again
+and extended with new shields without moving the existing ones.
+"""
+
+import os
+import re
+import json
+from math import ceil
+
+from .common.graphics import cairo
+
+class ShelfPacker(object):
+    """ Simple online bin packer for rectangles. Rectangles are placed
+        in horizontal shelves. A new rectangle goes into the shelf where
+        it wastes the least height or opens a new shelf at the bottom.
+        Rectangles that have been placed are never moved.
+    """
+
+    def __init__(self, width, height, padding=0):
+        self.width = width
+        self.height = height
+        self.padding = padding
+        self.shelves = [] # list of [y, height, used width]
+        self.bottom = 0
+
+    def insert(self, w, h):
+        """ Find a place for a rectangle of size `w` x `h`. Returns the
+            position of the upper left corner or None if the rectangle
+            does not fit anymore.
+        """
+        w += self.padding
+        h += self.padding
+        best = None
+        for shelf in self.shelves:
+            if shelf[1] >= h and shelf[2] + w <= self.width:
+                if best is None or shelf[1] < best[1]:
+                    best = shelf
+
+        if best is None:
+            if self.bottom + h > self.height or w > self.width:
+                return None
+            best = [self.bottom, h, 0]
+            self.shelves.append(best)
+            self.bottom += h
+
+        x = best[2]
+        best[2] += w
+
+        return x, best[0]
+
+    def occupy(self, x, y, w, h):
+        """ Mark the area of an already placed rectangle as used. This is
+            needed to restore the packer state when loading a sheet.
+            The rectangle must have been placed by this packer before.
+        """
+        w += self.padding
+        h += self.padding
+        for shelf in self.shelves:
+            if shelf[0] == y:
+                shelf[1] = max(shelf[1], h)
+                shelf[2] = max(shelf[2], x + w)
+                break
+        else:
+            self.shelves.append([y, h, x + w])
+            self.shelves.sort()
+
+        self.bottom = max(self.bottom, y + h)
+        for shelf, nxt in zip(self.shelves, self.shelves[1:]):
+            shelf[1] = nxt[0] - shelf[0]
+
+
+class _SpritePage(object):
+
+    def __init__(self, width, height, padding, png=None):
+        self.packer = ShelfPacker(width, height, padding)
+        self.png = png or cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+        self.svg = []
+        self.index = {}
+
+
+class SpriteSheet(object):
+    """ Collection of shields packed into one or more sprite images with
+        a pixel ratio of `pixel_ratio`. Each image has at most the
+        size `max_width` x `max_height` in pixels.
+    """
+
+    def __init__(self, pixel_ratio=1, max_width=1024, max_height=1024,
+                 padding=1):
+        self.pixel_ratio = pixel_ratio
+        self.max_width = max_width
+        self.max_height = max_height
+        self.padding = padding
+        self.pages = []
+
+    def __contains__(self, uuid):
+        return any(uuid in page.index for page in self.pages)
+
+    def __len__(self):
+        return sum(len(page.index) for page in self.pages)
+
+    def add(self, shield):
+        """ Render the shield and add it to the sheet. Returns the
+            index entry of the shield or None if a shield with the
+            same uuid is already part of the sheet.
+        """
+        uuid = shield.uuid()
+        if uuid in self:
+            return None
+
+        w, h = shield.dimensions()
+        pw = ceil(w * self.pixel_ratio)
+        ph = ceil(h * self.pixel_ratio)
+
+        for page_id, page in enumerate(self.pages):
+            pos = page.packer.insert(pw, ph)
+            if pos is not None:
+                break
+        else:
+            page_id = len(self.pages)
+            page = _SpritePage(self.max_width, self.max_height, self.padding)
+            pos = page.packer.insert(pw, ph)
+            if pos is None:
+                raise ValueError(f"Shield {uuid} is larger than the sprite sheet.")
+            self.pages.append(page)
+
+        x, y = pos
+        ctx = cairo.Context(page.png)
+        ctx.rectangle(x, y, pw, ph)
+        ctx.clip()
+        ctx.translate(x, y)
+        ctx.scale(self.pixel_ratio, self.pixel_ratio)
+        shield._paint(ctx)
+        page.png.flush()
+
+        page.svg.append(self._svg_fragment(shield, f"s{page_id}-{len(page.index)}-",
+                                           x / self.pixel_ratio,
+                                           y / self.pixel_ratio))
+
+        entry = {'x': x, 'y': y, 'width': pw, 'height': ph,
+                 'pixelRatio': self.pixel_ratio}
+        page.index[uuid] = entry
+
+        return entry
+
+    def add_from(self, factory, inputs):
+        """ Add the shields for a sequence of `(tags, region, kwargs)`
+            tuples using the shield factory `factory`.
+        """
+        for tags, region, kwargs in inputs:
+            shield = factory.create(tags, region, **(kwargs or {}))
+            if shield is not None:
+                self.add(shield)
+
+    def write(self, basename):
+        """ Write the sheet into PNG, SVG and JSON files. The first file
+            of each type is named `<basename>.<ext>`. Further pages get
+            a number appended. Pixel ratios other than 1 are marked with
+            the usual `@<ratio>x` suffix.
+        """
+        for page_id, page in enumerate(self.pages):
+            fname = self._filename(basename, page_id)
+            page.png.write_to_png(fname + '.png')
+
+            width = self.max_width / self.pixel_ratio
+            height = self.max_height / self.pixel_ratio
+            with open(fname + '.svg', 'w') as f:
+                f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+                f.write('<svg xmlns="http://www.w3.org/2000/svg"'
+                        ' xmlns:xlink="http://www.w3.org/1999/xlink"'
+                        f' width="{width}px" height="{height}px"'
+                        f' viewBox="0 0 {width} {height}" version="1.1">\n')
+                for fragment in page.svg:
+                    f.write(fragment)
+                    f.write('\n')
+                f.write('</svg>\n')
+
+            with open(fname + '.json', 'w') as f:
+                json.dump(page.index, f, sort_keys=True, indent=1)
+
+    @classmethod
+    def load(cls, basename, pixel_ratio=1, max_width=1024, max_height=1024,
+             padding=1):
+        """ Load a sheet that has previously been saved with `write()`.
+            New shields may then be added in the free space of the
+            existing pages. The parameters must be the same as used
+            when the sheet was first created.
+        """
+        sheet = cls(pixel_ratio, max_width, max_height, padding)
+
+        while True:
+            fname = sheet._filename(basename, len(sheet.pages))
+            if not os.path.exists(fname + '.json'):
+                break
+
+            page = _SpritePage(max_width, max_height, padding,
+                               cairo.ImageSurface.create_from_png(fname + '.png'))
+            with open(fname + '.json', 'r') as f:
+                page.index = json.load(f)
+            with open(fname + '.svg', 'r') as f:
+                page.svg = f.read().split('\n')[2:-2]
+
+            for entry in sorted(page.index.values(), key=lambda e: (e['y'], e['x'])):
+                page.packer.occupy(entry['x'], entry['y'],
+                                   entry['width'], entry['height'])
+
+            sheet.pages.append(page)
+
+        return sheet
+
+    def _filename(self, basename, page_id):
+        if page_id > 0:
+            basename += f'-{page_id}'
+        if self.pixel_ratio != 1:
+            basename += f'@{self.pixel_ratio}x'
+
+        return basename
+
+    def _svg_fragment(self, shield, prefix, x, y):
+        svg = shield.create_image('svg').decode('utf8')
+        # strip XML declaration
+        svg = svg[svg.index('<svg'):]
+        # make IDs unique within the sheet
+        svg = re.sub(r'(id="|url\(#|href="#)', rf'\g<1>{prefix}', svg)
+
+        return f'<svg x="{x}" y="{y}"' + svg[4:].replace('\n', '')
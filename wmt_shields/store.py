@@ -0,0 +1,465 @@
+# SPDX-License-Identifier: GPL-3.0-only
+#
+# This file is part of the Waymarked Trails Map Project
+# Copyright (C) 2026 Sarah Hoffmann
+"""
+Storage of rendered shields in a single pack file.
+
+A pack consists of two files: `<name>.data` contains the shields as an
+append-only sequence of records, `<name>.idx` a sorted index over the
+records that allows lookups by binary search. Records that have been
+appended after the index was last written are found by scanning the
+end of the data file. Every record starts with a marker, so that
+the scan can find the next valid record after a record that was torn
+by a crashed writer. Both files are memory-mapped, so that reading
+a shield does not need to open a file.
+
+The pack can be maintained with `python -m wmt_shields.store`.
+"""
+
+import os
+import sys
+import mmap
+import zlib
+import fcntl
+import struct
+import argparse
+import tempfile
+import threading
+
+_DATA_MAGIC = b'WMTSHLD2'
+_INDEX_MAGIC = b'WMTSIDX1'
+_RECORD_MAGIC = b'\xa7WMR'
+_DATA_HEADER = struct.Struct('<8s8s')     # magic, generation
+_INDEX_HEADER = struct.Struct('<8s8sQQ')  # magic, generation, data size, entries
+_RECORD = struct.Struct('<4sHII')         # marker, key length, data length,
+                                          # crc32 of key and data
+_ENTRY = struct.Struct('<QQII')           # key offset, data offset,
+                                          # key length, data length
+
+
+def _pack_record(key, data):
+    return _RECORD.pack(_RECORD_MAGIC, len(key), len(data),
+                        zlib.crc32(data, zlib.crc32(key)))
+
+
+def _read_record(data, pos, end):
+    """ Return the key, data offset, data length and end of the record
+        at `pos` or None if there is no complete and valid record.
+    """
+    if pos + _RECORD.size > end:
+        return None
+
+    marker, klen, dlen, crc = _RECORD.unpack_from(data, pos)
+    start = pos + _RECORD.size
+    rec_end = start + klen + dlen
+    if marker != _RECORD_MAGIC or rec_end > end \
+       or zlib.crc32(data[start:rec_end]) != crc:
+        return None
+
+    return data[start:start + klen], start + klen, dlen, rec_end
+
+
+def _next_record(data, pos, end):
+    """ Return the position of the next valid record after `pos` or
+        None if there is none.
+    """
+    while True:
+        pos = data.find(_RECORD_MAGIC, pos + 1, end)
+        if pos < 0:
+            return None
+        if _read_record(data, pos, end) is not None:
+            return pos
+
+
+class _PackState(object):
+    """ Mapping of one generation of the pack files.
+    """
+
+    def __init__(self, data_path, index_path):
+        with open(data_path, 'rb') as f:
+            self.data_ino = os.fstat(f.fileno()).st_ino
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.generation = _DATA_HEADER.unpack_from(self.data)
+        if magic != _DATA_MAGIC:
+            raise RuntimeError(f"{data_path} is not a shield pack file.")
+
+        self.index = None
+        self.index_ino = None
+        self.count = 0
+        self.scanned = _DATA_HEADER.size
+        self.tail = {}
+        self.load_index(index_path)
+        self.scan()
+
+    def load_index(self, index_path):
+        try:
+            f = open(index_path, 'rb')
+        except FileNotFoundError:
+            return
+
+        with f:
+            ino = os.fstat(f.fileno()).st_ino
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, generation, covered, count = _INDEX_HEADER.unpack_from(index)
+        # Ignore indexes that belong to another version of the data file.
+        if magic != _INDEX_MAGIC or generation != self.generation:
+            return
+
+        self.index = index
+        self.index_ino = ino
+        self.count = count
+        self.blob = _INDEX_HEADER.size + count * _ENTRY.size
+        if covered > self.scanned:
+            self.scanned = covered
+            self.tail = {}
+
+    def scan(self):
+        """ Add records to the tail that were appended after the last scan.
+        """
+        data = self.data
+        pos = self.scanned
+        end = len(data)
+        while pos < end:
+            record = _read_record(data, pos, end)
+            if record is None:
+                # The record is torn or corrupt, when a valid one follows.
+                # Otherwise it may still be written, so stop here and
+                # look at it again with the next scan.
+                pos = _next_record(data, pos, end)
+                if pos is None:
+                    break
+                continue
+
+            key, doff, dlen, pos = record
+            self.tail[key] = (doff, dlen)
+            self.scanned = pos
+
+    def lookup(self, key):
+        loc = self.tail.get(key)
+        if loc is not None or self.index is None:
+            return loc
+
+        index = self.index
+        lo = 0
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            koff, doff, klen, dlen = _ENTRY.unpack_from(index, _INDEX_HEADER.size
+                                                        + mid * _ENTRY.size)
+            koff += self.blob
+            mkey = index[koff:koff + klen]
+            if mkey < key:
+                lo = mid + 1
+            elif mkey > key:
+                hi = mid
+            else:
+                return doff, dlen
+
+        return None
+
+    def entries(self):
+        """ Return a dictionary of all keys with their data locations.
+        """
+        result = {}
+        if self.index is not None:
+            for i in range(self.count):
+                koff, doff, klen, dlen = _ENTRY.unpack_from(self.index, _INDEX_HEADER.size
+                                                            + i * _ENTRY.size)
+                koff += self.blob
+                result[self.index[koff:koff + klen]] = (doff, dlen)
+        result.update(self.tail)
+
+        return result
+
+
+class PackStore(object):
+    """ Persistent storage of rendered shields in the pack file `path`.
+        Supports the same `get(key)` and `put(key, data)` interface as
+        `DirectoryStore`, only that `get()` returns a memoryview into the
+        mapped file.
+
+        Multiple processes may read and append to the same pack at the
+        same time. Appends are serialised with a lock on the data file.
+        Records that other processes add for a key which is already known
+        are only visible after calling `refresh()`.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.data_path = self.path + '.data'
+        self.index_path = self.path + '.idx'
+        self._lock = threading.RLock()
+        self._writer = None
+        self._create_data_file()
+        self._state = _PackState(self.data_path, self.index_path)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            self.refresh()
+            return len(self._state.entries())
+
+    def keys(self):
+        with self._lock:
+            self.refresh()
+            return sorted(k.decode('utf-8') for k in self._state.entries())
+
+    def get(self, key):
+        """ Return the data stored for `key` as a memoryview into the
+            mapped data file or None if the key is unknown. No data is
+            copied. The view keeps its mapping alive, so it stays valid
+            after `refresh()` or `compact()` map a new version of the
+            file: maps are never closed explicitly and the data file is
+            only ever appended to or replaced, never truncated. Release
+            views that are kept for a long time, so that the mapping of
+            a replaced file can be freed.
+        """
+        k = key.encode('utf-8')
+        state = self._state
+        loc = state.lookup(k)
+        # Records written by put() may not be mapped yet.
+        if loc is None or loc[0] + loc[1] > len(state.data):
+            with self._lock:
+                self.refresh()
+                state = self._state
+                loc = state.lookup(k)
+            if loc is None:
+                return None
+
+        return memoryview(state.data)[loc[0]:loc[0] + loc[1]]
+
+    def put(self, key, data):
+        """ Append `data` under `key`. A previous record for the same key
+            is superseded.
+        """
+        k = key.encode('utf-8')
+        record = _pack_record(k, data) + k + bytes(data)
+
+        with self._lock:
+            fd = self._lock_data(self._writer_fd)
+            try:
+                st = os.fstat(fd)
+                view = memoryview(record)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+            # The record is the newest one for the key, also when the
+            # index already has an older one.
+            if st.st_ino == self._state.data_ino:
+                self._state.tail[k] = (st.st_size + _RECORD.size + len(k), len(data))
+            else:
+                self.refresh()
+
+    def refresh(self):
+        """ Pick up changes made by other processes: new records, a new
+            index or a compacted pack.
+        """
+        with self._lock:
+            state = self._state
+            try:
+                st = os.stat(self.data_path)
+            except FileNotFoundError:
+                return
+
+            if st.st_ino != state.data_ino:
+                self._state = _PackState(self.data_path, self.index_path)
+                return
+
+            try:
+                index_ino = os.stat(self.index_path).st_ino
+            except FileNotFoundError:
+                index_ino = None
+
+            if st.st_size > len(state.data) or index_ino != state.index_ino:
+                new_state = _PackState.__new__(_PackState)
+                new_state.__dict__.update(state.__dict__)
+                new_state.tail = dict(state.tail)
+                if st.st_size > len(state.data):
+                    with open(self.data_path, 'rb') as f:
+                        new_state.data = mmap.mmap(f.fileno(), 0,
+                                                   access=mmap.ACCESS_READ)
+                if index_ino != state.index_ino:
+                    new_state.load_index(self.index_path)
+                new_state.scan()
+                self._state = new_state
+
+    def flush_index(self):
+        """ Write a new index which covers all records in the data file.
+        """
+        with self._lock:
+            fd = self._lock_data(self._reader_fd)
+            try:
+                self.refresh()
+                state = self._state
+                self._write_index(state.generation, state.scanned,
+                                  state.entries().items())
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+            self.refresh()
+
+    def compact(self):
+        """ Rewrite the pack without superseded records and with a full
+            index. Returns a tuple with the size of the data file
+            before and after compaction.
+        """
+        with self._lock:
+            fd = self._lock_data(self._reader_fd)
+            try:
+                self.refresh()
+                state = self._state
+                old_size = len(state.data)
+                generation = os.urandom(8)
+
+                entries = []
+                tmpfd, tmpname = tempfile.mkstemp(dir=os.path.dirname(self.data_path) or '.',
+                                                  prefix='.tmp')
+                try:
+                    with os.fdopen(tmpfd, 'wb') as f:
+                        f.write(_DATA_HEADER.pack(_DATA_MAGIC, generation))
+                        pos = _DATA_HEADER.size
+                        for key, (doff, dlen) in sorted(state.entries().items()):
+                            data = state.data[doff:doff + dlen]
+                            f.write(_pack_record(key, data))
+                            f.write(key)
+                            f.write(data)
+                            pos += _RECORD.size + len(key)
+                            entries.append((key, (pos, dlen)))
+                            pos += dlen
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmpname, self.data_path)
+                except BaseException:
+                    os.unlink(tmpname)
+                    raise
+
+                self._write_index(generation, pos, entries)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+            self.refresh()
+
+            return old_size, pos
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                os.close(self._writer)
+                self._writer = None
+
+    def _create_data_file(self):
+        if os.path.exists(self.data_path):
+            return
+
+        dirname = os.path.dirname(self.data_path) or '.'
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_DATA_HEADER.pack(_DATA_MAGIC, os.urandom(8)))
+            # Fails when another process was faster. That is fine.
+            os.link(tmpname, self.data_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmpname)
+
+    def _writer_fd(self):
+        if self._writer is None:
+            self._writer = os.open(self.data_path, os.O_WRONLY | os.O_APPEND)
+        return self._writer
+
+    def _reader_fd(self):
+        return os.open(self.data_path, os.O_RDONLY)
+
+    def _lock_data(self, opener):
+        """ Open the data file with `opener` and lock it exclusively.
+            Makes sure that the file has not been replaced by a compaction
+            while waiting for the lock.
+        """
+        while True:
+            fd = opener()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_ino == os.stat(self.data_path).st_ino:
+                return fd
+
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+            if fd == self._writer:
+                self._writer = None
+
+    def _write_index(self, generation, covered, entries):
+        entries = sorted(entries)
+        blob = []
+        table = []
+        koff = 0
+        for key, (doff, dlen) in entries:
+            table.append(_ENTRY.pack(koff, doff, len(key), dlen))
+            blob.append(key)
+            koff += len(key)
+
+        dirname = os.path.dirname(self.index_path) or '.'
+        fd, tmpname = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, generation,
+                                           covered, len(entries)))
+                f.write(b''.join(table))
+                f.write(b''.join(blob))
+            os.replace(tmpname, self.index_path)
+        except BaseException:
+            os.unlink(tmpname)
+            raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain a shield pack file.')
+    parser.add_argument('command', choices=('index', 'compact', 'import', 'list'),
+                        help='index: write a full index, compact: remove'
+                             ' superseded records, import: add all files from'
+                             ' a shield directory, list: print all keys')
+    parser.add_argument('pack', help='Name of the pack without extension')
+    parser.add_argument('directory', nargs='?',
+                        help='Directory with shields (for import)')
+    args = parser.parse_args(argv)
+
+    store = PackStore(args.pack)
+
+    if args.command == 'index':
+        store.flush_index()
+    elif args.command == 'compact':
+        before, after = store.compact()
+        print(f"Compacted {before} to {after} bytes.")
+    elif args.command == 'import':
+        if args.directory is None:
+            parser.error('import needs a directory')
+        num = 0
+        for root, _, files in os.walk(args.directory):
+            for fname in files:
+                if fname.startswith('.tmp'):
+                    continue
+                path = os.path.join(root, fname)
+                with open(path, 'rb') as f:
+                    store.put(os.path.relpath(path, args.directory), f.read())
+                num += 1
+        store.flush_index()
+        print(f"Imported {num} shields.")
+    else:
+        for key in store.keys():
+            print(key)
+
+    store.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
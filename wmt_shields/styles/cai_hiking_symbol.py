@@ -14,11 +14,15 @@ class CaiHikingSymbol(RefShieldMaker):
     """
 
     def __init__(self, typ, ref, config):
-        self.config = config
+        # CAI shields always have a white border.
+        self.config = config.derive(border_color=(1., 1., 1.))
         self.typ = typ
         self.ref = ref
         self.uuid_pattern = f"cai_{{}}_{typ}_{self.ref_uuid()}"
 
+    def spec_args(self):
+        return self.typ, self.ref
+
     def dimensions(self):
         tw, _ = self._get_text_size(self.config.text_font)
 
@@ -65,6 +69,10 @@ class CaiHikingSymbol(RefShieldMaker):
                            x=(w-tw)/2.0, y=y)
 
 
+dispatch_keys = ('osmc:symbol', )
+dispatch_regions = ('it', )
+
+
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     if region != 'it':
         return None
@@ -74,5 +82,4 @@ def create_for(tags: Tags, region: str, config: ShieldConfig):
     if not osmc:
         return None
 
-    new_config = config.derive(border_color=(1., 1., 1.))
-    return CaiHikingSymbol(osmc.group(1), osmc.group(2), new_config)
+    return CaiHikingSymbol(osmc.group(1), osmc.group(2), config)
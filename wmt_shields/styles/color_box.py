@@ -3,7 +3,7 @@
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
-from ..common.tags import Tags
+from ..common.tags import Tags, OsmColor
 from ..common.config import ShieldConfig
 from ..common.shield_maker import ShieldMaker
 
@@ -14,15 +14,29 @@ class ColorBoxSymbol(ShieldMaker):
     def __init__(self, color, config):
         self.config = config
         self.color = color.rgb
+        self.name = color.name
         self.uuid_pattern = f'cbox_{{}}_{color.name}'
 
+    def spec_args(self):
+        return (OsmColor(self.name, tuple(self.color)), )
+
     def render(self, ctx):
         self.render_background(ctx, self.color)
 
 
+dispatch_keys = ('color', 'colour')
+
+
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     color = tags.as_color(color_names=config.color_names or {})
     if color is None:
         return None
 
     return ColorBoxSymbol(color, config)
+
+
+def catalogue(config: ShieldConfig):
+    """ Return the tags of all shields with named colors.
+    """
+    for color in sorted(config.color_names or ()):
+        yield {'colour': color}
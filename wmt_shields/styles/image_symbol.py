@@ -3,11 +3,6 @@
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
-import gi
-gi.require_version('Rsvg', '2.0')
-from gi.repository import Rsvg
-import os
-
 from ..common.tags import Tags
 from ..common.config import ShieldConfig
 from ..common.shield_maker import ShieldMaker
@@ -22,21 +17,52 @@ class ImageSymbol(ShieldMaker):
         self.path = path
         self.filename = filename
 
+    def spec_args(self):
+        return self.uuid_pattern, self.path, self.filename
+
+    def load_template(self):
+        return self.load_svg(self.path, self.filename)
+
     def render(self, ctx):
         w, h = self.render_background(ctx, None)
-        data = self.find_resource(self.path, self.filename)
-        rhdl = Rsvg.Handle.new_from_data(data)
+        rhdl = self.load_template()
         dim = rhdl.get_dimensions()
 
         ctx.scale(w/dim.width, h/dim.height)
-        rhdl.render_cairo(ctx)
+        self.render_svg_handle(ctx, rhdl)
+
+
+def dispatch_keys(config: ShieldConfig):
+    keys = set()
+    for stags in (config.shield_names or {}).values():
+        if not stags:
+            return None # matches everything
+        stags = list(stags.items() if isinstance(stags, dict) else stags)
+        keys.add(stags[0][0])
+
+    return keys
 
 
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     if config.shield_names:
-        for name, stags in config.shield_names.items():
-            if tags.contains_all_tags(stags):
-                uuid = f'shield_{{}}_{name}'
-                return ImageSymbol(uuid, config.shield_path, f'{name}.svg', config)
+        name = config.shield_names_matcher.match(tags)
+        if name is not None:
+            uuid = f'shield_{{}}_{name}'
+            return ImageSymbol(uuid, config.shield_path, f'{name}.svg', config)
 
     return None
+
+
+def catalogue(config: ShieldConfig):
+    """ Return the tags for each of the configured shield names.
+    """
+    for stags in (config.shield_names or {}).values():
+        if stags:
+            yield dict(stags)
+
+
+def prewarm(config: ShieldConfig):
+    """ Load the images for all configured shield names.
+    """
+    for name in (config.shield_names or {}):
+        ImageSymbol(None, config.shield_path, f'{name}.svg', config).load_template()
@@ -3,12 +3,13 @@
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
-import os
-
 from ..common.tags import Tags
 from ..common.config import ShieldConfig
 from .image_symbol import ImageSymbol
 
+dispatch_keys = ('jel', )
+
+
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     if config.jel_types is None:
         return None
@@ -19,3 +20,17 @@ def create_for(tags: Tags, region: str, config: ShieldConfig):
 
     uuid = f'jel_{{}}_{ref}'
     return ImageSymbol(uuid, config.jel_path, f'{ref}.svg', config)
+
+
+def catalogue(config: ShieldConfig):
+    """ Return the tags of all possible JEL shields.
+    """
+    for ref in sorted(config.jel_types or ()):
+        yield {'jel': ref}
+
+
+def prewarm(config: ShieldConfig):
+    """ Load the images for all configured JEL symbols.
+    """
+    for ref in (config.jel_types or ()):
+        ImageSymbol(None, config.jel_path, f'{ref}.svg', config).load_template()
@@ -3,12 +3,6 @@
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2020 Sarah Hoffmann
 
-import re
-import gi
-gi.require_version('Rsvg', '2.0')
-from gi.repository import Rsvg
-import os
-
 from ..common.tags import Tags
 from ..common.config import ShieldConfig
 from ..common.shield_maker import ShieldMaker
@@ -25,25 +19,30 @@ class KctSymbol(ShieldMaker):
         self.color = color
         self.symbol = symbol
 
+    def spec_args(self):
+        return self.color, self.symbol
+
     def dimensions(self):
         bwidth = self.config.image_border_width or 0
         return (int((self.config.image_width or 16) + 0.5 * bwidth),
                 int((self.config.image_height or 16) + 0.5 * bwidth))
 
+    def load_template(self):
+        # template file with the correct color patched in
+        return self.load_svg(self.config.kct_path, f'{self.symbol}.svg',
+                             self.config.kct_colors_hex[self.color],
+                             '#eeeeee')
+
     def render(self, ctx):
         w, h = self.render_background(ctx, None)
-        # get the template file
-        content = self.find_resource(self.config.kct_path, f'{self.symbol}.svg').decode('utf8')
-        # patch in the correct color
-        fgcol = tuple([int(x*255) for x in self.config.kct_colors[self.color]])
-        color = '#%02x%02x%02x' % fgcol
-        content = re.sub('#eeeeee', color, content)
-        # now read in by cairo
-        svg = Rsvg.Handle.new_from_data(content.encode())
+        svg = self.load_template()
         dim = svg.get_dimensions()
 
         ctx.scale(w/dim.width, h/dim.height)
-        svg.render_cairo(ctx)
+        self.render_svg_handle(ctx, svg)
+
+
+dispatch_keys = ('operator', 'kct_*')
 
 
 def create_for(tags: Tags, region: str, config: ShieldConfig):
@@ -63,3 +62,25 @@ def create_for(tags: Tags, region: str, config: ShieldConfig):
         return KctSymbol(tag.k[4:], tag.v, config)
 
     return None
+
+
+def catalogue(config: ShieldConfig):
+    """ Return the tags of all possible KCT shields.
+    """
+    if config.kct_colors is None or config.kct_types is None:
+        return
+
+    for color in sorted(config.kct_colors):
+        for symbol in sorted(config.kct_types):
+            yield {f'kct_{color}': symbol}
+
+
+def prewarm(config: ShieldConfig):
+    """ Load the templates for all configured colors and symbols.
+    """
+    if config.kct_colors is None or config.kct_types is None:
+        return
+
+    for color in config.kct_colors:
+        for symbol in config.kct_types:
+            KctSymbol(color, symbol, config).load_template()
@@ -5,7 +5,7 @@
 
 from math import pi
 
-from ..common.tags import Tags
+from ..common.tags import Tags, OsmColor
 from ..common.config import ShieldConfig
 from ..common.shield_maker import ShieldMaker
 
@@ -16,8 +16,12 @@ class ColorBoxSymbol(ShieldMaker):
     def __init__(self, color, config):
         self.config = config
         self.color = color.rgb
+        self.name = color.name
         self.uuid_pattern = f'nordic_{{}}_{color.name}'
 
+    def spec_args(self):
+        return (OsmColor(self.name, tuple(self.color)), )
+
     def render(self, ctx):
         bgcolor = (1, 1, 1) if (self.config.image_border_width or 0) > 0 else None
         w, h = self.render_background(ctx, bgcolor)
@@ -26,6 +30,9 @@ class ColorBoxSymbol(ShieldMaker):
         ctx.fill()
 
 
+dispatch_keys = ('piste:type', )
+
+
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     if tags.get('piste:type') != 'nordic':
         return None
@@ -35,3 +42,10 @@ def create_for(tags: Tags, region: str, config: ShieldConfig):
         return None
 
     return ColorBoxSymbol(color, config)
+
+
+def catalogue(config: ShieldConfig):
+    """ Return the tags of all shields with named colors.
+    """
+    for color in sorted(config.color_names or ()):
+        yield {'piste:type': 'nordic', 'colour': color}
@@ -3,17 +3,17 @@
 # This file is part of the Waymarked Trails Map Project
 # Copyright (C) 2011-2025 Sarah Hoffmann
 
-import re
-import os
 from math import pi
-import gi
-gi.require_version('Rsvg', '2.0')
-from gi.repository import Rsvg
-import cairo
+from functools import lru_cache
+from dataclasses import dataclass
+import threading
 
 from ..common.tags import Tags
 from ..common.config import ShieldConfig
 from ..common.shield_maker import RefShieldMaker
+from ..common.geometry import record_geometry
+from ..common.cache import LRUCache
+from ..common.graphics import cairo
 
 class TransparentBackground:
 
@@ -54,6 +54,12 @@ class BackgroundImage:
         self.color = color
         self.symbol = symbol if symbol is None or hasattr(self, '_paint_' + symbol) else None
 
+    @classmethod
+    def symbols(cls) -> list[str]:
+        """ Return the names of all background symbols.
+        """
+        return sorted(n[7:] for n in dir(cls) if n.startswith('_paint_'))
+
     def uuid(self) -> str:
         return f"{self.color}-{self.symbol}" if self.symbol else self.color
 
@@ -80,16 +86,17 @@ class BackgroundImage:
         """
         if self.symbol is not None:
             ctx.set_source_rgb(*config.osmc_colors[self.color])
-            func = getattr(self, f'_paint_{self.symbol}')
-            func(ctx, w, h, config)
+            _background_geometry(self.symbol, w, h).replay(ctx)
 
 
     def stroke_frame_path(self, ctx, w, h, border):
         match self.symbol:
             case 'circle' | 'round':
-                return self._frame_path_circle(ctx, w, h, border)
+                _frame_geometry('circle', w, h, border).replay(ctx)
+                return True
             case 'diamond' | 'diamond_line':
-                return self._frame_path_diamond(ctx, w, h, border)
+                _frame_geometry('diamond', w, h, border).replay(ctx)
+                return True
             case _:
                 False
 
@@ -186,14 +193,18 @@ class ForegroundImage:
     def has_symbol(self, symbol: str) -> bool:
         return hasattr(self, '_paint_' + symbol)
 
+    @classmethod
+    def symbols(cls) -> list[str]:
+        """ Return the names of all foreground symbols.
+        """
+        return sorted(n[7:] for n in dir(cls) if n.startswith('_paint_'))
+
     def uuid(self) -> str:
         return f"{self.color}-{self.symbol}"
 
     def paint(self, ctx, shield):
-        self._config = shield.config
-        ctx.set_source_rgb(*self._config.osmc_colors[self.color])
-        ctx.set_line_width(0.3)
-        getattr(self, f'_paint_{self.symbol}')(ctx)
+        ctx.set_source_rgb(*shield.config.osmc_colors[self.color])
+        _foreground_geometry(self.symbol).replay(ctx)
 
     def _paint_arch(self, ctx):
         ctx.set_line_width(0.22)
@@ -573,38 +584,167 @@ class SvgImage:
         shield.render_svg(ctx, self.symbol, self.color)
 
 
+@dataclass(frozen=True)
+class OsmcSpec:
+    """ Canonical description of an OSMC shield. `background` is a tuple of
+        color and symbol (which may be None) or None for a transparent
+        background. `foregrounds` contains tuples of (is_svg, color, symbol).
+        Symbol strings that result in the same shield have equal specs.
+    """
+    background: tuple[str, str | None] | None = None
+    foregrounds: tuple[tuple[bool, str, str], ...] = ()
+    ref: str = ''
+    textcolor: str = 'black'
+
+    def is_empty(self) -> bool:
+        return not self.ref and not self.foregrounds and self.background is None
+
+
+EMPTY_SPEC = OsmcSpec()
+
+
+@lru_cache(maxsize=16384)
+def parse_osmc_symbol(symbol: str, colors: frozenset[str]) -> OsmcSpec:
+    """ Parse an osmc:symbol tag. `colors` are the names of the
+        colors that may be used. The results are cached.
+    """
+    parts = [p.strip() for p in symbol.split(':', 5)]
+    num_parts = len(parts)
+
+    # parts[0], the way color, is ignored at the moment
+    background = None
+    if num_parts > 1:
+        bg = parts[1].split('_', 1)
+        if bg[0] in colors:
+            bgsym = bg[1] if len(bg) > 1 else None
+            if bgsym is not None and not hasattr(BackgroundImage, '_paint_' + bgsym):
+                bgsym = None
+            background = (bg[0], bgsym)
+
+    fgs = []
+    ref = ''
+    textcolor = 'black'
+
+    def add_ref(text, color):
+        nonlocal ref, textcolor
+        maxlen = TransparentBackground.max_textlen() if background is None\
+                 else BackgroundImage(*background).max_textlen()
+        if text and len(text) <= maxlen:
+            ref = text
+            if color in colors:
+                textcolor = color
+
+    if num_parts > 2:
+        _add_fg_symbol(fgs, parts[2], colors)
+    match num_parts:
+        case 4:
+            if not _add_fg_symbol(fgs, parts[3], colors):
+                add_ref(parts[3], 'black')
+        case 5:
+            add_ref(parts[3], parts[4])
+        case 6:
+            _add_fg_symbol(fgs, parts[3], colors)
+            add_ref(parts[4], parts[5])
+
+    return OsmcSpec(background, tuple(fgs), ref, textcolor)
+
+
+def _add_fg_symbol(fgs, symbol, colors) -> bool:
+    if SvgImage.has_symbol(symbol):
+        fgs.append((True, 'black', symbol))
+        return True
+
+    if ForegroundImage.has_symbol(symbol):
+        fgs.append((False, 'yellow' if symbol.startswith('shell') else 'black',
+                    symbol))
+        return True
+
+    parts = symbol.split('_', 1)
+    if len(parts) > 1:
+        color = parts[0] if parts[0] in colors else 'black'
+        if parts[1] == 'red_diamond':
+            fgs.append((False, color, 'diamond'))
+            fgs.append((False, 'red', 'diamond_right'))
+            return True
+        if ForegroundImage.has_symbol(parts[1]):
+            fgs.append((False, color, parts[1]))
+            return True
+        if SvgImage.has_symbol(parts[1]):
+            fgs.append((True, color, parts[1]))
+            return True
+
+    return False
+
+
+# Layers of OSMC shields (background, foregrounds and text) are recorded
+# once and then composed for each shield. This is only done for raster
+# output. In SVG output, cairo would turn the recordings into references,
+# which Mapnik cannot handle. Cairo surfaces must not be used from
+# multiple threads at the same time, so each thread has its own layers.
+
+_layers = threading.local()
+
+def _layer_cache():
+    cache = getattr(_layers, 'cache', None)
+    if cache is None:
+        cache = _layers.cache = LRUCache(maxsize=2048)
+    return cache
+
+
+def _use_layers(ctx):
+    return isinstance(ctx.get_target(), (cairo.ImageSurface, cairo.RecordingSurface))
+
+
+# The geometry of the symbols is computed once and then replayed.
+
+@lru_cache(maxsize=1024)
+def _background_geometry(symbol, w, h):
+    painter = getattr(BackgroundImage(None, symbol), f'_paint_{symbol}')
+    return record_geometry(painter, w, h, None)
+
+
+@lru_cache(maxsize=1024)
+def _frame_geometry(shape, w, h, border):
+    painter = getattr(BackgroundImage(None, shape), f'_frame_path_{shape}')
+    return record_geometry(painter, w, h, border)
+
+
+@lru_cache(maxsize=None)
+def _foreground_geometry(symbol):
+    painter = getattr(ForegroundImage(None, symbol), f'_paint_{symbol}')
+    return record_geometry(painter, line_width=0.3)
+
+
 class OsmcSymbol(RefShieldMaker):
-    """ Shield that follows the osmc:symbol specification.
+    """ Shield that follows the osmc:symbol specification. `symbol` is
+        either the value of the osmc:symbol tag or an `OsmcSpec`.
     """
 
     def __init__(self, symbol, config):
         self.config = config
-        self.ref = ''
-        self.bg: BackgroundImage | TransparentBackground = TransparentBackground
-        self.fgs: list[ForegourndImage] = []
-        self.textcolor = 'black'
-
-        if symbol is not None:
-            parts = symbol.split(':', 5)
-            num_parts = len(parts)
-
-            self._init_way_color(parts[0].strip())
-            if num_parts > 1:
-                self._init_bg_symbol(parts[1].strip())
-            if num_parts > 2:
-                self._add_fg_symbol(parts[2].strip())
-            match num_parts:
-                case 4:
-                    if not self._add_fg_symbol(parts[3].strip()):
-                        self._init_ref(parts[3].strip(), 'black')
-                case 5:
-                    self._init_ref(parts[3].strip(), parts[4].strip())
-                case 6:
-                    self._add_fg_symbol(parts[3].strip())
-                    self._init_ref(parts[4].strip(), parts[5].strip())
+        if symbol is None:
+            self.spec = EMPTY_SPEC
+        elif isinstance(symbol, OsmcSpec):
+            self.spec = symbol
+        else:
+            self.spec = parse_osmc_symbol(symbol, config.osmc_color_names)
+        self.ref = self.spec.ref
+        self.textcolor = self.spec.textcolor
+
+        if self.spec.background is None:
+            self.bg: BackgroundImage | TransparentBackground = TransparentBackground
+        else:
+            self.bg = BackgroundImage(*self.spec.background)
+
+        self.fgs: list[ForegroundImage | SvgImage] = \
+            [SvgImage(color, sym) if is_svg else ForegroundImage(color, sym)
+             for is_svg, color, sym in self.spec.foregrounds]
 
     def is_empty(self) -> bool:
-        return not self.ref and not self.fgs and self.bg == TransparentBackground
+        return self.spec.is_empty()
+
+    def spec_args(self):
+        return (self.spec, )
 
     def dimensions(self):
         w, h = self.bg.adjust_dimensions(self.config.image_width or 16,
@@ -630,31 +770,64 @@ class OsmcSymbol(RefShieldMaker):
 
     def render(self, ctx):
         w, h = self.render_background(ctx, self.bg.background_color(self.config))
+        layered = _use_layers(ctx)
+        colors = self.config.osmc_colors
 
         ctx.save()
         innerw, innerh = self.bg.to_inner(ctx, w, h)
 
+        for fg in self.fgs:
+            key = (type(fg).__name__, fg.symbol, colors[fg.color],
+                   self.config.osmc_path, innerw, innerh)
+            self._paint_layer(ctx, layered, key, self._paint_fg, fg, innerw, innerh)
+
+        if self.ref:
+            key = ('text', self.ref, colors[self.textcolor], self.config.text_font,
+                   self.config.text_border_width, innerw, innerh)
+            self._paint_layer(ctx, layered, key, self._paint_text, innerw, innerh)
+
+        ctx.restore() # restore to full image
+
+        if getattr(self.bg, 'symbol', None) is not None:
+            key = ('bg', self.bg.symbol, colors[self.bg.color], w, h)
+            self._paint_layer(ctx, layered, key, self.bg.paint, w, h, self.config)
+
+    def _paint_fg(self, ctx, fg, innerw, innerh):
         # foreground gets painted with 1,1 matrix
-        if self.fgs:
-            ctx.save()
-            ctx.scale(innerw, innerh)
-            for fg in self.fgs:
-                fg.paint(ctx, self)
-            ctx.restore()
+        ctx.save()
+        ctx.scale(innerw, innerh)
+        fg.paint(ctx, self)
+        ctx.restore()
 
+    def _paint_text(self, ctx, innerw, innerh):
         # reference text gets painted with original scale
-        if self.ref:
-            layout, tw, baseh = self.layout_ref(ctx, self.config.text_font)
+        layout, tw, baseh = self.layout_ref(ctx, self.config.text_font)
 
-            bnd_wd = self.config.text_border_width or 1.5
+        bnd_wd = self.config.text_border_width or 1.5
 
-            self.render_layout(
-                ctx, layout, color=self.config.osmc_colors[self.textcolor],
-                x=(innerw - tw)/2,
-                y=(innerh - bnd_wd - baseh)/2.0)
+        self.render_layout(
+            ctx, layout, color=self.config.osmc_colors[self.textcolor],
+            x=(innerw - tw)/2,
+            y=(innerh - bnd_wd - baseh)/2.0)
 
-        ctx.restore() # restore to full image
-        self.bg.paint(ctx, w, h, self.config)
+    @staticmethod
+    def _paint_layer(ctx, layered, key, painter, *args):
+        """ Draw one layer of the shield with `painter`. For raster output
+            the result is taken from the layer cache when possible.
+        """
+        if not layered:
+            painter(ctx, *args)
+            return
+
+        cache = _layer_cache()
+        layer = cache.get(key)
+        if layer is None:
+            layer = cairo.RecordingSurface(cairo.CONTENT_COLOR_ALPHA, None)
+            painter(cairo.Context(layer), *args)
+            cache.put(key, layer)
+
+        ctx.set_source_surface(layer, 0, 0)
+        ctx.paint()
 
     def render_frame(self, ctx):
         w, h = self.dimensions()
@@ -676,67 +849,62 @@ class OsmcSymbol(RefShieldMaker):
         ctx.set_line_width(border)
         ctx.stroke()
 
-    def render_svg(self, ctx, name, color):
-        content = self.find_resource(self.config.osmc_path, name + '.svg')
-        content = re.sub('#000000',
-                         '#{:02x}{:02x}{:02x}'.format(*[int(x*255) for x in self.config.osmc_colors[color]]),
-                         content.decode('utf8')).encode()
+    def load_svg_symbol(self, name, color):
+        return self.load_svg(self.config.osmc_path, name + '.svg',
+                             self.config.osmc_colors_hex[color],
+                             '#000000')
 
-        svg = Rsvg.Handle.new_from_data(content)
+    def render_svg(self, ctx, name, color):
+        svg = self.load_svg_symbol(name, color)
 
         ctx.save()
         ctx.translate(0.05, 0.05)
         ctx.scale(0.9/svg.props.width, 0.9/svg.props.height)
-        svg.render_cairo(ctx)
+        self.render_svg_handle(ctx, svg)
         ctx.restore()
 
-    def _init_way_color(self, color):
-        pass # field is ignored at the moment
 
-    def _init_bg_symbol(self, symbol):
-        parts = symbol.split('_', 1)
+dispatch_keys = ('osmc:symbol', )
 
-        if parts[0] in self.config.osmc_colors:
-            self.bg = BackgroundImage(parts[0],
-                                      parts[1] if len(parts) > 1 else None)
 
-    def _add_fg_symbol(self, symbol) -> bool:
-        if SvgImage.has_symbol(symbol):
-            self.fgs.append(SvgImage(None, symbol))
-            return True
+def create_for(tags: Tags, region: str, config: ShieldConfig):
+    if config.osmc_colors is None:
+        return None
 
-        if ForegroundImage.has_symbol(symbol):
-            self.fgs.append(ForegroundImage(None, symbol))
-            return True
+    symbol = OsmcSymbol(tags.get('osmc:symbol'), config)
 
-        parts = symbol.split('_', 1)
-        if len(parts) > 1:
-            color = parts[0] if parts[0] in self.config.osmc_colors else 'black'
-            if parts[1] == 'red_diamond':
-                self.fgs.append(ForegroundImage(color, 'diamond'))
-                self.fgs.append(ForegroundImage('red', 'diamond_right'))
-                return True
-            if ForegroundImage.has_symbol(parts[1]):
-                self.fgs.append(ForegroundImage(color, parts[1]))
-                return True
-            if SvgImage.has_symbol(parts[1]):
-                self.fgs.append(SvgImage(color, parts[1]))
-                return True
+    return None if symbol.is_empty() else symbol
 
-        return False
 
-    def _init_ref(self, ref, color):
-        if ref and len(ref) <= self.bg.max_textlen():
-            self.ref = ref
+def catalogue(config: ShieldConfig):
+    """ Return the tags of all OSMC shields without text that have
+        at most one foreground symbol.
+    """
+    if config.osmc_colors is None:
+        return
 
-            if color in self.config.osmc_colors:
-                self.textcolor = color
+    colors = sorted(config.osmc_colors)
+    backgrounds = ['']
+    for color in colors:
+        backgrounds.append(color)
+        backgrounds.extend(f'{color}_{sym}' for sym in BackgroundImage.symbols())
+    symbols = ForegroundImage.symbols() + list(SvgImage.AVAILABLE_SVGS) + ['red_diamond']
 
+    for bg in backgrounds:
+        if bg:
+            yield {'osmc:symbol': f'black:{bg}'}
+        for color in colors:
+            for sym in symbols:
+                yield {'osmc:symbol': f'black:{bg}:{color}_{sym}'}
 
-def create_for(tags: Tags, region: str, config: ShieldConfig):
-    if config.osmc_colors is None:
-        return None
 
-    symbol = OsmcSymbol(tags.get('osmc:symbol'), config)
+def prewarm(config: ShieldConfig):
+    """ Load the SVG foreground symbols in all OSMC colors.
+    """
+    if config.osmc_colors is None:
+        return
 
-    return None if symbol.is_empty() else symbol
+    shield = OsmcSymbol(None, config)
+    for color in config.osmc_colors:
+        for name in SvgImage.AVAILABLE_SVGS:
+            shield.load_svg_symbol(name, color)
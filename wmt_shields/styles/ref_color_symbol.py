@@ -15,10 +15,14 @@ class RefColorSymbol(RefShieldMaker):
     def __init__(self, ref, name, fgcolor, bgcolor, config):
         self.config = config
         self.ref = ref
+        self.name = name
         self.fgcolor = fgcolor
         self.bgcolor = bgcolor
         self.uuid_pattern = f'ctb_{{}}_{name}_{self.ref_uuid()}'
 
+    def spec_args(self):
+        return self.ref, self.name, self.fgcolor, self.bgcolor
+
     def dimensions(self):
         tw, _ = self._get_text_size(self.config.text_font)
         text_border = self.config.text_border_width or 1.5
@@ -52,6 +56,9 @@ class RefColorSymbol(RefShieldMaker):
                            x=(w - tw)/2, y=(h - bnd_wd - baseh)/2.0)
 
 
+dispatch_keys = ('color', 'colour')
+
+
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     ref = tags.make_ref(names=('name', 'osmc:name'))
     if ref is None:
@@ -15,6 +15,9 @@ class RefSymbol(RefShieldMaker):
         self.ref = ref
         self.uuid_pattern = f'ref_{{}}_{self.ref_uuid()}'
 
+    def spec_args(self):
+        return (self.ref, )
+
     def dimensions(self):
         tw, _ = self._get_text_size(self.config.text_font)
         text_border = self.config.text_border_width or 1.5
@@ -37,6 +40,9 @@ class RefSymbol(RefShieldMaker):
             y=(h - bnd_wd - baseh)/2.0)
 
 
+dispatch_keys = ('ref', 'name', 'osmc:name')
+
+
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     ref = tags.make_ref(names=('name', 'osmc:name'))
     if ref is None:
@@ -19,6 +19,9 @@ class SlopeSymbol(RefShieldMaker):
         self.ref = ref
         self.uuid_pattern = f'slope_{{}}_{self.ref_uuid()}'
 
+    def spec_args(self):
+        return (self.ref, )
+
     def uuid(self):
         if self.ref:
             return 'slope_{}_{}_{}'.format(
@@ -48,6 +51,9 @@ class SlopeSymbol(RefShieldMaker):
             y=(h - bnd_wd - baseh)/2.0)
 
 
+dispatch_keys = ('piste:type', )
+
+
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     if config.difficulty is None or config.slope_colors is None or \
        tags.get('piste:type') != 'downhill':
@@ -16,6 +16,9 @@ class SwissMobileSymbol(RefShieldMaker):
         self.ref = ref.strip()[:5]
         self.uuid_pattern = f'swiss_{{}}_{self.ref_uuid()}'
 
+    def spec_args(self):
+        return (self.ref, )
+
     def dimensions(self):
         return 8 + len(self.ref) * 7, self.config.image_height or 16
 
@@ -30,6 +33,9 @@ class SwissMobileSymbol(RefShieldMaker):
                            x=w - tw - bwidth, y=h - baseh - bwidth)
 
 
+dispatch_keys = ('operator', )
+
+
 def create_for(tags: Tags, region: str, config: ShieldConfig):
     ref = tags.get('ref')
     if ref is None:
@@ -8,6 +8,10 @@ class WmtConfig(object):
     """
     data_dir = "{data}"
 
+    # Number of decimals for coordinates in SVG images. When set, the
+    # SVG output is optimized for size.
+    svg_precision = None
+
     image_height = 16
     image_width = 16
     image_border_width = 1.2
@@ -141,3 +145,16 @@ class WmtConfig(object):
             'border_color' : (0.99, 0.64, 0.02),
         }
     }
+
+# Styles in the order of precedence, as used by the waymarkedtrails project.
+WMT_STYLES = ('.slope_symbol',
+              '.nordic_symbol',
+              '.image_symbol',
+              '.cai_hiking_symbol',
+              '.swiss_mobile',
+              '.jel_symbol',
+              '.kct_symbol',
+              '.osmc_symbol',
+              '.ref_color_symbol',
+              '.ref_symbol',
+              '.color_box')